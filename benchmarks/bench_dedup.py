@@ -0,0 +1,79 @@
+"""Benchmark near-duplicate clustering (app.dedup).
+
+    PYTHONPATH=src python benchmarks/bench_dedup.py [--rows 20000]
+
+Writes `--rows` tenders under source BENCH_DEDUP (every tenth one a reworded
+copy of an earlier tender), clusters them twice as large as a first batch,
+and prints signature and clustering throughput. Rows are deleted afterwards.
+"""
+import argparse
+import random
+import time
+
+from sqlalchemy import delete
+
+from app.db import SessionLocal, engine
+from app.dedup import prune_buckets, run_clustering, signature_for
+from app.models import Base, TenderRaw
+from app.normalize import normalize_record
+from app.repository import TenderRepository
+
+SOURCE = "BENCH_DEDUP"
+WORDS = (
+    "supply installation maintenance wheel lathe bogie depot rail vehicle bridge track signalling "
+    "framework contract lot training spare parts inspection hydraulic press crane measurement system "
+    "overhaul renewal station platform catenary tunnel ventilation software licence cleaning"
+).split()
+
+
+def records(n: int, seed: int = 7):
+    rnd = random.Random(seed)
+    texts = []
+    for i in range(n):
+        if texts and i % 10 == 0:
+            title, description = rnd.choice(texts)
+            description = description + " " + " ".join(rnd.choices(WORDS, k=3))
+        else:
+            title = " ".join(rnd.choices(WORDS, k=6))
+            description = " ".join(rnd.choices(WORDS, k=60))
+            texts.append((title, description))
+        yield normalize_record(
+            source=SOURCE, external_id=str(i), title=title, description=description,
+            url=f"https://bench.example/{i}", country="DE", language="en", cpv=None,
+            budget=None, deadline=None, published_at=None,
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20_000)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    batch = list(records(args.rows))
+
+    t0 = time.perf_counter()
+    for rec in batch[:2000]:
+        signature_for(rec["title"], rec["description"])
+    dt = time.perf_counter() - t0
+    print(f"signature          {2000 / dt:>10.0f} records/s")
+
+    try:
+        half = len(batch) // 2
+        for label, part in (("cluster (empty)", batch[:half]), ("cluster (+50%)", batch[half:])):
+            TenderRepository(db).upsert_many_raw(part)
+            db.commit()
+            t0 = time.perf_counter()
+            clustered, joined = run_clustering(db)
+            dt = time.perf_counter() - t0
+            print(f"{label:<18} {clustered / dt:>10.0f} rows/s  clustered={clustered} joined={joined}")
+    finally:
+        db.execute(delete(TenderRaw).where(TenderRaw.source == SOURCE))
+        db.commit()
+        prune_buckets(db)
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
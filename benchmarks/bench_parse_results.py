@@ -0,0 +1,109 @@
+"""Benchmark parse_results_html on large synthetic result pages.
+
+    PYTHONPATH=src python benchmarks/bench_parse_results.py [--sizes 1000 10000 50000]
+
+Prints parse time per page size for the single-pass extractor and for the
+previous regex implementation (kept here as a baseline), on two layouts:
+
+- nested: a <div> inside result-description. The regex split stops at the
+  first </div>, so it skips the rest of the block (and loses country).
+- icons: flat records with an inline SVG icon before the fields, as real
+  portals render them. The regex output is complete here, but each of its
+  six searches rescans the icon markup; the extractor passes over it once.
+
+Time per result should stay flat as pages grow.
+"""
+import argparse
+import re
+import time
+
+from app.scraper.portal import parse_results_html
+
+RESULT = """
+    <div class="result">
+      <a class="result-title" href="/t/{i}">Underfloor wheel lathe lot {i}</a>
+      <span class="result-budget">Budget: {budget}</span>
+      <span class="result-deadline">Deadline: 2026-12-31</span>
+      <div class="result-description">
+        <p>Supply and installation of an <b>underfloor wheel lathe</b> for depot {i}.</p>
+        <div class="result-note">Lot {i}: maintenance contract included.</div>
+      </div>
+      <span class="result-country">Country: DE</span>
+    </div>"""
+
+ICON = '<svg class="icon" viewBox="0 0 24 24">' + "".join(f'<path d="M{j} 2 L{j} 22"/>' for j in range(40)) + "</svg>"
+RESULT_ICONS = """
+    <div class="result">
+      """ + ICON + """
+      <a class="result-title" href="/t/{i}">Underfloor wheel lathe lot {i}</a>
+      <span class="result-budget">Budget: {budget}</span>
+      <span class="result-deadline">Deadline: 2026-12-31</span>
+      <span class="result-country">Country: DE</span>
+      <div class="result-description">Supply of an <b>underfloor wheel lathe</b> for depot {i}.</div>
+    </div>"""
+
+LAYOUTS = {"nested": RESULT, "icons": RESULT_ICONS}
+
+
+def synthetic_page(n: int, layout: str = "nested") -> str:
+    body = "".join(LAYOUTS[layout].format(i=i, budget=1000 * (i + 1)) for i in range(n))
+    return f"<html><body><div class=\"results\">{body}</div></body></html>"
+
+
+def regex_baseline(html: str):
+    """The pre-extractor implementation: 7 patterns, one split + 6 searches per block."""
+    results = []
+    blocks = re.findall(r'<div class="result">(.*?)</div>', html, flags=re.S | re.I)
+
+    def _extract(pattern, text):
+        m = re.search(pattern, text, flags=re.S | re.I)
+        return m.group(1).strip() if m else None
+
+    for block in blocks:
+        results.append(
+            {
+                "title": _extract(r'<a[^>]*class="result-title"[^>]*>(.*?)</a>', block),
+                "url": _extract(r'<a[^>]*class="result-title"[^>]*href="([^"]+)"', block),
+                "budget": _extract(r'<span[^>]*class="result-budget"[^>]*>\s*Budget:\s*(.*?)</span>', block),
+                "deadline": _extract(r'<span[^>]*class="result-deadline"[^>]*>\s*Deadline:\s*(.*?)</span>', block),
+                "description": _extract(r'<div[^>]*class="result-description"[^>]*>(.*?)</div>', block),
+                "country": _extract(r'<span[^>]*class="result-country"[^>]*>\s*Country:\s*(.*?)</span>', block),
+            }
+        )
+    return results
+
+
+def _time(fn, html, repeat=3):
+    best = float("inf")
+    out = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn(html)
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    args = parser.parse_args()
+
+    print(
+        f"{'layout':>7} {'results':>8} {'MB':>6} {'extractor s':>12} {'us/result':>10} {'regex s':>9} "
+        f"{'regex complete':>15}"
+    )
+    for layout in LAYOUTS:
+        for n in args.sizes:
+            html = synthetic_page(n, layout)
+            t_new, recs = _time(parse_results_html, html)
+            t_old, old = _time(regex_baseline, html)
+            assert len(recs) == n and all(r["country"] == "DE" for r in recs)
+            complete = sum(1 for r in old if r["country"]) / max(1, len(old))
+            print(
+                f"{layout:>7} {n:>8} {len(html) / 1e6:>6.1f} {t_new:>12.3f} {t_new / n * 1e6:>10.1f} "
+                f"{t_old:>9.3f} {complete:>14.0%}"
+            )
+
+
+if __name__ == "__main__":
+    main()
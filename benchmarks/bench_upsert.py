@@ -0,0 +1,85 @@
+"""Benchmark TenderRepository bulk upsert against the ORM path.
+
+    PYTHONPATH=src python benchmarks/bench_upsert.py [--rows 200000] [--orm-rows 20000]
+
+Writes rows under source BENCH_UPSERT into the configured database and
+deletes them afterwards. Prints load time for the ORM `add_many_raw`, a fresh
+COPY upsert, an unchanged re-run and a re-run with 10% changed rows.
+"""
+import argparse
+import time
+
+from sqlalchemy import delete
+
+from app.db import SessionLocal
+from app.models import Base, TenderRaw
+from app.normalize import normalize_record
+from app.repository import TenderRepository
+
+SOURCE = "BENCH_UPSERT"
+
+
+def records(n: int, prefix: str = "", changed_every: int = 0):
+    for i in range(n):
+        budget = 1000 * (i + 1) + (1 if changed_every and i % changed_every == 0 else 0)
+        yield normalize_record(
+            source=SOURCE,
+            external_id=f"{prefix}{i}",
+            title=f"Underfloor wheel lathe lot {i}",
+            description="Supply and installation of an underfloor wheel lathe, incl. training.",
+            url=f"https://portal.example/t/{prefix}{i}",
+            country="de",
+            language="en",
+            cpv="42600000",
+            budget=budget,
+            deadline="2026-12-31",
+            published_at="2026-01-15T08:00:00+00:00",
+        )
+
+
+def timed(label: str, n: int, fn):
+    t0 = time.perf_counter()
+    result = fn()
+    dt = time.perf_counter() - t0
+    print(f"{label:<28} {n:>8} rows {dt:>8.2f}s {n / dt:>10.0f} rows/s  {result}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--orm-rows", type=int, default=20_000)
+    args = parser.parse_args()
+
+    from app.db import engine
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    repo = TenderRepository(db)
+
+    def cleanup():
+        db.execute(delete(TenderRaw).where(TenderRaw.source == SOURCE))
+        db.commit()
+
+    cleanup()
+    try:
+        orm_batch = list(records(args.orm_rows, "orm-"))
+        timed("orm add_many_raw", args.orm_rows, lambda: repo.add_many_raw(orm_batch))
+
+        batch = list(records(args.rows))
+        changed = list(records(args.rows, changed_every=10))
+
+        def upsert(rows):
+            counts = repo.upsert_many_raw(rows)
+            db.commit()
+            return counts
+
+        timed("copy upsert (new)", args.rows, lambda: upsert(batch))
+        timed("copy upsert (unchanged)", args.rows, lambda: upsert(batch))
+        timed("copy upsert (10% changed)", args.rows, lambda: upsert(changed))
+    finally:
+        cleanup()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
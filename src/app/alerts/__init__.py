@@ -0,0 +1 @@
+"""Alert delivery for scored tenders (email via SMTP, Teams/Slack-style webhooks)."""
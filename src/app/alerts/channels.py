@@ -0,0 +1,223 @@
+"""Delivery channels for alerts.
+
+Every channel has a token bucket (messages per second) and a bound on sends
+in flight, and keeps its connections open across messages:
+
+- `SmtpChannel`: a small pool of logged-in SMTP connections to the relay;
+  a connection the server dropped is reopened once and the message resent
+- `WebhookChannel`: one pooled httpx client posting `{"title", "text"}` JSON
+  (accepted by Teams and Slack incoming webhooks); 429/5xx and transport
+  errors are retried with backoff
+
+`is_permanent(exc)` tells a send failure that will fail again on every retry
+(a message the channel rejects: one that cannot be encoded, a webhook 4xx, a
+5xx reply to the SMTP DATA) from a transient one (connection trouble, 429/5xx).
+
+Configure with ALERT_SMTP_HOST (enables email), ALERT_SMTP_PORT (25),
+ALERT_SMTP_USER / ALERT_SMTP_PASSWORD, ALERT_SMTP_STARTTLS=1,
+ALERT_EMAIL_FROM, ALERT_EMAIL_TO (comma-separated), ALERT_EMAIL_RATE (2/s),
+ALERT_SMTP_CONNECTIONS (2); ALERT_WEBHOOK_URL (enables the webhook),
+ALERT_WEBHOOK_RATE (1/s).
+"""
+import asyncio
+import os
+import smtplib
+from abc import ABC, abstractmethod
+from email.message import EmailMessage
+from typing import Callable, List, Optional, Sequence
+
+import httpx
+from tenacity import AsyncRetrying, retry_if_exception, stop_after_attempt, wait_exponential
+
+from app.alerts.template import Message
+from app.scraper.crawl import TokenBucket
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class AlertConfigError(RuntimeError):
+    pass
+
+
+class Channel(ABC):
+    """One alert destination; `name` is what alerts_sent.channel records."""
+
+    def __init__(self, name: str, rate: float, burst: int = 1, concurrency: int = 1):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.concurrency = max(1, concurrency)
+
+    async def send(self, message: Message) -> None:
+        await self.bucket.acquire()
+        await self._send(message)
+
+    @abstractmethod
+    async def _send(self, message: Message) -> None:
+        ...
+
+    async def aclose(self) -> None:
+        pass
+
+
+class _SmtpSlot:
+    def __init__(self):
+        self.smtp: Optional[smtplib.SMTP] = None
+
+
+class SmtpChannel(Channel):
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        sender: str,
+        recipients: Sequence[str],
+        user: Optional[str] = None,
+        password: Optional[str] = None,
+        starttls: bool = False,
+        connections: int = 2,
+        rate: float = 2.0,
+        name: str = "email",
+        timeout: float = 30.0,
+        smtp_factory: Callable[..., smtplib.SMTP] = smtplib.SMTP,
+    ):
+        if not recipients:
+            raise AlertConfigError("email alerts need at least one recipient")
+        super().__init__(name, rate, burst=connections, concurrency=connections)
+        self.host, self.port = host, port
+        self.sender, self.recipients = sender, list(recipients)
+        self.user, self.password, self.starttls = user, password, starttls
+        self.timeout = timeout
+        self._factory = smtp_factory
+        self._slots: asyncio.Queue = asyncio.Queue()
+        for _ in range(self.concurrency):
+            self._slots.put_nowait(_SmtpSlot())
+
+    def _connect(self) -> smtplib.SMTP:
+        smtp = self._factory(self.host, self.port, timeout=self.timeout)
+        if self.starttls:
+            smtp.starttls()
+        if self.user:
+            smtp.login(self.user, self.password or "")
+        return smtp
+
+    def _email(self, message: Message) -> EmailMessage:
+        msg = EmailMessage()
+        # header values must not contain CR/LF; a title scraped with line breaks would raise
+        msg["Subject"] = " ".join(message.subject.split())
+        msg["From"] = self.sender
+        msg["To"] = ", ".join(self.recipients)
+        msg.set_content(message.body)
+        return msg
+
+    def _send_blocking(self, slot: _SmtpSlot, message: Message) -> None:
+        email = self._email(message)
+        for attempt in (1, 2):
+            if slot.smtp is None:
+                slot.smtp = self._connect()
+            try:
+                slot.smtp.send_message(email, self.sender, self.recipients)
+                return
+            except (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError):
+                slot.smtp = None
+                if attempt == 2:
+                    raise
+
+    async def _send(self, message: Message) -> None:
+        slot = await self._slots.get()
+        try:
+            await asyncio.to_thread(self._send_blocking, slot, message)
+        finally:
+            self._slots.put_nowait(slot)
+
+    async def aclose(self) -> None:
+        while not self._slots.empty():
+            slot = self._slots.get_nowait()
+            if slot.smtp is not None:
+                try:
+                    slot.smtp.quit()
+                except (smtplib.SMTPException, OSError):
+                    pass
+
+
+def _retryable(exc: BaseException) -> bool:
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code in RETRY_STATUS
+    return isinstance(exc, httpx.TransportError)
+
+
+def is_permanent(exc: BaseException) -> bool:
+    """True if sending the same message again cannot succeed."""
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code not in RETRY_STATUS
+    if isinstance(exc, smtplib.SMTPDataError):
+        # the relay refused this message; login or sender errors are not about the message
+        return exc.smtp_code >= 500
+    return isinstance(exc, (ValueError, TypeError, UnicodeError))
+
+
+class WebhookChannel(Channel):
+    def __init__(
+        self,
+        url: str,
+        rate: float = 1.0,
+        concurrency: int = 2,
+        name: str = "webhook",
+        attempts: int = 4,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        timeout: float = 15.0,
+    ):
+        super().__init__(name, rate, burst=1, concurrency=concurrency)
+        self.url = url
+        self.attempts = attempts
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        self._client = httpx.AsyncClient(limits=limits, timeout=timeout, transport=transport)
+
+    async def send(self, message: Message) -> None:
+        # rate limit every attempt, not just the first: retries count against the webhook's quota too
+        async for attempt in AsyncRetrying(
+            reraise=True,
+            stop=stop_after_attempt(self.attempts),
+            wait=wait_exponential(multiplier=0.5, max=30),
+            retry=retry_if_exception(_retryable),
+        ):
+            with attempt:
+                await self.bucket.acquire()
+                await self._send(message)
+
+    async def _send(self, message: Message) -> None:
+        resp = await self._client.post(self.url, json={"title": message.subject, "text": message.body})
+        resp.raise_for_status()
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+def _recipients(value: str) -> List[str]:
+    return [r.strip() for r in value.split(",") if r.strip()]
+
+
+def channels_from_env() -> List[Channel]:
+    """Channels configured in the environment (see module docstring)."""
+    channels: List[Channel] = []
+    host = os.getenv("ALERT_SMTP_HOST")
+    if host:
+        sender = os.getenv("ALERT_EMAIL_FROM")
+        if not sender:
+            raise AlertConfigError("ALERT_EMAIL_FROM must be set for email alerts")
+        channels.append(
+            SmtpChannel(
+                host,
+                int(os.getenv("ALERT_SMTP_PORT", "25")),
+                sender,
+                _recipients(os.getenv("ALERT_EMAIL_TO", "")),
+                user=os.getenv("ALERT_SMTP_USER"),
+                password=os.getenv("ALERT_SMTP_PASSWORD"),
+                starttls=os.getenv("ALERT_SMTP_STARTTLS", "").lower() in ("1", "true", "yes"),
+                connections=int(os.getenv("ALERT_SMTP_CONNECTIONS", "2")),
+                rate=float(os.getenv("ALERT_EMAIL_RATE", "2")),
+            )
+        )
+    url = os.getenv("ALERT_WEBHOOK_URL")
+    if url:
+        channels.append(WebhookChannel(url, rate=float(os.getenv("ALERT_WEBHOOK_RATE", "1"))))
+    return channels
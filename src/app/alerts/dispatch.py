@@ -0,0 +1,307 @@
+"""Send alerts for scored tenders that no channel has seen yet.
+
+Per channel, in batches:
+
+1. one anti-join selects tenders_filtered rows scoring >= `min_score` with
+   no alerts_sent row for the channel (unique on filtered_id, channel)
+2. of each near-duplicate cluster (tenders_raw.cluster_id, see app.dedup)
+   only the best-scoring row is alerted, and only if no other member of the
+   cluster was alerted on the channel before; the rest are recorded as
+   `duplicate` so they are never selected again
+3. the rows to send are claimed with INSERT ... ON CONFLICT DO NOTHING
+   (status `pending`) and committed, so a concurrent run cannot send them too
+4. messages go out concurrently (channel rate limit and concurrency); a sent
+   message turns its claims into `sent`, one the channel rejects for good
+   (see app.alerts.channels.is_permanent) into `failed`, and any other failure
+   deletes its claims so the next run retries them (and this run stops for
+   the channel)
+
+Instant mode renders templates/alert_email.txt once per tender. Digest mode
+renders up to `digest_size` tenders into one templates/alert_digest.txt
+message. A claim left `pending` by a crashed run is released after
+`STALE_PENDING`.
+
+The database steps run in a worker thread (asyncio.to_thread), so the event
+loop keeps serving the other pipeline stages while alerts are dispatched.
+
+    python -m app.alerts.dispatch [--digest] [--min-score 60]
+"""
+import argparse
+import asyncio
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import structlog
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.alerts.channels import Channel, channels_from_env, is_permanent
+from app.alerts.template import Message, Template, load_template
+
+log = structlog.get_logger()
+
+MIN_SCORE = 60
+BATCH_SIZE = 500
+DIGEST_SIZE = 50
+STALE_PENDING = "1 hour"
+
+_PENDING_SQL = text(
+    """
+    SELECT f.id, f.relevance_score, f.matched_keywords, r.title, r.url, r.country,
+           r.deadline_date, COALESCE(r.cluster_id, r.id) AS cluster_id
+    FROM tenders_filtered f
+    JOIN tenders_raw r ON r.id = f.raw_id
+    WHERE f.relevance_score >= :min_score
+      AND (r.cluster_id IS NOT NULL OR NOT :clustered_only)
+      AND NOT EXISTS (SELECT 1 FROM alerts_sent a WHERE a.filtered_id = f.id AND a.channel = :channel)
+    ORDER BY f.id
+    LIMIT :limit
+    """
+)
+
+_ALERTED_CLUSTERS_SQL = text(
+    """
+    SELECT DISTINCT COALESCE(r.cluster_id, r.id)
+    FROM alerts_sent a
+    JOIN tenders_filtered f ON f.id = a.filtered_id
+    JOIN tenders_raw r ON r.id = f.raw_id
+    WHERE a.channel = :channel
+      AND a.status NOT IN ('duplicate', 'failed')
+      AND COALESCE(r.cluster_id, r.id) = ANY(CAST(:clusters AS integer[]))
+    """
+)
+
+
+@dataclass
+class DispatchResult:
+    channel: str
+    messages: int = 0
+    alerted: int = 0
+    duplicates: int = 0
+    failed: int = 0
+    rejected: int = 0
+
+
+def pending_alerts(
+    db: Session, channel: str, min_score: int = MIN_SCORE, limit: int = BATCH_SIZE, clustered_only: bool = False
+) -> Sequence:
+    """Unalerted rows for `channel`; with `clustered_only`, rows app.dedup has not clustered yet wait."""
+    params = {"channel": channel, "min_score": min_score, "limit": limit, "clustered_only": clustered_only}
+    return db.execute(_PENDING_SQL, params).all()
+
+
+def _record(db: Session, channel: str, ids: Sequence[int], status: str) -> List[int]:
+    """Insert alerts_sent rows unless they exist; returns the filtered ids actually inserted."""
+    if not ids:
+        return []
+    return list(
+        db.scalars(
+            text(
+                "INSERT INTO alerts_sent (filtered_id, channel, status) "
+                "SELECT unnest(CAST(:ids AS integer[])), :channel, :status "
+                "ON CONFLICT (filtered_id, channel) DO NOTHING RETURNING filtered_id"
+            ),
+            {"ids": list(ids), "channel": channel, "status": status},
+        )
+    )
+
+
+def _pick_per_cluster(db: Session, channel: str, rows: Sequence) -> Tuple[List, List[int]]:
+    """(rows to alert, filtered ids that duplicate an alerted or better-scoring cluster member)."""
+    clusters = {r.cluster_id for r in rows}
+    alerted = set(db.scalars(_ALERTED_CLUSTERS_SQL, {"channel": channel, "clusters": list(clusters)}))
+    best: Dict[int, object] = {}
+    duplicates: List[int] = []
+    for r in rows:
+        if r.cluster_id in alerted:
+            duplicates.append(r.id)
+            continue
+        other = best.get(r.cluster_id)
+        if other is None or r.relevance_score > other.relevance_score:
+            if other is not None:
+                duplicates.append(other.id)
+            best[r.cluster_id] = r
+        else:
+            duplicates.append(r.id)
+    return sorted(best.values(), key=lambda r: r.id), duplicates
+
+
+def _values(row) -> Dict:
+    return {
+        "title": row.title,
+        "url": row.url,
+        "country": row.country,
+        "deadline": row.deadline_date.isoformat() if row.deadline_date else "",
+        "score": row.relevance_score,
+        "matched_keywords": row.matched_keywords,
+    }
+
+
+def build_messages(
+    rows: Sequence,
+    digest: bool,
+    template: Template,
+    digest_template: Template,
+    digest_size: int = DIGEST_SIZE,
+    min_score: int = MIN_SCORE,
+) -> List[Tuple[Message, List[int]]]:
+    """(message, filtered ids it covers) for `rows`."""
+    if not digest:
+        return [(template.render(_values(r)), [r.id]) for r in rows]
+    out = []
+    for i in range(0, len(rows), digest_size):
+        chunk = rows[i : i + digest_size]
+        items = "\n---\n".join(template.render(_values(r)).body.strip() for r in chunk)
+        message = digest_template.render({"count": len(chunk), "items": items, "min_score": min_score})
+        out.append((message, [r.id for r in chunk]))
+    return out
+
+
+async def _deliver(
+    channel: Channel, messages: List[Tuple[Message, List[int]]]
+) -> Tuple[int, List[int], List[int], List[int]]:
+    """Send `messages`; returns (messages sent, filtered ids sent, ids failed, ids rejected for good)."""
+    semaphore = asyncio.Semaphore(channel.concurrency)
+
+    async def one(message: Message, ids: List[int]) -> Tuple[List[int], str]:
+        async with semaphore:
+            try:
+                await channel.send(message)
+                return ids, "sent"
+            except Exception as exc:
+                log.exception("alert_send_failed", channel=channel.name, filtered_ids=ids)
+                return ids, "rejected" if is_permanent(exc) else "failed"
+
+    out: Dict[str, List[int]] = {"sent": [], "failed": [], "rejected": []}
+    count = 0
+    for ids, outcome in await asyncio.gather(*(one(m, ids) for m, ids in messages)):
+        count += outcome == "sent"
+        out[outcome].extend(ids)
+    return count, out["sent"], out["failed"], out["rejected"]
+
+
+def _release_stale(db: Session, channel: str) -> None:
+    db.execute(
+        text(
+            "DELETE FROM alerts_sent WHERE channel = :channel AND status = 'pending' "
+            f"AND sent_at < now() - interval '{STALE_PENDING}'"
+        ),
+        {"channel": channel},
+    )
+    db.commit()
+
+
+def _claim_batch(
+    db: Session, channel: str, min_score: int, batch_size: int, clustered_only: bool
+) -> Tuple[int, int, List]:
+    """(rows selected, duplicates recorded, claimed rows to send) for the next batch, committed."""
+    rows = pending_alerts(db, channel, min_score, batch_size, clustered_only)
+    if not rows:
+        return 0, 0, []
+    to_send, duplicates = _pick_per_cluster(db, channel, rows)
+    recorded = len(_record(db, channel, duplicates, "duplicate"))
+    claimed = set(_record(db, channel, [r.id for r in to_send], "pending"))
+    db.commit()
+    return len(rows), recorded, [r for r in to_send if r.id in claimed]
+
+
+def _settle(db: Session, channel: str, sent: List[int], failed: List[int], rejected: List[int]) -> None:
+    for status, ids in (("sent", sent), ("failed", rejected)):
+        if ids:
+            db.execute(
+                text(
+                    "UPDATE alerts_sent SET status = :status, sent_at = now() "
+                    "WHERE channel = :channel AND filtered_id = ANY(CAST(:ids AS integer[]))"
+                ),
+                {"status": status, "channel": channel, "ids": ids},
+            )
+    if failed:
+        # release the claims; the next run retries them
+        db.execute(
+            text(
+                "DELETE FROM alerts_sent "
+                "WHERE channel = :channel AND status = 'pending' AND filtered_id = ANY(CAST(:ids AS integer[]))"
+            ),
+            {"channel": channel, "ids": failed},
+        )
+    db.commit()
+
+
+async def dispatch_channel(
+    db: Session,
+    channel: Channel,
+    digest: bool = False,
+    min_score: int = MIN_SCORE,
+    batch_size: int = BATCH_SIZE,
+    digest_size: int = DIGEST_SIZE,
+    clustered_only: bool = False,
+) -> DispatchResult:
+    """Send pending alerts on one channel (see the module docstring)."""
+    template = load_template("alert_email.txt")
+    digest_template = load_template("alert_digest.txt")
+    result = DispatchResult(channel.name)
+    await asyncio.to_thread(_release_stale, db, channel.name)
+    while True:
+        selected, duplicates, to_send = await asyncio.to_thread(
+            _claim_batch, db, channel.name, min_score, batch_size, clustered_only
+        )
+        if not selected:
+            return result
+        result.duplicates += duplicates
+
+        messages = build_messages(to_send, digest, template, digest_template, digest_size, min_score)
+        count, sent, failed, rejected = await _deliver(channel, messages)
+        await asyncio.to_thread(_settle, db, channel.name, sent, failed, rejected)
+        result.messages += count
+        result.alerted += len(sent)
+        result.failed += len(failed)
+        result.rejected += len(rejected)
+        # a failing channel is left alone until the next run instead of being retried batch after batch
+        if failed or selected < batch_size:
+            return result
+
+
+async def dispatch_alerts(
+    db: Session,
+    channels: Sequence[Channel],
+    digest: bool = False,
+    min_score: int = MIN_SCORE,
+    batch_size: int = BATCH_SIZE,
+    digest_size: int = DIGEST_SIZE,
+) -> Dict[str, DispatchResult]:
+    """Send pending alerts on every channel (one after the other) and close the channels."""
+    results: Dict[str, DispatchResult] = {}
+    try:
+        for channel in channels:
+            result = await dispatch_channel(db, channel, digest, min_score, batch_size, digest_size)
+            log.info("alerts_dispatched", **result.__dict__)
+            results[channel.name] = result
+    finally:
+        for channel in channels:
+            await channel.aclose()
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from app.db import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Send alerts for newly scored tenders.")
+    parser.add_argument("--digest", action="store_true", help="one message per channel and batch instead of one per tender")
+    parser.add_argument("--min-score", type=int, default=MIN_SCORE)
+    args = parser.parse_args(argv)
+
+    channels = channels_from_env()
+    if not channels:
+        print("No alert channels configured (ALERT_SMTP_HOST / ALERT_WEBHOOK_URL).")
+        return
+    db = SessionLocal()
+    try:
+        results = asyncio.run(dispatch_alerts(db, channels, digest=args.digest, min_score=args.min_score))
+    finally:
+        db.close()
+    for r in results.values():
+        print(f"{r.channel:<10} messages={r.messages:<5} alerted={r.alerted:<5} duplicates={r.duplicates:<5} failed={r.failed:<5} rejected={r.rejected}")
+
+
+if __name__ == "__main__":
+    main()
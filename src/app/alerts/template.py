@@ -0,0 +1,59 @@
+"""Alert templates: a `Subject:` line, a blank line, then the body, with `{{ name }}` placeholders.
+
+A template is compiled once into `str.format` strings; rendering is a single
+`format_map` call. Unknown or None values render as empty strings.
+"""
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Mapping
+
+TEMPLATE_DIR = Path("templates")
+_VAR_RE = re.compile(r"{{\s*(\w+)\s*}}")
+
+
+@dataclass(frozen=True)
+class Message:
+    subject: str
+    body: str
+
+
+class _Values(dict):
+    def __missing__(self, key: str) -> str:
+        return ""
+
+
+def _compile(source: str) -> str:
+    """`{{ name }}` placeholders -> `{name}`, every other brace escaped."""
+    out = []
+    pos = 0
+    for m in _VAR_RE.finditer(source):
+        out.append(source[pos : m.start()].replace("{", "{{").replace("}", "}}"))
+        out.append("{" + m.group(1) + "}")
+        pos = m.end()
+    out.append(source[pos:].replace("{", "{{").replace("}", "}}"))
+    return "".join(out)
+
+
+@dataclass(frozen=True)
+class Template:
+    subject: str
+    body: str
+
+    @classmethod
+    def compile(cls, source: str) -> "Template":
+        subject, body = "", source
+        first, sep, rest = source.partition("\n")
+        if first.lower().startswith("subject:"):
+            subject, body = first[len("subject:") :].strip(), rest.lstrip("\n")
+        return cls(_compile(subject), _compile(body))
+
+    def render(self, values: Mapping[str, Any]) -> Message:
+        v = _Values((k, "" if x is None else x) for k, x in values.items())
+        return Message(self.subject.format_map(v), self.body.format_map(v))
+
+
+@lru_cache(maxsize=None)
+def load_template(name: str, directory: Path = TEMPLATE_DIR) -> Template:
+    return Template.compile((Path(directory) / name).read_text(encoding="utf-8"))
@@ -0,0 +1 @@
+"""Read-only HTTP API over scored tenders."""
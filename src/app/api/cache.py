@@ -0,0 +1,86 @@
+"""Short-lived in-process cache for JSON responses.
+
+Entries are keyed by request and tagged with the scoring generation they were
+built from (`scoring_generation`: the newest scoring_state.updated_at, which
+moves whenever a scoring run commits). A lookup under a newer generation is a
+miss, so a finished scoring run invalidates every cached page in every API
+process at once; the TTL bounds staleness for everything else (e.g. edits of
+tenders_raw that don't change scores). Responses carry an ETag of their
+body, so clients revalidate with If-None-Match and get a 304 without the
+body.
+
+API_CACHE_TTL (seconds, default 30) and API_CACHE_MAX_ENTRIES (default 512).
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Hashable, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+DEFAULT_TTL = float(os.getenv("API_CACHE_TTL", "30"))
+DEFAULT_MAX_ENTRIES = int(os.getenv("API_CACHE_MAX_ENTRIES", "512"))
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    body: bytes
+    etag: str
+    generation: str
+    expires: float
+
+
+def etag_for(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+    return "*" in tags or etag in tags
+
+
+async def scoring_generation(db: AsyncSession) -> str:
+    result = await db.execute(text("SELECT coalesce(max(updated_at)::text, '') FROM scoring_state"))
+    return result.scalar_one()
+
+
+class ResponseCache:
+    """LRU of `CachedResponse` by key; the lock only guards the dict, it is never held across an await."""
+
+    def __init__(self, ttl: float = DEFAULT_TTL, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, generation: str) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.generation != generation or entry.expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: Hashable, generation: str, body: bytes) -> CachedResponse:
+        entry = CachedResponse(body, etag_for(body), generation, time.monotonic() + self.ttl)
+        if self.ttl <= 0:
+            return entry
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
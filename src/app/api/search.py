@@ -0,0 +1,62 @@
+"""Full-text search endpoints (see app.search).
+
+- `GET /search?q=...`: ranked hits with snippets
+- `GET /search/saved`: the saved searches built from the keyword list
+- `GET /search/saved/{name}`: run one of them
+"""
+from dataclasses import asdict
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import get_async_db
+from app.search import MAX_LIMIT, SearchError, SearchHit, run_saved_async, saved_searches, search_async
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+
+def _hits(hits: List[SearchHit]) -> Dict[str, Any]:
+    return {"items": [asdict(h) for h in hits]}
+
+
+@router.get("")
+async def search_tenders(
+    q: str = Query(..., min_length=1),
+    lang: List[str] = Query([]),
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    country: List[str] = Query([]),
+    source: List[str] = Query([]),
+    limit: int = Query(20, ge=1, le=MAX_LIMIT),
+    db: AsyncSession = Depends(get_async_db),
+) -> Dict[str, Any]:
+    try:
+        hits = await search_async(
+            db, q, languages=lang or None, since=since, until=until, country=country, source=source, limit=limit
+        )
+        return _hits(hits)
+    except SearchError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+
+@router.get("/saved")
+def list_saved_searches() -> Dict[str, Any]:
+    return {"items": [asdict(s) for s in saved_searches().values()]}
+
+
+@router.get("/saved/{name}")
+async def run_saved_search(
+    name: str,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    country: List[str] = Query([]),
+    source: List[str] = Query([]),
+    limit: int = Query(20, ge=1, le=MAX_LIMIT),
+    db: AsyncSession = Depends(get_async_db),
+) -> Dict[str, Any]:
+    if name not in saved_searches():
+        raise HTTPException(status_code=404, detail="unknown saved search")
+    hits = await run_saved_async(db, name, since=since, until=until, country=country, source=source, limit=limit)
+    return _hits(hits)
@@ -0,0 +1,245 @@
+"""Read endpoints for scored tenders (tenders_filtered joined with tenders_raw).
+
+- `GET /tenders`: one page, best score first, filtered by score range,
+  country, source, deadline window and matched keyword. Pagination is keyset
+  on (relevance_score, id): `next_cursor` encodes the last row and the next
+  page continues with `(relevance_score, id) < (score, id)`, walking
+  ix_filtered_score_id backwards, so page 1000 costs what page 1 costs
+  (OFFSET would read and discard every earlier row).
+- `GET /tenders/export?format=ndjson|csv`: every matching row, streamed in
+  keyset batches, so memory stays flat and no connection is held for the
+  whole download.
+- `GET /tenders/{id}`: one tender including its description.
+
+The keyword filter matches whole matched keywords, ignoring case, through
+the GIN index on string_to_array(lower(matched_keywords), ', '). JSON
+responses go through the response cache and carry an ETag (see app.api.cache). Handlers are async
+and query through the asyncpg engine (app.db.AsyncSessionLocal).
+"""
+import base64
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Text, and_, cast, func, select, tuple_
+from sqlalchemy.dialects.postgresql import ARRAY, array
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.cache import ResponseCache, etag_matches, scoring_generation
+from app.db import AsyncSessionLocal, get_async_db
+from app.models import TenderFiltered, TenderRaw
+
+router = APIRouter(prefix="/tenders", tags=["tenders"])
+cache = ResponseCache()
+
+MAX_PAGE = 500
+EXPORT_BATCH = 2000
+KEYWORD_SEPARATOR = ", "  # as written by app.scoring.pipeline.score_rows
+
+LIST_COLUMNS = (
+    TenderFiltered.id,
+    TenderFiltered.relevance_score.label("score"),
+    TenderFiltered.matched_keywords,
+    TenderRaw.id.label("raw_id"),
+    TenderRaw.source,
+    TenderRaw.external_id,
+    TenderRaw.title,
+    TenderRaw.country,
+    TenderRaw.language,
+    TenderRaw.cpv_codes,
+    TenderRaw.budget_amount,
+    TenderRaw.deadline_date,
+    TenderRaw.url,
+    TenderRaw.published_at,
+    TenderRaw.cluster_id,
+)
+DETAIL_COLUMNS = LIST_COLUMNS + (TenderRaw.description, TenderFiltered.notes, TenderFiltered.created_at)
+
+
+@dataclass
+class TenderFilters:
+    min_score: Optional[int] = None
+    max_score: Optional[int] = None
+    country: List[str] = field(default_factory=list)
+    source: List[str] = field(default_factory=list)
+    deadline_from: Optional[date] = None
+    deadline_to: Optional[date] = None
+    keyword: Optional[str] = None
+
+    def conditions(self) -> List:
+        conds = []
+        if self.min_score is not None:
+            conds.append(TenderFiltered.relevance_score >= self.min_score)
+        if self.max_score is not None:
+            conds.append(TenderFiltered.relevance_score <= self.max_score)
+        if self.country:
+            conds.append(TenderRaw.country.in_(self.country))
+        if self.source:
+            conds.append(TenderRaw.source.in_(self.source))
+        if self.deadline_from is not None:
+            conds.append(TenderRaw.deadline_date >= self.deadline_from)
+        if self.deadline_to is not None:
+            conds.append(TenderRaw.deadline_date <= self.deadline_to)
+        if self.keyword:
+            # same expression as ix_filtered_keywords
+            keywords = func.string_to_array(func.lower(TenderFiltered.matched_keywords), KEYWORD_SEPARATOR)
+            conds.append(keywords.op("@>")(cast(array([self.keyword.strip().lower()]), ARRAY(Text))))
+        return conds
+
+
+def tender_filters(
+    min_score: Optional[int] = Query(None, ge=0, le=100),
+    max_score: Optional[int] = Query(None, ge=0, le=100),
+    country: List[str] = Query([]),
+    source: List[str] = Query([]),
+    deadline_from: Optional[date] = None,
+    deadline_to: Optional[date] = None,
+    keyword: Optional[str] = None,
+) -> TenderFilters:
+    return TenderFilters(min_score, max_score, country, source, deadline_from, deadline_to, keyword)
+
+
+def encode_cursor(score: int, filtered_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{score}:{filtered_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        score, filtered_id = raw.split(":")
+        return int(score), int(filtered_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="invalid cursor")
+
+
+def page_stmt(filters: TenderFilters, after: Optional[tuple], limit: int):
+    stmt = select(*LIST_COLUMNS).join(TenderRaw, TenderRaw.id == TenderFiltered.raw_id)
+    conds = filters.conditions()
+    if after is not None:
+        conds.append(tuple_(TenderFiltered.relevance_score, TenderFiltered.id) < tuple_(*after))
+    if conds:
+        stmt = stmt.where(and_(*conds))
+    return stmt.order_by(TenderFiltered.relevance_score.desc(), TenderFiltered.id.desc()).limit(limit)
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def _item(row) -> Dict[str, Any]:
+    return {k: _plain(v) for k, v in row._mapping.items()}
+
+
+def _json(payload: Any) -> bytes:
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+async def _cached(request: Request, db: AsyncSession, build: Callable[[], Awaitable[Any]]) -> Response:
+    """JSON response for `build()`, from the cache when possible; 304 when the client's ETag matches."""
+    generation = await scoring_generation(db)
+    key = (request.url.path, tuple(sorted(request.query_params.multi_items())))
+    entry = cache.get(key, generation)
+    if entry is None:
+        entry = cache.put(key, generation, _json(await build()))
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(entry.body, media_type="application/json", headers=headers)
+
+
+@router.get("")
+async def list_tenders(
+    request: Request,
+    filters: TenderFilters = Depends(tender_filters),
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=MAX_PAGE),
+    db: AsyncSession = Depends(get_async_db),
+) -> Response:
+    after = decode_cursor(cursor) if cursor else None
+
+    async def build() -> Dict[str, Any]:
+        # one extra row tells whether there is a next page
+        rows = (await db.execute(page_stmt(filters, after, limit + 1))).all()
+        more = len(rows) > limit
+        rows = rows[:limit]
+        return {
+            "items": [_item(r) for r in rows],
+            "next_cursor": encode_cursor(rows[-1].score, rows[-1].id) if more else None,
+        }
+
+    return await _cached(request, db, build)
+
+
+async def _export_rows(filters: TenderFilters) -> AsyncIterator:
+    """Every matching row, one short-lived session per keyset batch."""
+    after = None
+    while True:
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(page_stmt(filters, after, EXPORT_BATCH))).all()
+        for row in rows:
+            yield row
+        if len(rows) < EXPORT_BATCH:
+            return
+        after = (rows[-1].score, rows[-1].id)
+
+
+async def _ndjson(rows: AsyncIterator) -> AsyncIterator[bytes]:
+    async for row in rows:
+        yield _json(_item(row)) + b"\n"
+
+
+async def _csv(rows: AsyncIterator) -> AsyncIterator[str]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow([c.key for c in LIST_COLUMNS])
+    i = 0
+    async for row in rows:
+        i += 1
+        writer.writerow([_plain(v) for v in row])
+        if i % 500 == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
+
+@router.get("/export")
+async def export_tenders(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    filters: TenderFilters = Depends(tender_filters),
+) -> StreamingResponse:
+    rows = _export_rows(filters)
+    if format == "csv":
+        return StreamingResponse(
+            _csv(rows),
+            media_type="text/csv; charset=utf-8",
+            headers={"Content-Disposition": 'attachment; filename="tenders.csv"'},
+        )
+    return StreamingResponse(_ndjson(rows), media_type="application/x-ndjson")
+
+
+@router.get("/{filtered_id}")
+async def get_tender(filtered_id: int, request: Request, db: AsyncSession = Depends(get_async_db)) -> Response:
+    stmt = (
+        select(*DETAIL_COLUMNS)
+        .join(TenderRaw, TenderRaw.id == TenderFiltered.raw_id)
+        .where(TenderFiltered.id == filtered_id)
+    )
+
+    async def build() -> Dict[str, Any]:
+        row = (await db.execute(stmt)).first()
+        if row is None:
+            raise HTTPException(status_code=404, detail="tender not found")
+        return _item(row)
+
+    return await _cached(request, db, build)
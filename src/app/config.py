@@ -6,7 +6,26 @@ class Settings(BaseSettings):
     postgres_db: str = 'tenders'
     postgres_user: str = 'tenders_user'
     postgres_password: str = 'change_me'
+    # connection pool per engine (sync and async each have their own)
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_recycle: int = 1800
+    db_pool_timeout: float = 30.0
+    def _url(self, driver: str) -> str:
+        return f'postgresql+{driver}://{self.postgres_user}:{self.postgres_password}@{self.postgres_host}:{self.postgres_port}/{self.postgres_db}'
     @property
     def database_url(self):
-        return f'postgresql+psycopg2://{self.postgres_user}:{self.postgres_password}@{self.postgres_host}:{self.postgres_port}/{self.postgres_db}'
+        return self._url('psycopg2')
+    @property
+    def async_database_url(self):
+        return self._url('asyncpg')
+    @property
+    def pool_options(self):
+        return {
+            'pool_size': self.db_pool_size,
+            'max_overflow': self.db_max_overflow,
+            'pool_recycle': self.db_pool_recycle,
+            'pool_timeout': self.db_pool_timeout,
+            'pool_pre_ping': True,
+        }
 settings = Settings()
@@ -0,0 +1,7 @@
+"""Connectors for tender portals with a public or token-protected API.
+
+This package provides:
+- a common Connector interface (paginated fetch, cursor/since resume, normalization)
+- connectors for the API portals in config/portal_master.csv
+- an asyncio runner fetching all enabled connectors concurrently
+"""
@@ -0,0 +1,113 @@
+"""Common interface for API portal connectors.
+
+A connector knows how to fetch one page of a portal's API (`fetch_page`) and
+how to map one item onto the tenders_raw columns (`normalize`). Everything
+else -- pagination loop, resume state, rate limiting, retries, DB writes -- is
+shared and lives in `app.connectors.runner`.
+
+Pagination is cursor based: `fetch_page` gets the cursor returned by the
+previous page (None for the first page) and returns the next one (None when
+done). A cursor is an opaque string: an offset, a page token or a next URL.
+`since` is the start of the previous complete run, so connectors can ask the
+API only for notices published/updated after it.
+"""
+import os
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, ClassVar, Dict, List, Optional, Sequence, Type
+
+import httpx
+from tenacity import AsyncRetrying, retry_if_exception, stop_after_attempt, wait_exponential
+
+from app.scraper.crawl import TokenBucket
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class ConnectorConfigError(RuntimeError):
+    pass
+
+
+@dataclass
+class Page:
+    items: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None
+    raw: Dict[str, Any] = field(default_factory=dict, repr=False)
+
+
+def _retryable(exc: BaseException) -> bool:
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code in RETRY_STATUS
+    return isinstance(exc, httpx.TransportError)
+
+
+class Connector(ABC):
+    """One API source. Subclasses set the class attributes and implement the two abstract methods."""
+
+    portal: ClassVar[str]  # name in config/portal_master.csv
+    source: ClassVar[str]  # tenders_raw.source
+    base_url: ClassVar[str]
+    token_env: ClassVar[Optional[str]] = None  # env var holding the API key, if one is needed
+    rate: ClassVar[float] = 1.0  # requests per second
+    burst: ClassVar[int] = 2
+    concurrency: ClassVar[int] = 1  # streams fetched in parallel
+    page_size: ClassVar[int] = 100
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        token: Optional[str] = None,
+        page_size: Optional[int] = None,
+        rate: Optional[float] = None,
+        attempts: int = 4,
+    ):
+        env_prefix = self.source.upper()
+        self.base_url = (base_url or os.getenv(f"{env_prefix}_BASE_URL") or type(self).base_url).rstrip("/")
+        self.token = token or (os.getenv(self.token_env) if self.token_env else None)
+        if self.token_env and not self.token:
+            raise ConnectorConfigError(f"{self.token_env} must be set for {self.portal}")
+        self.page_size = page_size or type(self).page_size
+        self.bucket = TokenBucket(rate or type(self).rate, self.burst)
+        self.attempts = attempts
+
+    def streams(self) -> Sequence[str]:
+        """Independent partitions with their own cursor (e.g. one per query)."""
+        return ("default",)
+
+    @abstractmethod
+    async def fetch_page(
+        self,
+        client: httpx.AsyncClient,
+        stream: str,
+        cursor: Optional[str],
+        since: Optional[datetime],
+    ) -> Page:
+        ...
+
+    @abstractmethod
+    def normalize(self, item: Dict[str, Any]) -> Optional[Dict]:
+        """tenders_raw dict (see `app.normalize.normalize_record`), or None to skip the item."""
+
+    async def request_json(self, client: httpx.AsyncClient, method: str, url: str, **kwargs) -> Dict[str, Any]:
+        """Rate-limited request with retries on 429/5xx and transport errors."""
+        async for attempt in AsyncRetrying(
+            reraise=True,
+            stop=stop_after_attempt(self.attempts),
+            wait=wait_exponential(multiplier=0.5, max=30),
+            retry=retry_if_exception(_retryable),
+        ):
+            with attempt:
+                await self.bucket.acquire()
+                resp = await client.request(method, url, **kwargs)
+                resp.raise_for_status()
+                return resp.json()
+        raise AssertionError("unreachable")
+
+
+CONNECTORS: Dict[str, Type[Connector]] = {}
+
+
+def register(cls: Type[Connector]) -> Type[Connector]:
+    CONNECTORS[cls.portal] = cls
+    return cls
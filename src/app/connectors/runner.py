@@ -0,0 +1,205 @@
+"""Fetch all enabled API connectors concurrently.
+
+All connectors share one pooled httpx.AsyncClient. Each connector has its own
+token bucket (requests per second) and fetches at most `concurrency` of its
+streams at a time. Pages are written as they arrive (COPY upsert + cursor in
+connector_state, one commit per page), so an interrupted run resumes at the
+page after the last one stored. When a stream is exhausted its cursor is
+cleared and `last_since` moves to the time its cursor chain began
+(connector_state.chain_started_at), which for a resumed chain is an earlier
+run, so notices published while the chain was interrupted are asked for
+next time.
+
+Every stream has its own session and its database work runs in a worker
+thread (asyncio.to_thread), so a COPY never blocks the event loop and
+concurrent streams never share a transaction.
+
+With an HTTP cache (HTTP_CACHE_DIR, see `app.http_cache`) requests are sent
+as conditional requests and unchanged responses cost a 304.
+
+    python -m app.connectors.runner [--only TED WorldBank] [--max-pages 10]
+"""
+import argparse
+import asyncio
+import csv
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence
+
+import httpx
+import structlog
+from sqlalchemy.orm import Session
+
+from app.connectors.base import CONNECTORS, Connector, ConnectorConfigError
+from app.db import SessionLocal
+from app.http_cache import HttpCache, caching_transport, default_cache
+from app.models import ConnectorState
+from app.repository import TenderRepository, UpsertCounts
+
+log = structlog.get_logger()
+
+PORTAL_MASTER_CSV = Path("config/portal_master.csv")
+API_ACCESS_TYPES = ("api", "api_token")
+
+# awaited after every committed page (see app.orchestrator.pipeline)
+PageHook = Callable[[UpsertCounts], Awaitable[None]]
+
+
+@dataclass
+class ConnectorRun:
+    source: str
+    pages: int = 0
+    fetched: int = 0
+    inserted: int = 0
+    updated: int = 0
+    seconds: float = 0.0
+    error: Optional[str] = None
+
+
+def enabled_connectors(csv_path: Path = PORTAL_MASTER_CSV, only: Optional[Sequence[str]] = None) -> List[Connector]:
+    """Connectors for the API portals of `csv_path` that have an implementation and credentials."""
+    import app.connectors.sources  # noqa: F401  (registers the built-in connectors)
+
+    wanted = {o.lower() for o in only} if only else None
+    connectors: List[Connector] = []
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            portal = row["portal"].strip()
+            if row["access_type"].strip() not in API_ACCESS_TYPES:
+                continue
+            if wanted is not None and portal.lower() not in wanted:
+                continue
+            cls = CONNECTORS.get(portal)
+            if cls is None:
+                log.info("connector_not_implemented", portal=portal)
+                continue
+            try:
+                connectors.append(cls())
+            except ConnectorConfigError as exc:
+                log.warning("connector_disabled", portal=portal, reason=str(exc))
+    return connectors
+
+
+def _get_state(db: Session, source: str, stream: str) -> ConnectorState:
+    state = db.get(ConnectorState, (source, stream))
+    if state is None:
+        # committed with the first page
+        state = ConnectorState(source=source, stream=stream)
+        db.add(state)
+    return state
+
+
+def _store_page(db: Session, state: ConnectorState, records: List[Dict], next_cursor: Optional[str]) -> UpsertCounts:
+    counts = TenderRepository(db).upsert_many_raw(records)
+    state.cursor = next_cursor
+    if next_cursor is None:
+        state.last_since = state.chain_started_at
+    db.commit()
+    return counts
+
+
+async def _run_stream(
+    session_factory: Callable[[], Session],
+    connector: Connector,
+    stream: str,
+    client: httpx.AsyncClient,
+    run: ConnectorRun,
+    max_pages: Optional[int],
+    on_page: Optional[PageHook] = None,
+) -> None:
+    db = session_factory()
+    try:
+        state = await asyncio.to_thread(_get_state, db, connector.source, stream)
+        if state.cursor is None or state.chain_started_at is None:
+            # a new cursor chain (stored with its first page); a resumed chain keeps its start
+            state.chain_started_at = datetime.now(timezone.utc)
+        cursor, since = state.cursor, state.last_since
+        pages = 0
+        while True:
+            page = await connector.fetch_page(client, stream, cursor, since)
+            records = [r for r in map(connector.normalize, page.items) if r]
+            counts = await asyncio.to_thread(_store_page, db, state, records, page.next_cursor)
+            run.inserted += counts.inserted
+            run.updated += counts.updated
+            run.fetched += len(page.items)
+            run.pages += 1
+            pages += 1
+            if on_page is not None:
+                await on_page(counts)
+            if page.next_cursor is None or (max_pages is not None and pages >= max_pages):
+                return
+            cursor = page.next_cursor
+    finally:
+        await asyncio.to_thread(db.close)
+
+
+async def run_connector(
+    connector: Connector,
+    client: httpx.AsyncClient,
+    max_pages: Optional[int] = None,
+    on_page: Optional[PageHook] = None,
+    session_factory: Callable[[], Session] = SessionLocal,
+) -> ConnectorRun:
+    """Fetch every stream of one connector; errors are logged and reported, not raised."""
+    run = ConnectorRun(connector.source)
+    started = time.monotonic()
+    semaphore = asyncio.Semaphore(max(1, connector.concurrency))
+
+    async def one(stream: str) -> None:
+        async with semaphore:
+            await _run_stream(session_factory, connector, stream, client, run, max_pages, on_page)
+
+    try:
+        await asyncio.gather(*(one(s) for s in connector.streams()))
+    except Exception as exc:
+        run.error = f"{type(exc).__name__}: {exc}"
+        log.exception("connector_failed", source=connector.source)
+    run.seconds = round(time.monotonic() - started, 2)
+    log.info("connector_done", **run.__dict__)
+    return run
+
+
+async def run_connectors(
+    connectors: Sequence[Connector],
+    max_pages: Optional[int] = None,
+    max_connections: int = 20,
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+    cache: Optional[HttpCache] = None,
+    on_page: Optional[PageHook] = None,
+    session_factory: Callable[[], Session] = SessionLocal,
+) -> Dict[str, ConnectorRun]:
+    """Run all `connectors` concurrently over one pooled HTTP client.
+
+    Every stream opens its own session from `session_factory`. `on_page` is
+    awaited with the upsert counts of every stored page.
+    """
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+    if transport is None and cache is not None:
+        transport = httpx.AsyncHTTPTransport(limits=limits)
+    transport = caching_transport(cache, transport)
+    async with httpx.AsyncClient(limits=limits, timeout=30.0, transport=transport) as client:
+        runs = await asyncio.gather(
+            *(run_connector(c, client, max_pages, on_page, session_factory) for c in connectors)
+        )
+    return {r.source: r for r in runs}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Fetch tenders from the API portals in portal_master.csv.")
+    parser.add_argument("--only", nargs="*", help="portal names as in portal_master.csv")
+    parser.add_argument("--max-pages", type=int, default=None, help="per stream; the rest resumes next run")
+    parser.add_argument("--portals", type=Path, default=PORTAL_MASTER_CSV)
+    args = parser.parse_args(argv)
+
+    runs = asyncio.run(
+        run_connectors(enabled_connectors(args.portals, args.only), max_pages=args.max_pages, cache=default_cache())
+    )
+    for run in runs.values():
+        status = f"ERROR {run.error}" if run.error else "ok"
+        print(f"{run.source:<12} pages={run.pages:<4} fetched={run.fetched:<6} inserted={run.inserted:<6} updated={run.updated:<6} {status}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""Connectors for the API portals in config/portal_master.csv.
+
+Field names follow the public APIs; base URLs can be overridden per source
+with <SOURCE>_BASE_URL (e.g. TED_BASE_URL) to point at a mirror or a test
+server.
+"""
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+import httpx
+
+from app.connectors.base import Connector, Page, register
+from app.normalize import normalize_record
+
+
+def _first(value: Any) -> Optional[Any]:
+    if isinstance(value, list):
+        return value[0] if value else None
+    return value
+
+
+def _text(value: Any, prefer: Sequence[str] = ("eng", "en")) -> Optional[str]:
+    """Plain text from TED-style multilingual values ({"eng": "...", "deu": [...]})."""
+    if isinstance(value, dict):
+        for lang in prefer:
+            if value.get(lang):
+                return _text(value[lang])
+        return next((_text(v) for v in value.values() if v), None)
+    if isinstance(value, list):
+        return " ".join(str(v) for v in value if v) or None
+    return value
+
+
+def _older(value: Optional[str], since: datetime) -> bool:
+    if not value:
+        return False
+    try:
+        return datetime.fromisoformat(value[:10]).date() < since.date()
+    except ValueError:
+        return False
+
+
+@register
+class TedConnector(Connector):
+    """TED (EU) notice search API v3, iteration pagination."""
+
+    portal = "TED"
+    source = "TED"
+    base_url = "https://api.ted.europa.eu"
+    rate = 2.0
+    page_size = 100
+    fields = [
+        "publication-number",
+        "notice-title",
+        "description-lot",
+        "buyer-country",
+        "classification-cpv",
+        "deadline-receipt-tender-date-lot",
+        "publication-date",
+        "links",
+    ]
+
+    def __init__(self, *args, query: Optional[str] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.query = query if query is not None else os.getenv("TED_QUERY", "")
+
+    def _query(self, since: Optional[datetime]) -> str:
+        parts = [f"({self.query})"] if self.query else []
+        if since is not None:
+            parts.append(f"publication-date>={since:%Y%m%d}")
+        return " AND ".join(parts) or "publication-number=*"
+
+    async def fetch_page(self, client: httpx.AsyncClient, stream: str, cursor: Optional[str], since: Optional[datetime]) -> Page:
+        body: Dict[str, Any] = {
+            "query": self._query(since),
+            "fields": self.fields,
+            "limit": self.page_size,
+            "paginationMode": "ITERATION",
+        }
+        if cursor:
+            body["iterationNextToken"] = cursor
+        data = await self.request_json(client, "POST", f"{self.base_url}/v3/notices/search", json=body)
+        items = data.get("notices") or []
+        return Page(items, data.get("iterationNextToken") if items else None, data)
+
+    def normalize(self, item: Dict[str, Any]) -> Optional[Dict]:
+        number = item.get("publication-number")
+        if not number:
+            return None
+        links = (item.get("links") or {}).get("html") or {}
+        url = links.get("ENG") or next(iter(links.values()), None) or f"https://ted.europa.eu/en/notice/-/detail/{number}"
+        published = _first(item.get("publication-date"))
+        cpv = item.get("classification-cpv")
+        return normalize_record(
+            source=self.source,
+            external_id=number,
+            title=_text(item.get("notice-title")) or "",
+            description=_text(item.get("description-lot")) or "",
+            url=url,
+            country=_first(item.get("buyer-country")),
+            language=None,
+            cpv=",".join(sorted(set(cpv))) if isinstance(cpv, list) else cpv,
+            budget=None,
+            deadline=_first(item.get("deadline-receipt-tender-date-lot")),
+            published_at=published[:10] if published else None,
+        )
+
+
+@register
+class WorldBankConnector(Connector):
+    """World Bank procurement notices (search API v2), offset pagination, newest first."""
+
+    portal = "WorldBank"
+    source = "WORLDBANK"
+    base_url = "https://search.worldbank.org"
+    page_size = 100
+
+    async def fetch_page(self, client: httpx.AsyncClient, stream: str, cursor: Optional[str], since: Optional[datetime]) -> Page:
+        offset = int(cursor or 0)
+        params = {
+            "format": "json",
+            "rows": self.page_size,
+            "os": offset,
+            "srt": "noticedate",
+            "order": "desc",
+            "fl": "id,bid_description,project_name,project_ctry_name,notice_type,"
+            "submission_deadline_date,noticedate,url",
+        }
+        data = await self.request_json(client, "GET", f"{self.base_url}/api/v2/procnotices", params=params)
+        items: List[Dict[str, Any]] = data.get("procnotices") or []
+        # the API has no reliable "since" filter; results are newest first, so stop at `since`
+        fresh = [i for i in items if since is None or not _older(i.get("noticedate"), since)]
+        total = int(data.get("total") or 0)
+        done = not items or len(fresh) < len(items) or offset + len(items) >= total
+        return Page(fresh, None if done else str(offset + len(items)), data)
+
+    def normalize(self, item: Dict[str, Any]) -> Optional[Dict]:
+        notice_id = item.get("id")
+        if not notice_id:
+            return None
+        return normalize_record(
+            source=self.source,
+            external_id=str(notice_id),
+            title=item.get("bid_description") or item.get("project_name") or "",
+            description=item.get("project_name") or "",
+            url=item.get("url") or f"https://projects.worldbank.org/en/projects-operations/procurement-detail/{notice_id}",
+            country=item.get("project_ctry_name"),
+            language=None,
+            cpv=None,
+            budget=None,
+            deadline=item.get("submission_deadline_date"),
+            published_at=item.get("noticedate"),
+        )
+
+
+@register
+class SamGovConnector(Connector):
+    """SAM.gov contract opportunities API v2 (needs SAM_GOV_API_KEY), offset pagination."""
+
+    portal = "SAM.gov"
+    source = "SAM_GOV"
+    base_url = "https://api.sam.gov"
+    token_env = "SAM_GOV_API_KEY"
+    rate = 0.5
+    page_size = 1000
+    # postedFrom is mandatory and the window may not exceed one year
+    default_window_days = 30
+
+    async def fetch_page(self, client: httpx.AsyncClient, stream: str, cursor: Optional[str], since: Optional[datetime]) -> Page:
+        offset = int(cursor or 0)
+        now = datetime.now(timezone.utc)
+        start = since or now - timedelta(days=self.default_window_days)
+        params = {
+            "api_key": self.token,
+            "postedFrom": f"{start:%m/%d/%Y}",
+            "postedTo": f"{now:%m/%d/%Y}",
+            "limit": self.page_size,
+            "offset": offset,
+        }
+        data = await self.request_json(client, "GET", f"{self.base_url}/opportunities/v2/search", params=params)
+        items = data.get("opportunitiesData") or []
+        total = int(data.get("totalRecords") or 0)
+        done = not items or offset + len(items) >= total
+        return Page(items, None if done else str(offset + len(items)), data)
+
+    def normalize(self, item: Dict[str, Any]) -> Optional[Dict]:
+        notice_id = item.get("noticeId")
+        if not notice_id:
+            return None
+        place = (item.get("placeOfPerformance") or {}).get("country") or {}
+        return normalize_record(
+            source=self.source,
+            external_id=notice_id,
+            title=item.get("title") or "",
+            description=item.get("solicitationNumber") or "",
+            url=item.get("uiLink") or f"https://sam.gov/opp/{notice_id}/view",
+            country=place.get("code") or "USA",
+            language="en",
+            cpv=None,
+            budget=(item.get("award") or {}).get("amount"),
+            deadline=item.get("responseDeadLine"),
+            published_at=item.get("postedDate"),
+        )
+
+
+@register
+class UkFtsConnector(Connector):
+    """UK Find a Tender OCDS release packages; the cursor is the API's next link."""
+
+    portal = "UK FTS"
+    source = "UK_FTS"
+    base_url = "https://www.find-tender.service.gov.uk"
+    page_size = 100
+
+    async def fetch_page(self, client: httpx.AsyncClient, stream: str, cursor: Optional[str], since: Optional[datetime]) -> Page:
+        if cursor:
+            data = await self.request_json(client, "GET", cursor)
+        else:
+            params: Dict[str, Any] = {"limit": self.page_size}
+            if since is not None:
+                params["updatedFrom"] = f"{since:%Y-%m-%dT%H:%M:%S}"
+            data = await self.request_json(client, "GET", f"{self.base_url}/api/1.0/ocdsReleasePackages", params=params)
+        items = data.get("releases") or []
+        next_url = (data.get("links") or {}).get("next")
+        return Page(items, next_url if items else None, data)
+
+    def normalize(self, item: Dict[str, Any]) -> Optional[Dict]:
+        ocid = item.get("ocid")
+        tender = item.get("tender") or {}
+        if not ocid or not tender.get("title"):
+            return None
+        notice = item.get("id") or ocid
+        return normalize_record(
+            source=self.source,
+            external_id=ocid,
+            title=tender.get("title") or "",
+            description=tender.get("description") or "",
+            url=f"{self.base_url}/Notice/{notice}",
+            country="GB",
+            language="en",
+            cpv=(tender.get("classification") or {}).get("id"),
+            budget=(tender.get("value") or {}).get("amount"),
+            deadline=(tender.get("tenderPeriod") or {}).get("endDate"),
+            published_at=item.get("date"),
+        )
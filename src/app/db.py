@@ -1,7 +1,14 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 from .config import settings
-engine = create_engine(settings.database_url, future=True, pool_pre_ping=True)
+engine = create_engine(settings.database_url, future=True, **settings.pool_options)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+# for the API: handlers await queries instead of blocking the event loop or a threadpool worker
+async_engine = create_async_engine(settings.async_database_url, **settings.pool_options)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False, class_=AsyncSession)
 class Base(DeclarativeBase):
     pass
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,279 @@
+"""Near-duplicate clustering of tenders_raw across sources (MinHash + LSH).
+
+The same tender arrives via TED, aggregators, email alerts and portals with
+different URLs and external ids. This stage gives every row a `cluster_id`:
+the cluster of the most similar earlier row if their (estimated) Jaccard
+similarity on title + description word shingles is at least `THRESHOLD`,
+else its own id.
+
+- each row gets a `NUM_HASHES`-value MinHash signature over word
+  `SHINGLE`-grams of its accent-folded, lower-cased title and description
+  (one-permutation hashing with densification: one hash per shingle instead
+  of one per shingle and permutation)
+- the signature is cut into `BANDS` bands; each band hashes to one bucket key
+  in lsh_buckets (primary key bucket, raw_id)
+- candidates for a chunk of new rows come from one `bucket = ANY(:keys)`
+  lookup, so a row is only compared with the few rows sharing a bucket, never
+  with the whole table; candidates are confirmed by signature similarity
+
+Rows with `cluster_id IS NULL` are pending; the upsert resets it when title or
+description change, so edited tenders are re-clustered on the next run.
+
+    python -m app.dedup [--chunk-size 1000]
+"""
+import hashlib
+import re
+import struct
+import unicodedata
+import zlib
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.models import TenderRaw, TenderSignature
+
+NUM_HASHES = 64  # power of two: the top bits of a shingle hash pick its bin
+BANDS = 16
+ROWS = NUM_HASHES // BANDS
+SHINGLE = 3
+# estimated Jaccard needed to join a cluster; with 16 bands x 4 rows pairs at
+# 0.5 share a bucket with ~65% probability, pairs at 0.8 with ~100%
+THRESHOLD = 0.5
+
+_BIN_SHIFT = 64 - (NUM_HASHES.bit_length() - 1)
+_MASK64 = (1 << 64) - 1
+_MAX_HASH = (1 << 32) - 1
+_EMPTY = _MAX_HASH + 1
+# fixed constants: stored signatures must stay comparable across runs
+_MIX = 0x9E3779B97F4A7C15
+_ROTATE = 0x5BD1E995
+_SIG_STRUCT = struct.Struct(f"<{NUM_HASHES}I")
+_WORD_RE = re.compile(r"\w+")
+
+Signature = Tuple[int, ...]
+
+
+def tokens(title: Optional[str], description: Optional[str]) -> List[str]:
+    text_ = f"{title or ''} {description or ''}".lower()
+    if not text_.isascii():
+        text_ = "".join(ch for ch in unicodedata.normalize("NFKD", text_) if not unicodedata.combining(ch))
+    return _WORD_RE.findall(text_)
+
+
+def shingles(words: Sequence[str], k: int = SHINGLE) -> Set[int]:
+    """32-bit hashes of the word k-grams (the whole text if it is shorter than k words)."""
+    if not words:
+        return set()
+    if len(words) < k:
+        return {zlib.crc32(" ".join(words).encode("utf-8"))}
+    return {zlib.crc32(" ".join(words[i : i + k]).encode("utf-8")) for i in range(len(words) - k + 1)}
+
+
+def minhash(hashes: Iterable[int]) -> Optional[Signature]:
+    """One-permutation MinHash: each hash lands in one of NUM_HASHES bins, each bin keeps its minimum.
+
+    Empty bins borrow the value of the next non-empty bin to the right, offset
+    by the distance (rotation densification), so short texts still yield a
+    full signature.
+    """
+    bins = [_EMPTY] * NUM_HASHES
+    for h in hashes:
+        x = (h * _MIX) & _MASK64
+        b = x >> _BIN_SHIFT
+        v = (x >> 16) & _MAX_HASH
+        if v < bins[b]:
+            bins[b] = v
+    if all(v == _EMPTY for v in bins):
+        return None
+    signature = list(bins)
+    for i, v in enumerate(bins):
+        d = 0
+        while v == _EMPTY:
+            d += 1
+            v = bins[(i + d) % NUM_HASHES]
+        if d:
+            signature[i] = (v + d * _ROTATE) & _MAX_HASH
+    return tuple(signature)
+
+
+def signature_for(title: Optional[str], description: Optional[str]) -> Optional[Signature]:
+    return minhash(shingles(tokens(title, description)))
+
+
+def band_keys(sig: Signature) -> List[int]:
+    """One signed 64-bit bucket key per band; the band number is part of the key."""
+    keys = []
+    for band in range(BANDS):
+        chunk = struct.pack(f"<H{ROWS}I", band, *sig[band * ROWS : (band + 1) * ROWS])
+        keys.append(int.from_bytes(hashlib.blake2b(chunk, digest_size=8).digest(), "little", signed=True))
+    return keys
+
+
+def similarity(a: Signature, b: Signature) -> float:
+    """Estimated Jaccard similarity of the two shingle sets."""
+    return sum(x == y for x, y in zip(a, b)) / NUM_HASHES
+
+
+def pack(sig: Signature) -> bytes:
+    return _SIG_STRUCT.pack(*sig)
+
+
+def unpack(blob: bytes) -> Signature:
+    return _SIG_STRUCT.unpack(blob)
+
+
+class _Index:
+    """In-memory LSH buckets for one chunk: its own rows plus their stored candidates."""
+
+    def __init__(self):
+        self.buckets: Dict[int, List[int]] = {}
+        self.members: Dict[int, Tuple[Signature, int]] = {}  # raw_id -> (signature, cluster_id)
+
+    def add(self, raw_id: int, sig: Signature, keys: Sequence[int], cluster_id: int) -> None:
+        self.members[raw_id] = (sig, cluster_id)
+        for key in keys:
+            self.buckets.setdefault(key, []).append(raw_id)
+
+    def best_match(self, sig: Signature, keys: Sequence[int]) -> Optional[int]:
+        """Cluster of the most similar candidate at or above THRESHOLD (lowest cluster id on ties)."""
+        seen: Set[int] = set()
+        best: Optional[Tuple[float, int]] = None
+        for key in keys:
+            for raw_id in self.buckets.get(key, ()):
+                if raw_id in seen:
+                    continue
+                seen.add(raw_id)
+                other, cluster_id = self.members[raw_id]
+                score = similarity(sig, other)
+                if score >= THRESHOLD and (best is None or (score, -cluster_id) > (best[0], -best[1])):
+                    best = (score, cluster_id)
+        return best[1] if best else None
+
+
+def _candidates(db: Session, keys: List[int]) -> Sequence:
+    """Clustered rows sharing at least one bucket with `keys` (pending rows are not candidates)."""
+    return db.execute(
+        text(
+            "SELECT s.raw_id, s.signature, r.cluster_id "
+            "FROM tender_signatures s JOIN tenders_raw r ON r.id = s.raw_id "
+            "WHERE r.cluster_id IS NOT NULL AND s.raw_id IN ("
+            " SELECT b.raw_id FROM lsh_buckets b WHERE b.bucket = ANY(CAST(:keys AS bigint[])))"
+        ),
+        {"keys": keys},
+    ).all()
+
+
+def _store(db: Session, sigs: Dict[int, Signature], keys: Dict[int, List[int]], assigned: Dict[int, int]) -> None:
+    if sigs:
+        stmt = pg_insert(TenderSignature).values([{"raw_id": i, "signature": pack(sig)} for i, sig in sigs.items()])
+        db.execute(
+            stmt.on_conflict_do_update(index_elements=[TenderSignature.raw_id], set_={"signature": stmt.excluded.signature})
+        )
+    # rows being re-clustered drop the buckets of their old text
+    db.execute(text("DELETE FROM lsh_buckets WHERE raw_id = ANY(CAST(:ids AS integer[]))"), {"ids": list(assigned)})
+    pairs = [(key, raw_id) for raw_id, ks in keys.items() for key in set(ks)]
+    if pairs:
+        db.execute(
+            text(
+                "INSERT INTO lsh_buckets (bucket, raw_id) "
+                "SELECT * FROM unnest(CAST(:buckets AS bigint[]), CAST(:ids AS integer[]))"
+            ),
+            {"buckets": [p[0] for p in pairs], "ids": [p[1] for p in pairs]},
+        )
+    # plain SQL: an ORM update would bump updated_at and trigger rescoring
+    db.execute(
+        text(
+            "UPDATE tenders_raw t SET cluster_id = v.cluster_id "
+            "FROM unnest(CAST(:ids AS integer[]), CAST(:clusters AS integer[])) AS v(id, cluster_id) "
+            "WHERE t.id = v.id"
+        ),
+        {"ids": list(assigned), "clusters": list(assigned.values())},
+    )
+
+
+def cluster_rows(db: Session, rows: Sequence) -> Dict[int, int]:
+    """Assign clusters to `rows` (id, title, description) and store their signatures and buckets.
+
+    Returns {raw_id: cluster_id}. Runs in the session's transaction (caller commits).
+    """
+    sigs: Dict[int, Signature] = {}
+    for r in rows:
+        sig = signature_for(r.title, r.description)
+        if sig is not None:
+            sigs[r.id] = sig
+    keys = {raw_id: band_keys(sig) for raw_id, sig in sigs.items()}
+
+    index = _Index()
+    all_keys = sorted({k for ks in keys.values() for k in ks})
+    if all_keys:
+        for c in _candidates(db, all_keys):
+            sig = unpack(c.signature)
+            index.add(c.raw_id, sig, band_keys(sig), c.cluster_id)
+
+    assigned: Dict[int, int] = {}
+    for r in rows:
+        if r.id not in sigs:
+            assigned[r.id] = r.id
+            continue
+        cluster_id = index.best_match(sigs[r.id], keys[r.id]) or r.id
+        index.add(r.id, sigs[r.id], keys[r.id], cluster_id)
+        assigned[r.id] = cluster_id
+
+    _store(db, sigs, keys, assigned)
+    return assigned
+
+
+def prune_buckets(db: Session) -> int:
+    """Delete buckets of tenders that no longer exist (full scan; run occasionally)."""
+    result = db.execute(
+        text("DELETE FROM lsh_buckets b WHERE NOT EXISTS (SELECT 1 FROM tender_signatures s WHERE s.raw_id = b.raw_id)")
+    )
+    db.commit()
+    return result.rowcount
+
+
+def run_clustering(db: Session, chunk_size: int = 1000) -> Tuple[int, int]:
+    """Cluster all pending rows in id order, one commit per chunk.
+
+    Returns (rows clustered, rows that joined an existing cluster).
+    """
+    clustered = joined = 0
+    while True:
+        rows = db.execute(
+            select(TenderRaw.id, TenderRaw.title, TenderRaw.description)
+            .where(TenderRaw.cluster_id.is_(None))
+            .order_by(TenderRaw.id)
+            .limit(chunk_size)
+        ).all()
+        if not rows:
+            return clustered, joined
+        assigned = cluster_rows(db, rows)
+        db.commit()
+        clustered += len(assigned)
+        joined += sum(1 for raw_id, cluster_id in assigned.items() if raw_id != cluster_id)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import argparse
+
+    from app.db import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Assign near-duplicate clusters to new tenders_raw rows.")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--prune", action="store_true", help="also delete buckets of deleted tenders")
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        clustered, joined = run_clustering(db, chunk_size=args.chunk_size)
+        if args.prune:
+            print(f"Pruned {prune_buckets(db)} stale buckets.")
+    finally:
+        db.close()
+    print(f"Clustered {clustered} rows; {joined} joined an existing cluster.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""Bulk import of archived alert emails (.eml directories, mbox files, Maildir).
+
+Messages are streamed from disk (mbox files are memory-mapped and split on
+"From " lines), parsed in a process pool with `parse_eml_bytes` /
+`extract_records_from_body`, and written with the set-based dedup insert in
+large batches, one commit per batch.
+
+    python -m app.email_parser.bulk_import archive.mbox Maildir/ exports/ --workers 8
+"""
+import argparse
+import mmap
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import structlog
+from sqlalchemy.orm import Session
+
+from app.email_parser.parser import (
+    extract_records_from_body,
+    insert_normalized_with_dedup,
+    normalize_email_records,
+    parse_eml_bytes,
+)
+
+log = structlog.get_logger()
+
+MBOX_SEPARATOR = b"\nFrom "
+
+
+# -------------------------------------------------------------------------
+# Message sources
+# -------------------------------------------------------------------------
+
+
+def iter_eml_dir(path: Path) -> Iterator[bytes]:
+    for p in sorted(path.rglob("*.eml")):
+        yield p.read_bytes()
+
+
+def _unescape_mbox(raw: bytes) -> bytes:
+    # mboxo/mboxrd quote body lines starting with "From "
+    return raw.replace(b"\n>From ", b"\nFrom ")
+
+
+def iter_mbox(path: Path) -> Iterator[bytes]:
+    """Yield messages of an mbox file without loading it into memory."""
+    with path.open("rb") as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            return
+        with mm:
+            if mm[:5] == b"From ":
+                start = 0
+            else:
+                first = mm.find(MBOX_SEPARATOR)
+                if first < 0:
+                    return
+                start = first + 1
+            while start < len(mm):
+                end = mm.find(MBOX_SEPARATOR, start)
+                stop = len(mm) if end < 0 else end + 1
+                body_start = mm.find(b"\n", start, stop)  # skip the "From " separator line
+                if body_start >= 0:
+                    yield _unescape_mbox(mm[body_start + 1 : stop])
+                start = stop
+
+
+def iter_maildir(path: Path) -> Iterator[bytes]:
+    for sub in ("cur", "new"):
+        d = path / sub
+        if d.is_dir():
+            for p in sorted(d.iterdir()):
+                if p.is_file() and not p.name.startswith("."):
+                    yield p.read_bytes()
+
+
+def is_maildir(path: Path) -> bool:
+    return path.is_dir() and (path / "cur").is_dir() and (path / "new").is_dir()
+
+
+def iter_messages(paths: Iterable[Path]) -> Iterator[bytes]:
+    """Messages from every path: Maildir, directory of .eml files, single .eml, or mbox."""
+    for path in paths:
+        path = Path(path)
+        if is_maildir(path):
+            yield from iter_maildir(path)
+        elif path.is_dir():
+            yield from iter_eml_dir(path)
+        elif path.suffix.lower() == ".eml":
+            yield path.read_bytes()
+        else:
+            yield from iter_mbox(path)
+
+
+def _chunked(messages: Iterator[bytes], size: int) -> Iterator[List[bytes]]:
+    chunk: List[bytes] = []
+    for raw in messages:
+        chunk.append(raw)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# -------------------------------------------------------------------------
+# Parse (worker side) + write (parent side)
+# -------------------------------------------------------------------------
+
+
+def parse_messages(raw_messages: List[bytes], source: str) -> List[Dict]:
+    """Normalized records for a chunk of raw messages; unparsable messages are skipped."""
+    records: List[Dict] = []
+    for raw in raw_messages:
+        try:
+            _, body = parse_eml_bytes(raw)
+            records.extend(normalize_email_records(source, extract_records_from_body(body)))
+        except Exception:
+            continue
+    return records
+
+
+@dataclass
+class ImportStats:
+    messages: int = 0
+    records: int = 0
+    inserted: int = 0
+    seconds: float = 0.0
+
+    @property
+    def messages_per_second(self) -> float:
+        return self.messages / self.seconds if self.seconds else 0.0
+
+
+def _parsed_chunks(
+    chunks: Iterator[List[bytes]],
+    source: str,
+    workers: int,
+) -> Iterator[Tuple[int, List[Dict]]]:
+    """(n_messages, records) per chunk, parsed inline or across a process pool."""
+    if workers <= 1:
+        for chunk in chunks:
+            yield len(chunk), parse_messages(chunk, source)
+        return
+
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        pending: Deque[Tuple[int, Future]] = deque()
+        for chunk in chunks:
+            pending.append((len(chunk), pool.submit(parse_messages, chunk, source)))
+            # bounded read-ahead: never hold more than a few chunks per worker
+            if len(pending) >= 2 * workers:
+                n, fut = pending.popleft()
+                yield n, fut.result()
+        while pending:
+            n, fut = pending.popleft()
+            yield n, fut.result()
+
+
+def bulk_import(
+    db: Session,
+    paths: Iterable[Path],
+    source: str = "EMAIL_ALERT",
+    workers: int = 1,
+    batch_size: int = 5000,
+    parse_chunk: int = 200,
+    progress_every: float = 10.0,
+) -> ImportStats:
+    """Import every message under `paths`; commits once per `batch_size` records."""
+    stats = ImportStats()
+    started = last_report = time.monotonic()
+    pending: List[Dict] = []
+
+    def flush() -> None:
+        if pending:
+            stats.inserted += insert_normalized_with_dedup(db, source, pending)
+            pending.clear()
+
+    chunks = _chunked(iter_messages(paths), parse_chunk)
+    for n, records in _parsed_chunks(chunks, source, workers):
+        stats.messages += n
+        stats.records += len(records)
+        pending.extend(records)
+        if len(pending) >= batch_size:
+            flush()
+        now = time.monotonic()
+        if now - last_report >= progress_every:
+            stats.seconds = now - started
+            log.info(
+                "bulk_import_progress",
+                messages=stats.messages,
+                inserted=stats.inserted,
+                msgs_per_sec=round(stats.messages_per_second, 1),
+            )
+            last_report = now
+    flush()
+
+    stats.seconds = time.monotonic() - started
+    return stats
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from app.db import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Bulk import archived tender alert emails.")
+    parser.add_argument("paths", nargs="+", type=Path, help=".eml dirs/files, mbox files or Maildirs")
+    parser.add_argument("--source", default="EMAIL_ALERT")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--batch-size", type=int, default=5000, help="records per commit")
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        stats = bulk_import(db, args.paths, source=args.source, workers=args.workers, batch_size=args.batch_size)
+    finally:
+        db.close()
+    print(
+        f"{stats.messages} messages, {stats.records} records, {stats.inserted} inserted "
+        f"in {stats.seconds:.1f}s ({stats.messages_per_second:.0f} msgs/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
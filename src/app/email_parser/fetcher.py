@@ -0,0 +1,126 @@
+"""Concurrent IMAP fetch across several accounts and folders.
+
+One thread per (account, folder) pulls new messages through a shared
+ImapConnectionPool; every batch goes onto a single queue that the calling
+thread drains into the dedup insert. A folder's sync state only advances after
+its batch has been ingested, so nothing fetched is lost if ingest fails.
+"""
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import structlog
+from sqlalchemy.orm import Session
+
+from app.db import SessionLocal
+from app.email_parser.imap_client import iter_folder_batches
+from app.email_parser.imap_pool import ImapAccount, ImapConnectionPool, get_imap_accounts
+from app.email_parser.parser import process_eml_batch
+
+log = structlog.get_logger()
+
+
+@dataclass
+class FetchedBatch:
+    account: ImapAccount
+    folder: str
+    messages: List[Tuple[int, bytes]]
+    done: threading.Event = field(default_factory=threading.Event)
+    failed: bool = False
+
+
+class IngestFailed(RuntimeError):
+    pass
+
+
+_FINISHED = object()
+
+
+def _fetch_folder(
+    pool: ImapConnectionPool,
+    account: ImapAccount,
+    folder: str,
+    out: "queue.Queue",
+    batch_size: int,
+    session_factory: Callable[[], Session],
+) -> None:
+    db = session_factory()
+    try:
+        with pool.connection(account) as mail:
+            for messages in iter_folder_batches(db, mail, account.key, folder, batch_size=batch_size):
+                if not messages:
+                    continue
+                batch = FetchedBatch(account, folder, messages)
+                out.put(batch)
+                # wait for ingest before the generator commits the new sync state
+                batch.done.wait()
+                if batch.failed:
+                    raise IngestFailed(f"ingest failed for {account.key}/{folder}")
+    finally:
+        db.close()
+        out.put(_FINISHED)
+
+
+def fetch_and_ingest(
+    accounts: Optional[Sequence[ImapAccount]] = None,
+    source: str = "EMAIL_ALERT",
+    workers: int = 4,
+    batch_size: int = 100,
+    pool: Optional[ImapConnectionPool] = None,
+    session_factory: Callable[[], Session] = SessionLocal,
+    on_batch: Optional[Callable[[int], None]] = None,
+) -> int:
+    """Fetch new mail from every configured account/folder concurrently and ingest it.
+
+    Returns the number of tenders_raw rows inserted. Pass a long-lived `pool` to
+    keep connections open between runs; otherwise one is created and closed here.
+    `on_batch` is called with the rows inserted by every ingested batch.
+    """
+    accounts = list(accounts) if accounts is not None else get_imap_accounts()
+    own_pool = pool is None
+    pool = pool or ImapConnectionPool()
+    tasks = [(account, folder) for account in accounts for folder in account.folders]
+
+    # at most one batch per folder task is in flight (producers wait for `done`)
+    batches: "queue.Queue" = queue.Queue()
+    inserted = 0
+    db = session_factory()
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="imap") as executor:
+            futures = {
+                executor.submit(_fetch_folder, pool, account, folder, batches, batch_size, session_factory): (
+                    account,
+                    folder,
+                )
+                for account, folder in tasks
+            }
+            remaining = len(tasks)
+            while remaining:
+                batch = batches.get()
+                if batch is _FINISHED:
+                    remaining -= 1
+                    continue
+                try:
+                    n = process_eml_batch(db, [raw for _, raw in batch.messages], source=source)
+                except Exception:
+                    db.rollback()
+                    batch.failed = True
+                    log.exception("imap_ingest_failed", account=batch.account.key, folder=batch.folder)
+                else:
+                    inserted += n
+                    if on_batch is not None and n:
+                        on_batch(n)
+                finally:
+                    batch.done.set()
+
+            for fut, (account, folder) in futures.items():
+                exc = fut.exception()
+                if exc is not None:
+                    log.error("imap_fetch_failed", account=account.key, folder=folder, error=str(exc))
+    finally:
+        db.close()
+        if own_pool:
+            pool.close()
+    return inserted
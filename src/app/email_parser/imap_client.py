@@ -1,12 +1,28 @@
 import os
+import re
 import imaplib
-from typing import List, Tuple
+from typing import Iterator, List, Optional, Tuple
+
+import structlog
+from sqlalchemy.orm import Session
+
+from app.models import ImapSyncState
+
+log = structlog.get_logger()
+
+UID_RE = re.compile(rb"UID (\d+)")
+# syncs that may find a UID missing from its FETCH before the watermark moves past it
+MAX_FETCH_ATTEMPTS = 3
 
 
 class ImapConfigError(RuntimeError):
     pass
 
 
+class ImapSyncError(RuntimeError):
+    pass
+
+
 def get_imap_config() -> Tuple[str, int, str, str, str]:
     """Read IMAP config from environment.
 
@@ -31,16 +47,21 @@ def get_imap_config() -> Tuple[str, int, str, str, str]:
     return host, port, user, password, folder
 
 
+def connect(host: str, port: int, user: str, password: str) -> imaplib.IMAP4:
+    mail = imaplib.IMAP4_SSL(host, port)
+    mail.login(user, password)
+    return mail
+
+
 def fetch_unseen_emails() -> List[bytes]:
     """Connect to IMAP and fetch UNSEEN messages (RFC822 bytes).
 
     This is not used in unit tests (they operate on .eml files),
-    but can be used in production.
+    but can be used in production. Prefer `sync_folder` for regular runs.
     """
     host, port, user, password, folder = get_imap_config()
 
-    mail = imaplib.IMAP4_SSL(host, port)
-    mail.login(user, password)
+    mail = connect(host, port, user, password)
     mail.select(folder)
 
     typ, data = mail.search(None, "UNSEEN")
@@ -60,3 +81,140 @@ def fetch_unseen_emails() -> List[bytes]:
 
     mail.logout()
     return messages
+
+
+# -------------------------------------------------------------------------
+# Incremental UID sync
+# -------------------------------------------------------------------------
+
+
+def _quote(folder: str) -> str:
+    if folder.startswith('"') or not re.search(r'[\s"\\]', folder):
+        return folder
+    return '"' + folder.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _uid_set(uids: List[int]) -> str:
+    """[1, 2, 3, 7, 9, 10] -> '1:3,7,9:10' (uids sorted)."""
+    parts: List[str] = []
+    start = prev = uids[0]
+    for uid in uids[1:]:
+        if uid == prev + 1:
+            prev = uid
+            continue
+        parts.append(f"{start}:{prev}" if start != prev else str(start))
+        start = prev = uid
+    parts.append(f"{start}:{prev}" if start != prev else str(start))
+    return ",".join(parts)
+
+
+def select_folder(mail: imaplib.IMAP4, folder: str) -> Optional[int]:
+    """Select `folder` read-only and return its UIDVALIDITY."""
+    typ, data = mail.select(_quote(folder), readonly=True)
+    if typ != "OK":
+        raise ImapSyncError(f"cannot select {folder!r}: {data!r}")
+    _, data = mail.response("UIDVALIDITY")
+    if data and data[0]:
+        return int(data[0])
+    return None
+
+
+def search_uids_since(mail: imaplib.IMAP4, last_uid: int) -> List[int]:
+    """UIDs greater than `last_uid`, ascending."""
+    typ, data = mail.uid("SEARCH", None, f"UID {last_uid + 1}:*")
+    if typ != "OK":
+        raise ImapSyncError(f"UID SEARCH failed: {data!r}")
+    if not data or not data[0]:
+        return []
+    # "n:*" always matches the newest message, even when its UID is < n
+    return sorted(u for u in map(int, data[0].split()) if u > last_uid)
+
+
+def fetch_uids(mail: imaplib.IMAP4, uids: List[int]) -> List[Tuple[int, bytes]]:
+    """One UID FETCH for a batch; BODY.PEEK[] leaves the \\Seen flag alone."""
+    typ, data = mail.uid("FETCH", _uid_set(uids), "(UID BODY.PEEK[])")
+    if typ != "OK":
+        raise ImapSyncError(f"UID FETCH failed: {data!r}")
+    data = data or []
+    messages: List[Tuple[int, bytes]] = []
+    for i, part in enumerate(data):
+        if isinstance(part, tuple):
+            m = UID_RE.search(part[0])
+            # servers may send UID after the literal: (b'1 (BODY[] {n}', raw), b' UID 5)'
+            if not m and i + 1 < len(data) and isinstance(data[i + 1], bytes):
+                m = UID_RE.search(data[i + 1])
+            if m:
+                messages.append((int(m.group(1)), part[1]))
+    messages.sort(key=lambda m: m[0])
+    return messages
+
+
+def iter_folder_batches(
+    db: Session,
+    mail: imaplib.IMAP4,
+    account: str,
+    folder: str = "INBOX",
+    batch_size: int = 100,
+    max_attempts: int = MAX_FETCH_ATTEMPTS,
+) -> Iterator[List[Tuple[int, bytes]]]:
+    """Yield batches of (uid, raw_message) newer than the stored sync state.
+
+    State (UIDVALIDITY + last UID) is kept per account/folder in imap_sync_state.
+    A changed UIDVALIDITY means the server renumbered the folder, so it is read
+    from the start again (ingest dedup absorbs the repeats). The last UID is
+    committed when the consumer asks for the next batch, so an interrupted sync
+    replays at most one batch. A UID the FETCH did not return stops the sync
+    there and the next one asks for it again (a message expunged in the
+    meantime is simply no longer found); once `max_attempts` syncs in a row
+    have missed it, it is logged as `imap_uid_skipped` and the watermark moves
+    past it, so one message the server never returns cannot stall the folder.
+    """
+    state = db.get(ImapSyncState, (account, folder))
+    if state is None:
+        state = ImapSyncState(account=account, folder=folder, last_uid=0, missing_attempts=0)
+        db.add(state)
+
+    uidvalidity = select_folder(mail, folder)
+    if state.uidvalidity != uidvalidity:
+        state.uidvalidity = uidvalidity
+        state.last_uid = 0
+        state.missing_uid, state.missing_attempts = None, 0
+    db.commit()
+
+    uids = search_uids_since(mail, state.last_uid or 0)
+    for i in range(0, len(uids), batch_size):
+        batch = uids[i : i + batch_size]
+        messages = fetch_uids(mail, batch)
+        yield messages
+        returned = {uid for uid, _ in messages}
+        stuck = False
+        for uid in batch:
+            if uid not in returned:
+                attempts = state.missing_attempts + 1 if state.missing_uid == uid else 1
+                if attempts < max_attempts:
+                    state.missing_uid, state.missing_attempts = uid, attempts
+                    stuck = True
+                    break
+                log.warning("imap_uid_skipped", account=account, folder=folder, uid=uid, attempts=attempts)
+            state.last_uid = uid
+            if state.missing_uid is not None and state.missing_uid <= uid:
+                state.missing_uid, state.missing_attempts = None, 0
+        db.commit()
+        if stuck:
+            return
+
+
+def sync_folder(
+    db: Session,
+    mail: imaplib.IMAP4,
+    account: str,
+    folder: str = "INBOX",
+    batch_size: int = 100,
+    max_attempts: int = MAX_FETCH_ATTEMPTS,
+) -> Iterator[Tuple[int, bytes]]:
+    """Yield (uid, raw_message) for messages newer than the stored sync state.
+
+    See `iter_folder_batches`; the state advances once a whole batch has been consumed.
+    """
+    for batch in iter_folder_batches(db, mail, account, folder, batch_size=batch_size, max_attempts=max_attempts):
+        yield from batch
@@ -0,0 +1,197 @@
+import imaplib
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import structlog
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
+
+from app.email_parser.imap_client import ImapConfigError, connect, get_imap_config
+
+log = structlog.get_logger()
+
+# Errors after which a connection is dropped and a fresh one is opened.
+CONNECTION_ERRORS = (imaplib.IMAP4.abort, OSError, EOFError)
+
+
+@dataclass(frozen=True)
+class ImapAccount:
+    name: str
+    host: str
+    port: int
+    user: str
+    password: str
+    folders: Tuple[str, ...] = ("INBOX",)
+
+    @property
+    def key(self) -> str:
+        return f"{self.user}@{self.host}"
+
+
+def _folders(value: str) -> Tuple[str, ...]:
+    return tuple(f.strip() for f in value.split(",") if f.strip()) or ("INBOX",)
+
+
+def get_imap_accounts() -> List[ImapAccount]:
+    """Read the mailboxes to poll from the environment.
+
+    IMAP_ACCOUNTS (comma-separated names) enables several accounts; each NAME reads
+    IMAP_<NAME>_HOST / _USER / _PASSWORD and optional _PORT (993) and
+    _FOLDERS (comma-separated, default INBOX).
+
+    Without IMAP_ACCOUNTS the single account from `get_imap_config` is used,
+    with IMAP_FOLDERS overriding IMAP_FOLDER.
+    """
+    names = [n.strip() for n in os.getenv("IMAP_ACCOUNTS", "").split(",") if n.strip()]
+    if not names:
+        host, port, user, password, folder = get_imap_config()
+        folders = _folders(os.getenv("IMAP_FOLDERS", folder))
+        return [ImapAccount("default", host, port, user, password, folders)]
+
+    accounts: List[ImapAccount] = []
+    for name in names:
+        prefix = f"IMAP_{name.upper()}_"
+        host = os.getenv(prefix + "HOST")
+        user = os.getenv(prefix + "USER")
+        password = os.getenv(prefix + "PASSWORD")
+        if not host or not user or not password:
+            raise ImapConfigError(f"{prefix}HOST, {prefix}USER, {prefix}PASSWORD must be set")
+        accounts.append(
+            ImapAccount(
+                name=name,
+                host=host,
+                port=int(os.getenv(prefix + "PORT", "993")),
+                user=user,
+                password=password,
+                folders=_folders(os.getenv(prefix + "FOLDERS", "INBOX")),
+            )
+        )
+    return accounts
+
+
+class ImapConnectionPool:
+    """Long-lived, authenticated IMAP connections shared across fetch threads.
+
+    - at most `max_per_host` connections are open per server; when the limit is
+      reached, idle connections of other accounts on that host are closed first,
+      otherwise callers wait
+    - connections idle for longer than `keepalive` seconds get a NOOP before
+      reuse; a failed NOOP (or a dropped connection while in use) means reconnect
+    - connecting retries with exponential backoff (tenacity)
+    """
+
+    def __init__(
+        self,
+        max_per_host: int = 2,
+        keepalive: float = 300.0,
+        connect_fn: Callable[[str, int, str, str], imaplib.IMAP4] = connect,
+        connect_attempts: int = 5,
+    ):
+        self.max_per_host = max_per_host
+        self.keepalive = keepalive
+        self._cond = threading.Condition()
+        self._idle: Dict[ImapAccount, List[Tuple[imaplib.IMAP4, float]]] = defaultdict(list)
+        self._open: Dict[str, int] = defaultdict(int)
+        self._closed = False
+        self._connect = retry(
+            reraise=True,
+            stop=stop_after_attempt(connect_attempts),
+            wait=wait_exponential(multiplier=1, max=30),
+            retry=retry_if_exception_type(CONNECTION_ERRORS),
+        )(connect_fn)
+
+    def _pop_idle_on_host(self, host: str):
+        for account, conns in self._idle.items():
+            if account.host == host and conns:
+                return conns.pop()[0]
+        return None
+
+    def _checkout(self, account: ImapAccount) -> Tuple[Optional[imaplib.IMAP4], float]:
+        """Return (idle connection, last_used), or (None, 0) with a slot reserved for a new one."""
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("pool is closed")
+                idle = self._idle[account]
+                if idle:
+                    mail, last_used = idle.pop()
+                    return mail, last_used
+                if self._open[account.host] < self.max_per_host:
+                    self._open[account.host] += 1
+                    return None, 0.0
+                victim = self._pop_idle_on_host(account.host)
+                if victim is not None:
+                    # reuse the victim's slot for this account
+                    _logout(victim)
+                    return None, 0.0
+                self._cond.wait()
+
+    def _release_slot(self, host: str) -> None:
+        with self._cond:
+            self._open[host] -= 1
+            self._cond.notify_all()
+
+    def _alive(self, mail: imaplib.IMAP4, last_used: float) -> bool:
+        if time.monotonic() - last_used < self.keepalive:
+            return True
+        try:
+            typ, _ = mail.noop()
+            return typ == "OK"
+        except CONNECTION_ERRORS:
+            return False
+
+    @contextmanager
+    def connection(self, account: ImapAccount) -> Iterator[imaplib.IMAP4]:
+        mail, last_used = self._checkout(account)
+        if mail is not None and not self._alive(mail, last_used):
+            log.info("imap_reconnect", account=account.key)
+            _logout(mail)
+            mail = None
+        if mail is None:
+            try:
+                mail = self._connect(account.host, account.port, account.user, account.password)
+            except Exception:
+                self._release_slot(account.host)
+                raise
+
+        try:
+            yield mail
+        except CONNECTION_ERRORS:
+            _logout(mail)
+            self._release_slot(account.host)
+            raise
+        except BaseException:
+            self._checkin(account, mail)
+            raise
+        else:
+            self._checkin(account, mail)
+
+    def _checkin(self, account: ImapAccount, mail: imaplib.IMAP4) -> None:
+        with self._cond:
+            if self._closed:
+                self._open[account.host] -= 1
+                _logout(mail)
+                return
+            self._idle[account].append((mail, time.monotonic()))
+            self._cond.notify_all()
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            for account, conns in self._idle.items():
+                for mail, _ in conns:
+                    _logout(mail)
+                    self._open[account.host] -= 1
+            self._idle.clear()
+            self._cond.notify_all()
+
+
+def _logout(mail: imaplib.IMAP4) -> None:
+    try:
+        mail.logout()
+    except Exception:
+        pass
@@ -1,13 +1,14 @@
-import hashlib
 import re
 from email import policy
 from email.parser import BytesParser
 from pathlib import Path
 from typing import List, Dict, Optional, Tuple
 
+from sqlalchemy import or_, select
 from sqlalchemy.orm import Session
 
-from app.normalize import normalize_record
+from app.email_parser.imap_client import connect, get_imap_config, sync_folder
+from app.normalize import hash_url, normalize_record
 from app.repository import TenderRepository
 from app.models import TenderRaw
 
@@ -18,7 +19,7 @@ from app.models import TenderRaw
 
 
 def _hash_url(url: str) -> str:
-    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+    return hash_url(url)
 
 
 def load_eml(path: Path) -> bytes:
@@ -166,41 +167,84 @@ def insert_normalized_with_dedup(
 ) -> int:
     """Insert normalized records into tenders_raw, dedup by external_id or url hash.
 
-    Dedup strategy:
-    - compute url hash again
-    - skip if any existing TenderRaw has same source + external_id OR same url
+    Dedup strategy (set-based, one lookup per batch):
+    - drop repeats inside the batch (an alert often links the same tender twice)
+    - one indexed query for rows of `source` with any of the batch's external_ids
+      or url hashes
+    - insert the survivors in one statement, ON CONFLICT DO NOTHING so a
+      concurrent insert of the same tender is skipped instead of failing
     """
-    repo = TenderRepository(db)
-    inserted = 0
+    candidates: List[Dict] = []
+    seen_ids = set()
+    seen_hashes = set()
     for rec in normalized_records:
         url = rec.get("url") or ""
-        external_id = rec.get("external_id") or _hash_url(url)
-        # check for duplicates
-        existing = (
-            db.query(TenderRaw)
-            .filter(
-                (TenderRaw.source == source)
-                & (
-                    (TenderRaw.external_id == external_id)
-                    | (TenderRaw.url == url)
-                )
-            )
-            .first()
-        )
-        if existing:
+        url_hash = rec.get("url_hash") or _hash_url(url)
+        external_id = rec.get("external_id") or url_hash
+        if external_id in seen_ids or url_hash in seen_hashes:
             continue
+        seen_ids.add(external_id)
+        seen_hashes.add(url_hash)
         rec["external_id"] = external_id
-        repo.add_raw(rec)
-        inserted += 1
+        rec["url_hash"] = url_hash
+        candidates.append(rec)
+
+    if not candidates:
+        return 0
+
+    existing = db.execute(
+        select(TenderRaw.external_id, TenderRaw.url_hash).where(
+            (TenderRaw.source == source)
+            & or_(
+                TenderRaw.external_id.in_(seen_ids),
+                TenderRaw.url_hash.in_(seen_hashes),
+            )
+        )
+    ).all()
+    known_ids = {r.external_id for r in existing}
+    known_hashes = {r.url_hash for r in existing}
+
+    survivors = [
+        rec
+        for rec in candidates
+        if rec["external_id"] not in known_ids and rec["url_hash"] not in known_hashes
+    ]
+    inserted = TenderRepository(db).insert_many_raw_skip_existing(survivors)
 
     db.commit()
     return inserted
 
 
-def process_eml_file(db: Session, path: Path, source: str = "EMAIL_ALERT") -> int:
-    """High-level helper used in tests: parse .eml and insert deduped tenders_raw rows."""
-    raw_bytes = load_eml(path)
+def process_eml_bytes(db: Session, raw_bytes: bytes, source: str = "EMAIL_ALERT") -> int:
+    """Parse one raw message and insert deduped tenders_raw rows."""
     headers, body = parse_eml_bytes(raw_bytes)
     raw_records = extract_records_from_body(body)
     normalized = normalize_email_records(source, raw_records)
     return insert_normalized_with_dedup(db, source, normalized)
+
+
+def process_eml_batch(db: Session, raw_messages: List[bytes], source: str = "EMAIL_ALERT") -> int:
+    """Parse several raw messages and insert their records with one dedup pass and one commit."""
+    normalized: List[Dict] = []
+    for raw_bytes in raw_messages:
+        headers, body = parse_eml_bytes(raw_bytes)
+        normalized.extend(normalize_email_records(source, extract_records_from_body(body)))
+    return insert_normalized_with_dedup(db, source, normalized)
+
+
+def process_eml_file(db: Session, path: Path, source: str = "EMAIL_ALERT") -> int:
+    """High-level helper used in tests: parse .eml and insert deduped tenders_raw rows."""
+    return process_eml_bytes(db, load_eml(path), source=source)
+
+
+def sync_mailbox(db: Session, source: str = "EMAIL_ALERT", batch_size: int = 100) -> int:
+    """Fetch messages that arrived since the last sync from the configured folder and ingest them."""
+    host, port, user, password, folder = get_imap_config()
+    mail = connect(host, port, user, password)
+    inserted = 0
+    try:
+        for _, raw in sync_folder(db, mail, f"{user}@{host}", folder, batch_size=batch_size):
+            inserted += process_eml_bytes(db, raw, source=source)
+    finally:
+        mail.logout()
+    return inserted
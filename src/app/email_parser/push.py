@@ -0,0 +1,211 @@
+"""Long-running IMAP push service (IDLE, with polling fallback).
+
+Each watched (account, folder) gets a thread that loops:
+
+    sync new UIDs -> parse -> dedup insert -> incremental scoring -> wait
+
+where "wait" is IMAP IDLE when the server advertises it (wakes on EXISTS within
+seconds, re-issued before the 29 minute server timeout) and a plain sleep of
+`poll_interval` otherwise.
+
+Run with `python -m app.email_parser.push`.
+"""
+import imaplib
+import select
+import ssl
+import threading
+import time
+from collections import Counter
+from typing import Callable, List, Optional, Sequence
+
+import structlog
+from sqlalchemy.orm import Session
+
+from app.db import SessionLocal
+from app.email_parser.imap_client import ImapSyncError, iter_folder_batches
+from app.email_parser.imap_pool import CONNECTION_ERRORS, ImapAccount, ImapConnectionPool, get_imap_accounts
+from app.email_parser.parser import process_eml_batch
+
+log = structlog.get_logger()
+
+# RFC 2177: clients should re-issue IDLE at least every 29 minutes.
+IDLE_TIMEOUT = 29 * 60
+
+
+def supports_idle(mail: imaplib.IMAP4) -> bool:
+    return "IDLE" in getattr(mail, "capabilities", ())
+
+
+def _buffered(mail: imaplib.IMAP4) -> bool:
+    """True if imaplib's read buffer (or the TLS layer) already holds response bytes.
+
+    Servers often send the IDLE continuation and the first EXISTS together; that
+    data sits in `mail.file` where select() can't see it. Peek without blocking.
+    """
+    sock = mail.sock
+    prev_timeout = sock.gettimeout()
+    sock.setblocking(False)
+    try:
+        return bool(mail.file.peek(1))
+    except (BlockingIOError, ssl.SSLWantReadError):
+        return False
+    finally:
+        sock.settimeout(prev_timeout)
+
+
+def _readable(mail: imaplib.IMAP4, timeout: float) -> bool:
+    if _buffered(mail):
+        return True
+    ready, _, _ = select.select([mail.sock], [], [], max(0.0, timeout))
+    return bool(ready)
+
+
+def idle_wait(
+    mail: imaplib.IMAP4,
+    timeout: float = IDLE_TIMEOUT,
+    stop: Optional[threading.Event] = None,
+) -> bool:
+    """Run one IDLE cycle on the selected folder.
+
+    Returns True as soon as the server announces new mail (EXISTS/RECENT), False
+    when `timeout` seconds pass quietly or `stop` is set. Either way IDLE is ended
+    with DONE and the tagged completion is consumed, so the connection is ready
+    for normal commands.
+    """
+    tag = mail._new_tag()
+    mail.send(tag + b" IDLE\r\n")
+    line = mail.readline()
+    while line.startswith(b"* "):  # untagged data queued before the continuation
+        line = mail.readline()
+    if not line.startswith(b"+"):
+        raise ImapSyncError(f"IDLE rejected: {line!r}")
+
+    new_mail = False
+    deadline = time.monotonic() + timeout
+    while not new_mail and not (stop is not None and stop.is_set()):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        # wake up every second to notice `stop`
+        if not _readable(mail, min(remaining, 1.0)):
+            continue
+        line = mail.readline()
+        if not line:
+            raise imaplib.IMAP4.abort("connection closed during IDLE")
+        if line.startswith(b"* ") and (line.rstrip().endswith(b"EXISTS") or line.rstrip().endswith(b"RECENT")):
+            new_mail = True
+
+    mail.send(b"DONE\r\n")
+    while True:
+        line = mail.readline()
+        if not line:
+            raise imaplib.IMAP4.abort("connection closed while ending IDLE")
+        if line.startswith(tag):
+            if not line[len(tag):].strip().upper().startswith(b"OK"):
+                raise ImapSyncError(f"IDLE failed: {line!r}")
+            return new_mail
+
+
+def score_new_rows(db: Session) -> int:
+    """Incremental scoring; the watermark makes this cost only the new rows.
+
+    Skipped (returns 0) while another watcher or the scheduler's score stage
+    holds the scoring lock; the rows stay behind the watermark for the next pass.
+    """
+    from app.orchestrator.pipeline import locked_scoring
+
+    return locked_scoring(db)
+
+
+def sync_once(
+    db: Session,
+    mail: imaplib.IMAP4,
+    account: ImapAccount,
+    folder: str,
+    source: str,
+    batch_size: int = 100,
+) -> int:
+    inserted = 0
+    for messages in iter_folder_batches(db, mail, account.key, folder, batch_size=batch_size):
+        if messages:
+            inserted += process_eml_batch(db, [raw for _, raw in messages], source=source)
+    return inserted
+
+
+def watch_folder(
+    pool: ImapConnectionPool,
+    account: ImapAccount,
+    folder: str,
+    stop: threading.Event,
+    source: str = "EMAIL_ALERT",
+    poll_interval: float = 60.0,
+    idle_timeout: float = IDLE_TIMEOUT,
+    on_ingested: Callable[[Session, int], object] = lambda db, n: score_new_rows(db),
+    session_factory: Callable[[], Session] = SessionLocal,
+) -> None:
+    """Sync `folder` whenever new mail arrives until `stop` is set."""
+    backoff = 1.0
+    while not stop.is_set():
+        db = session_factory()
+        try:
+            with pool.connection(account) as mail:
+                while not stop.is_set():
+                    inserted = sync_once(db, mail, account, folder, source)
+                    if inserted:
+                        log.info("imap_push_ingested", account=account.key, folder=folder, inserted=inserted)
+                        on_ingested(db, inserted)
+                    backoff = 1.0
+                    if supports_idle(mail):
+                        idle_wait(mail, timeout=min(idle_timeout, IDLE_TIMEOUT), stop=stop)
+                    else:
+                        stop.wait(poll_interval)
+        except CONNECTION_ERRORS as exc:
+            log.warning("imap_push_disconnected", account=account.key, folder=folder, error=str(exc))
+        except Exception:
+            log.exception("imap_push_error", account=account.key, folder=folder)
+        finally:
+            db.close()
+        # back off before reconnecting (NOOP/login retries live in the pool)
+        stop.wait(backoff)
+        backoff = min(backoff * 2, 300.0)
+
+
+def run_push_service(
+    accounts: Optional[Sequence[ImapAccount]] = None,
+    stop: Optional[threading.Event] = None,
+    **watch_kwargs,
+) -> None:
+    """Watch every configured account/folder until `stop` is set (or KeyboardInterrupt)."""
+    accounts = list(accounts) if accounts is not None else get_imap_accounts()
+    stop = stop or threading.Event()
+    # IDLE occupies a connection, so every watched folder needs its own
+    per_host = Counter(a.host for a in accounts for _ in a.folders)
+    pool = ImapConnectionPool(max_per_host=max(per_host.values(), default=1))
+
+    threads: List[threading.Thread] = []
+    for account in accounts:
+        for folder in account.folders:
+            t = threading.Thread(
+                target=watch_folder,
+                args=(pool, account, folder, stop),
+                kwargs=watch_kwargs,
+                name=f"imap-push-{account.name}-{folder}",
+                daemon=True,
+            )
+            t.start()
+            threads.append(t)
+    try:
+        while any(t.is_alive() for t in threads):
+            for t in threads:
+                t.join(timeout=1.0)
+    except KeyboardInterrupt:
+        stop.set()
+    finally:
+        pool.close()
+
+
+if __name__ == "__main__":
+    from app.logging import setup_logging
+
+    setup_logging()
+    run_push_service()
@@ -0,0 +1,235 @@
+"""On-disk HTTP cache with conditional revalidation, shared by the scraper and connectors.
+
+`CachingTransport` wraps any httpx async transport:
+
+- responses (GET, and POST keyed by body, e.g. TED search) are stored in an
+  SQLite file under the cache directory, keyed by method + URL + params + body
+- a request for a cached URL carries If-None-Match / If-Modified-Since; a 304
+  is answered from the cache with `X-Cache: REVALIDATED`, so callers can tell
+  the page is unchanged and skip re-parsing it
+- total body size is capped; least recently used entries are evicted first
+- offline mode never touches the network: hits are replayed (`X-Cache:
+  OFFLINE`), misses get a 504 -- handy to re-run parser changes on stored pages
+
+Configure with HTTP_CACHE_DIR (enables the cache), HTTP_CACHE_MAX_MB (default
+512) and HTTP_CACHE_OFFLINE=1.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+import httpx
+
+CACHE_HEADER = "X-Cache"
+HIT_REVALIDATED = "REVALIDATED"
+HIT_OFFLINE = "OFFLINE"
+MISS = "MISS"
+
+CACHEABLE_METHODS = ("GET", "POST")
+# httpx hands us the decoded body, so its encoding and length headers no longer apply
+_DECODED_HEADERS = {"content-encoding", "content-length"}
+# hop-by-hop / per-response headers that must not be replayed
+_DROP_HEADERS = {"connection", "keep-alive", "transfer-encoding", "set-cookie", "date"} | _DECODED_HEADERS
+
+
+def _replay_headers(headers) -> Dict[str, str]:
+    return {k.lower(): v for k, v in headers.items() if k.lower() not in _DROP_HEADERS}
+
+
+@dataclass
+class CacheEntry:
+    key: str
+    method: str
+    url: str
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+    stored_at: float
+
+    @property
+    def etag(self) -> Optional[str]:
+        return self.headers.get("etag")
+
+    @property
+    def last_modified(self) -> Optional[str]:
+        return self.headers.get("last-modified")
+
+    @property
+    def content_type(self) -> str:
+        return self.headers.get("content-type", "")
+
+    def text(self) -> str:
+        return httpx.Response(self.status, headers=_replay_headers(self.headers), content=self.body).text
+
+    def to_response(self, request: httpx.Request, cache_status: str) -> httpx.Response:
+        headers = _replay_headers(self.headers)
+        headers[CACHE_HEADER] = cache_status
+        return httpx.Response(self.status, headers=headers, content=self.body, request=request)
+
+
+def cache_key(method: str, url: str, body: bytes = b"") -> str:
+    """Key of a request; query parameters are sorted so their order doesn't matter."""
+    u = httpx.URL(url)
+    params = sorted(u.params.multi_items())
+    canonical = u.copy_with(query=None, fragment=None)
+    h = hashlib.sha256()
+    for part in (method.upper(), str(canonical), json.dumps(params), hashlib.sha256(body).hexdigest()):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class HttpCache:
+    """Size-bounded LRU response store (SQLite, safe across threads and processes)."""
+
+    def __init__(self, directory: Path, max_bytes: int = 512 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.directory / "http_cache.sqlite", check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY, method TEXT, url TEXT, status INTEGER, headers TEXT,"
+            " body BLOB, size INTEGER, stored_at REAL, accessed_at REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_entries_accessed ON entries (accessed_at)")
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT key, method, url, status, headers, body, stored_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return CacheEntry(row[0], row[1], row[2], row[3], json.loads(row[4]), row[5], row[6])
+
+    def touch(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (time.time(), key))
+
+    def put(self, key: str, method: str, url: str, status: int, headers: Dict[str, str], body: bytes) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, method, url, status, json.dumps(headers), body, len(body), now, now),
+            )
+            self._evict()
+
+    def _evict(self) -> None:
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # drop least recently used entries until 90% of the budget is free
+        target = total - int(self.max_bytes * 0.9)
+        freed = 0
+        doomed = []
+        for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY accessed_at"):
+            doomed.append((key,))
+            freed += size
+            if freed >= target:
+                break
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", doomed)
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def entries(self, content_type: Optional[str] = None) -> Iterator[CacheEntry]:
+        """All stored entries (optionally only those whose content type contains `content_type`)."""
+        with self._lock:
+            keys = [r[0] for r in self._conn.execute("SELECT key FROM entries ORDER BY stored_at")]
+        for key in keys:
+            entry = self.get(key)
+            if entry is not None and (content_type is None or content_type in entry.content_type):
+                yield entry
+
+
+class CachingTransport(httpx.AsyncBaseTransport):
+    def __init__(self, cache: HttpCache, transport: Optional[httpx.AsyncBaseTransport] = None, offline: bool = False):
+        self.cache = cache
+        self.offline = offline
+        self._transport = transport or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if request.method not in CACHEABLE_METHODS:
+            return await self._transport.handle_async_request(request)
+
+        body = await request.aread()
+        key = cache_key(request.method, str(request.url), body)
+        entry = self.cache.get(key)
+
+        if self.offline:
+            if entry is None:
+                return httpx.Response(504, content=b"not in HTTP cache (offline mode)", request=request)
+            self.cache.touch(key)
+            return entry.to_response(request, HIT_OFFLINE)
+
+        if entry is not None:
+            if entry.etag:
+                request.headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                request.headers["If-Modified-Since"] = entry.last_modified
+
+        response = await self._transport.handle_async_request(request)
+        if response.status_code == 304 and entry is not None:
+            await response.aclose()
+            self.cache.touch(key)
+            return entry.to_response(request, HIT_REVALIDATED)
+
+        if response.status_code != 200 or "no-store" in response.headers.get("cache-control", ""):
+            return response
+
+        content = await response.aread()
+        await response.aclose()
+        headers = _replay_headers(response.headers)
+        self.cache.put(key, request.method, str(request.url), response.status_code, headers, content)
+        # the live response keeps its cookies etc., only the (now decoded) body's headers change
+        headers = {k: v for k, v in response.headers.multi_items() if k.lower() not in _DECODED_HEADERS}
+        headers[CACHE_HEADER] = MISS
+        return httpx.Response(response.status_code, headers=headers, content=content, request=request)
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+def not_modified(response: httpx.Response) -> bool:
+    """True if `response` is a cached copy the server just confirmed as unchanged (304)."""
+    return response.headers.get(CACHE_HEADER) == HIT_REVALIDATED
+
+
+def default_cache() -> Optional[HttpCache]:
+    directory = os.getenv("HTTP_CACHE_DIR")
+    if not directory:
+        return None
+    return HttpCache(Path(directory), max_bytes=int(float(os.getenv("HTTP_CACHE_MAX_MB", "512")) * 1024 * 1024))
+
+
+def offline_mode() -> bool:
+    return os.getenv("HTTP_CACHE_OFFLINE", "").lower() in ("1", "true", "yes")
+
+
+def caching_transport(
+    cache: Optional[HttpCache],
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+    offline: Optional[bool] = None,
+) -> Optional[httpx.AsyncBaseTransport]:
+    """Wrap `transport` in the cache if there is one; else return `transport` unchanged."""
+    if cache is None:
+        return transport
+    return CachingTransport(cache, transport, offline_mode() if offline is None else offline)
@@ -1,13 +1,20 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from .logging import setup_logging
-from .db import engine
-from .models import Base
+from .db import async_engine
+from .api.tenders import router as tenders_router
+from .api.search import router as search_router
 log = setup_logging()
-app = FastAPI(title='tender-monitoring')
-@app.on_event('startup')
-def startup():
-    Base.metadata.create_all(bind=engine)
+# the schema is managed by `make migrate` (app.migrations), not by the serving process
+@asynccontextmanager
+async def lifespan(app: FastAPI):
     log.info('startup')
+    yield
+    await async_engine.dispose()
+    log.info('shutdown')
+app = FastAPI(title='tender-monitoring', lifespan=lifespan)
+app.include_router(tenders_router)
+app.include_router(search_router)
 @app.get('/health')
 def health():
     return {'status':'ok'}
@@ -1,9 +1,116 @@
+"""Versioned schema migrations.
+
+Each module in `app.migrations.versions` named `vNNNN_<name>.py` defines
+`upgrade(conn)` and runs once, in version order, in its own transaction.
+Applied versions are recorded in `schema_migrations`; a Postgres advisory
+lock keeps two deploys from migrating at the same time.
+
+`v0001_baseline` creates whatever tables are missing from the current
+models, so on a fresh database it already builds the latest schema. Later
+migrations therefore have to be idempotent (IF NOT EXISTS, ...): they do the
+real work on existing deployments and are no-ops on fresh ones.
+
+    python -m app.migrations.migrate [--list]
+"""
+import argparse
+import importlib
+import pkgutil
+import re
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
 from ..db import engine
-from ..models import Base
 
-def main():
-    Base.metadata.create_all(bind=engine)
-    print('Tables created (idempotent).')
+VERSIONS_PACKAGE = "app.migrations.versions"
+_VERSION_RE = re.compile(r"^v(\d{4})_(\w+)$")
+# arbitrary constant for pg_advisory_lock, shared by every migrate run
+LOCK_KEY = 7_342_001
+
+
+@dataclass
+class Migration:
+    version: int
+    name: str
+    upgrade: Callable[[Connection], None]
+
+
+def discover() -> List[Migration]:
+    package = importlib.import_module(VERSIONS_PACKAGE)
+    migrations = []
+    for info in pkgutil.iter_modules(package.__path__):
+        m = _VERSION_RE.match(info.name)
+        if not m:
+            continue
+        module = importlib.import_module(f"{VERSIONS_PACKAGE}.{info.name}")
+        migrations.append(Migration(int(m.group(1)), m.group(2), module.upgrade))
+    migrations.sort(key=lambda m: m.version)
+    versions = [m.version for m in migrations]
+    if len(set(versions)) != len(versions):
+        raise RuntimeError(f"duplicate migration versions: {versions}")
+    return migrations
+
+
+def _ensure_version_table(conn: Connection) -> None:
+    conn.execute(
+        text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            " version INTEGER PRIMARY KEY, name VARCHAR(128) NOT NULL,"
+            " applied_at TIMESTAMPTZ NOT NULL DEFAULT now())"
+        )
+    )
+
+
+def applied_versions(conn: Connection) -> List[int]:
+    _ensure_version_table(conn)
+    return [r[0] for r in conn.execute(text("SELECT version FROM schema_migrations ORDER BY version"))]
+
+
+def upgrade(bind: Optional[Engine] = None) -> List[Migration]:
+    """Apply all pending migrations; returns the ones applied."""
+    bind = bind or engine
+    applied: List[Migration] = []
+    with bind.connect() as conn:
+        conn.execute(text("SELECT pg_advisory_lock(:k)"), {"k": LOCK_KEY})
+        conn.commit()  # the lock is session-level and outlives this transaction
+        try:
+            with conn.begin():
+                done = set(applied_versions(conn))
+            for migration in discover():
+                if migration.version in done:
+                    continue
+                with conn.begin():
+                    migration.upgrade(conn)
+                    conn.execute(
+                        text("INSERT INTO schema_migrations (version, name) VALUES (:v, :n)"),
+                        {"v": migration.version, "n": migration.name},
+                    )
+                applied.append(migration)
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": LOCK_KEY})
+            conn.commit()
+    return applied
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Apply pending schema migrations.")
+    parser.add_argument("--list", action="store_true", help="show migrations and whether they are applied")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        with engine.begin() as conn:
+            done = set(applied_versions(conn))
+        for m in discover():
+            print(f"{m.version:04d} {m.name:<32} {'applied' if m.version in done else 'pending'}")
+        return
+
+    applied = upgrade()
+    for m in applied:
+        print(f"applied {m.version:04d} {m.name}")
+    print("Schema up to date." if applied else "Nothing to apply.")
+
 
-if __name__=='__main__':
+if __name__ == "__main__":
     main()
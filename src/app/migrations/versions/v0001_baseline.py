@@ -0,0 +1,8 @@
+"""Create all tables of the current models that don't exist yet."""
+from sqlalchemy.engine import Connection
+
+from app.models import Base
+
+
+def upgrade(conn: Connection) -> None:
+    Base.metadata.create_all(bind=conn)
@@ -0,0 +1,61 @@
+"""Columns and constraints added to the baseline tables, indexes for the hot queries.
+
+v0001's create_all never alters an existing table, so on a database from
+before the migrations this adds what the models gained since:
+tenders_raw.updated_at and url_hash (backfilled), and uq_filtered_raw plus
+the raw_id foreign key on tenders_filtered (the scoring upserts'
+ON CONFLICT target).
+
+- url_hash: dedup lookups, per source and across sources
+- updated_at: the scoring watermark (`updated_at >= :pass_start`)
+- fetched_at: BRIN, rows arrive in fetched_at order so a few pages cover the table
+- deadline_date, (country, deadline_date): dashboards
+- alerts_sent (filtered_id, channel): "was this already sent" lookups
+"""
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+STATEMENTS = (
+    "ALTER TABLE tenders_raw ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ DEFAULT now()",
+    "ALTER TABLE tenders_raw ADD COLUMN IF NOT EXISTS url_hash VARCHAR(64)",
+    # normalize.hash_url is sha256(url) as hex
+    "UPDATE tenders_raw SET url_hash = encode(sha256(convert_to(url, 'UTF8')), 'hex') WHERE url_hash IS NULL",
+    "CREATE INDEX IF NOT EXISTS ix_raw_source_url_hash ON tenders_raw (source, url_hash)",
+    "CREATE INDEX IF NOT EXISTS ix_raw_url_hash ON tenders_raw (url_hash)",
+    "CREATE INDEX IF NOT EXISTS ix_raw_updated_at ON tenders_raw (updated_at)",
+    "CREATE INDEX IF NOT EXISTS ix_raw_fetched_at_brin ON tenders_raw USING brin (fetched_at)",
+    "CREATE INDEX IF NOT EXISTS ix_raw_deadline ON tenders_raw (deadline_date)",
+    "CREATE INDEX IF NOT EXISTS ix_raw_country_deadline ON tenders_raw (country, deadline_date)",
+    "CREATE INDEX IF NOT EXISTS ix_alerts_filtered_channel ON alerts_sent (filtered_id, channel)",
+    # scores of raw rows deleted before the foreign key existed
+    "DELETE FROM tenders_filtered f WHERE NOT EXISTS (SELECT 1 FROM tenders_raw r WHERE r.id = f.raw_id)",
+    """
+    DO $$ BEGIN
+        IF NOT EXISTS (
+            SELECT 1 FROM pg_constraint
+            WHERE conrelid = 'tenders_filtered'::regclass AND conname = 'tenders_filtered_raw_id_fkey'
+        ) THEN
+            ALTER TABLE tenders_filtered ADD CONSTRAINT tenders_filtered_raw_id_fkey
+                FOREIGN KEY (raw_id) REFERENCES tenders_raw (id) ON DELETE CASCADE;
+        END IF;
+    END $$
+    """,
+    # keep the first score of any raw_id scored more than once
+    "DELETE FROM tenders_filtered a USING tenders_filtered b WHERE a.raw_id = b.raw_id AND a.id > b.id",
+    """
+    DO $$ BEGIN
+        IF NOT EXISTS (
+            SELECT 1 FROM pg_constraint
+            WHERE conrelid = 'tenders_filtered'::regclass AND conname = 'uq_filtered_raw'
+        ) THEN
+            ALTER TABLE tenders_filtered ADD CONSTRAINT uq_filtered_raw UNIQUE (raw_id);
+        END IF;
+    END $$
+    """,
+    "ANALYZE tenders_raw",
+)
+
+
+def upgrade(conn: Connection) -> None:
+    for stmt in STATEMENTS:
+        conn.execute(text(stmt))
@@ -0,0 +1,13 @@
+"""tenders_raw.cluster_id, MinHash signatures and LSH buckets (see app.dedup)."""
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from app.models import LshBucket, TenderSignature
+
+
+def upgrade(conn: Connection) -> None:
+    conn.execute(text("ALTER TABLE tenders_raw ADD COLUMN IF NOT EXISTS cluster_id INTEGER"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_raw_cluster ON tenders_raw (cluster_id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_raw_cluster_pending ON tenders_raw (id) WHERE cluster_id IS NULL"))
+    TenderSignature.__table__.create(bind=conn, checkfirst=True)
+    LshBucket.__table__.create(bind=conn, checkfirst=True)
@@ -0,0 +1,8 @@
+"""scoring_cache table (see app.scoring.cache)."""
+from sqlalchemy.engine import Connection
+
+from app.models import ScoringCacheEntry
+
+
+def upgrade(conn: Connection) -> None:
+    ScoringCacheEntry.__table__.create(bind=conn, checkfirst=True)
@@ -0,0 +1,27 @@
+"""alerts_sent: delivery status and one row per (filtered_id, channel) (see app.alerts.dispatch)."""
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+STATEMENTS = (
+    "ALTER TABLE alerts_sent ADD COLUMN IF NOT EXISTS status VARCHAR(16) NOT NULL DEFAULT 'sent'",
+    # keep the first record of any duplicate (filtered_id, channel) pairs
+    "DELETE FROM alerts_sent a USING alerts_sent b"
+    " WHERE a.filtered_id = b.filtered_id AND a.channel = b.channel AND a.id > b.id",
+    # the unique constraint's index replaces the plain one from v0002
+    "DROP INDEX IF EXISTS ix_alerts_filtered_channel",
+    """
+    DO $$ BEGIN
+        IF NOT EXISTS (
+            SELECT 1 FROM pg_constraint
+            WHERE conname = 'uq_alerts_filtered_channel' AND conrelid = 'alerts_sent'::regclass
+        ) THEN
+            ALTER TABLE alerts_sent ADD CONSTRAINT uq_alerts_filtered_channel UNIQUE (filtered_id, channel);
+        END IF;
+    END $$
+    """,
+)
+
+
+def upgrade(conn: Connection) -> None:
+    for stmt in STATEMENTS:
+        conn.execute(text(stmt))
@@ -0,0 +1,8 @@
+"""pipeline_stage_runs table (see app.orchestrator)."""
+from sqlalchemy.engine import Connection
+
+from app.models import PipelineStageRun
+
+
+def upgrade(conn: Connection) -> None:
+    PipelineStageRun.__table__.create(bind=conn, checkfirst=True)
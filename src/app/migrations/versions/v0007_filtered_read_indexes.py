@@ -0,0 +1,21 @@
+"""Indexes for the read API (see app.api.tenders).
+
+- (relevance_score, id): keyset pagination, best score first
+- GIN on string_to_array(lower(matched_keywords), ', '): the keyword filter,
+  case-insensitive (scoring writes keywords as spelled in the keyword file)
+"""
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+STATEMENTS = (
+    "CREATE INDEX IF NOT EXISTS ix_filtered_score_id ON tenders_filtered (relevance_score, id)",
+    # replaces an earlier case-sensitive definition of the same index
+    "DROP INDEX IF EXISTS ix_filtered_keywords",
+    "CREATE INDEX ix_filtered_keywords ON tenders_filtered USING gin (string_to_array(lower(matched_keywords), ', '))",
+    "ANALYZE tenders_filtered",
+)
+
+
+def upgrade(conn: Connection) -> None:
+    for stmt in STATEMENTS:
+        conn.execute(text(stmt))
@@ -0,0 +1,32 @@
+"""tenders_raw.search_vector with its trigger and GIN index (see app.search).
+
+Existing rows are backfilled in id batches of BATCH rows; the index is built
+afterwards, which is faster than maintaining it during the backfill.
+"""
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from app.models import SEARCH_DDL
+
+BATCH = 20000
+
+
+def upgrade(conn: Connection) -> None:
+    conn.execute(text("ALTER TABLE tenders_raw ADD COLUMN IF NOT EXISTS search_vector tsvector"))
+    for stmt in SEARCH_DDL:
+        conn.execute(text(stmt))
+    last_id = 0
+    while True:
+        ids = conn.execute(
+            text(
+                "WITH batch AS ("
+                " SELECT id FROM tenders_raw WHERE id > :last AND search_vector IS NULL ORDER BY id LIMIT :n)"
+                " UPDATE tenders_raw t SET search_vector = tender_search_vector(t.title, t.description, t.language)"
+                " FROM batch WHERE t.id = batch.id RETURNING t.id"
+            ),
+            {"last": last_id, "n": BATCH},
+        ).scalars().all()
+        if not ids:
+            break
+        last_id = max(ids)
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_raw_search ON tenders_raw USING gin (search_vector)"))
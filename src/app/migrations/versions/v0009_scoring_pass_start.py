@@ -0,0 +1,10 @@
+"""scoring_state.pass_started_at: start of the scoring pass in progress (see app.scoring.pipeline)."""
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+STATEMENTS = ("ALTER TABLE scoring_state ADD COLUMN IF NOT EXISTS pass_started_at TIMESTAMPTZ",)
+
+
+def upgrade(conn: Connection) -> None:
+    for stmt in STATEMENTS:
+        conn.execute(text(stmt))
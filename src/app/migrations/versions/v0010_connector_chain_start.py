@@ -0,0 +1,10 @@
+"""connector_state.chain_started_at: when a stream's cursor chain began (see app.connectors.runner)."""
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+STATEMENTS = ("ALTER TABLE connector_state ADD COLUMN IF NOT EXISTS chain_started_at TIMESTAMPTZ",)
+
+
+def upgrade(conn: Connection) -> None:
+    for stmt in STATEMENTS:
+        conn.execute(text(stmt))
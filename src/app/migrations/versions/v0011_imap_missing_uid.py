@@ -0,0 +1,13 @@
+"""imap_sync_state: the UID FETCH keeps leaving out and how often (see app.email_parser.imap_client)."""
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+STATEMENTS = (
+    "ALTER TABLE imap_sync_state ADD COLUMN IF NOT EXISTS missing_uid BIGINT",
+    "ALTER TABLE imap_sync_state ADD COLUMN IF NOT EXISTS missing_attempts INTEGER NOT NULL DEFAULT 0",
+)
+
+
+def upgrade(conn: Connection) -> None:
+    for stmt in STATEMENTS:
+        conn.execute(text(stmt))
@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, Text, Date, DateTime, Numeric, UniqueConstraint
-from sqlalchemy.sql import func
+from sqlalchemy import DDL, event, Column, Integer, BigInteger, String, Text, Date, DateTime, Numeric, UniqueConstraint, Index, ForeignKey, LargeBinary
+from sqlalchemy.sql import func, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from .db import Base
 class TenderRaw(Base):
     __tablename__='tenders_raw'
@@ -14,20 +15,132 @@ class TenderRaw(Base):
     budget_amount=Column(Numeric)
     deadline_date=Column(Date)
     url=Column(Text, nullable=False)
+    url_hash=Column(String(64))
     published_at=Column(DateTime(timezone=True))
     fetched_at=Column(DateTime(timezone=True), server_default=func.now())
-    __table_args__=(UniqueConstraint('source','external_id', name='uq_raw_source_external'),)
+    updated_at=Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    cluster_id=Column(Integer)
+    # maintained by the tenders_raw_search_vector trigger (SEARCH_DDL below, see app.search)
+    search_vector=Column(TSVECTOR)
+    __table_args__=(
+        UniqueConstraint('source','external_id', name='uq_raw_source_external'),
+        Index('ix_raw_source_url_hash', 'source', 'url_hash'),
+        Index('ix_raw_url_hash', 'url_hash'),
+        Index('ix_raw_updated_at', 'updated_at'),
+        Index('ix_raw_fetched_at_brin', 'fetched_at', postgresql_using='brin'),
+        Index('ix_raw_deadline', 'deadline_date'),
+        Index('ix_raw_country_deadline', 'country', 'deadline_date'),
+        Index('ix_raw_cluster', 'cluster_id'),
+        Index('ix_raw_cluster_pending', 'id', postgresql_where=text('cluster_id IS NULL')),
+        Index('ix_raw_search', 'search_vector', postgresql_using='gin'),
+    )
+# TenderRaw.language -> text search configuration; anything else is indexed unstemmed ('simple')
+SEARCH_CONFIGS={
+    'en':'english', 'de':'german', 'fr':'french', 'es':'spanish', 'it':'italian', 'nl':'dutch',
+    'pt':'portuguese', 'sv':'swedish', 'da':'danish', 'no':'norwegian', 'fi':'finnish',
+    'ro':'romanian', 'hu':'hungarian', 'tr':'turkish', 'ru':'russian',
+}
+_SEARCH_CASES=' '.join(f"WHEN '{lang}' THEN '{cfg}'::regconfig" for lang, cfg in SEARCH_CONFIGS.items())
+SEARCH_DDL=(
+    f"""CREATE OR REPLACE FUNCTION tender_search_config(lang text) RETURNS regconfig
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+        SELECT CASE lower(coalesce(lang, '')) {_SEARCH_CASES} ELSE 'simple'::regconfig END
+    $$""",
+    """CREATE OR REPLACE FUNCTION tender_search_vector(title text, description text, lang text) RETURNS tsvector
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+        SELECT setweight(to_tsvector(tender_search_config(lang), coalesce(title, '')), 'A')
+            || setweight(to_tsvector(tender_search_config(lang), coalesce(description, '')), 'B')
+    $$""",
+    """CREATE OR REPLACE FUNCTION tenders_raw_search_vector_update() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        NEW.search_vector := tender_search_vector(NEW.title, NEW.description, NEW.language);
+        RETURN NEW;
+    END
+    $$""",
+    "DROP TRIGGER IF EXISTS tenders_raw_search_vector ON tenders_raw",
+    """CREATE TRIGGER tenders_raw_search_vector
+    BEFORE INSERT OR UPDATE OF title, description, language ON tenders_raw
+    FOR EACH ROW EXECUTE FUNCTION tenders_raw_search_vector_update()""",
+)
+for _stmt in SEARCH_DDL:
+    event.listen(TenderRaw.__table__, 'after_create', DDL(_stmt))
 class TenderFiltered(Base):
     __tablename__='tenders_filtered'
     id=Column(Integer, primary_key=True)
-    raw_id=Column(Integer, nullable=False)
+    raw_id=Column(Integer, ForeignKey('tenders_raw.id', ondelete='CASCADE'), nullable=False)
     relevance_score=Column(Integer, nullable=False)
     matched_keywords=Column(Text)
     notes=Column(Text)
     created_at=Column(DateTime(timezone=True), server_default=func.now())
+    __table_args__=(
+        UniqueConstraint('raw_id', name='uq_filtered_raw'),
+        Index('ix_filtered_score_id', 'relevance_score', 'id'),
+        Index('ix_filtered_keywords', text("string_to_array(lower(matched_keywords), ', ')"), postgresql_using='gin'),
+    )
 class AlertSent(Base):
     __tablename__='alerts_sent'
     id=Column(Integer, primary_key=True)
     filtered_id=Column(Integer, nullable=False)
     channel=Column(String(32), nullable=False)
+    status=Column(String(16), nullable=False, server_default='sent')
     sent_at=Column(DateTime(timezone=True), server_default=func.now())
+    __table_args__=(UniqueConstraint('filtered_id', 'channel', name='uq_alerts_filtered_channel'),)
+class ScoringState(Base):
+    __tablename__='scoring_state'
+    name=Column(String(64), primary_key=True)
+    last_raw_id=Column(Integer, nullable=False, default=0)
+    last_updated_at=Column(DateTime(timezone=True))
+    pass_started_at=Column(DateTime(timezone=True))
+    config_hash=Column(String(64))
+    updated_at=Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+class ImapSyncState(Base):
+    __tablename__='imap_sync_state'
+    account=Column(String(255), primary_key=True)
+    folder=Column(String(255), primary_key=True)
+    uidvalidity=Column(BigInteger)
+    last_uid=Column(BigInteger, nullable=False, default=0)
+    missing_uid=Column(BigInteger)
+    missing_attempts=Column(Integer, nullable=False, server_default='0')
+    updated_at=Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+class ConnectorState(Base):
+    __tablename__='connector_state'
+    source=Column(String(64), primary_key=True)
+    stream=Column(String(128), primary_key=True)
+    cursor=Column(Text)
+    chain_started_at=Column(DateTime(timezone=True))
+    last_since=Column(DateTime(timezone=True))
+    updated_at=Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+class TenderSignature(Base):
+    __tablename__='tender_signatures'
+    raw_id=Column(Integer, ForeignKey('tenders_raw.id', ondelete='CASCADE'), primary_key=True)
+    signature=Column(LargeBinary, nullable=False)
+class LshBucket(Base):
+    __tablename__='lsh_buckets'
+    bucket=Column(BigInteger, primary_key=True)
+    # no foreign key: 16 rows per tender, the per-row FK check halves insert speed;
+    # buckets of deleted tenders match no tender_signatures row (see app.dedup.prune_buckets)
+    raw_id=Column(Integer, primary_key=True)
+    __table_args__=(Index('ix_lsh_buckets_raw', 'raw_id'),)
+class ScoringCacheEntry(Base):
+    __tablename__='scoring_cache'
+    key=Column(String(64), primary_key=True)
+    tokens=Column(Text)
+    match_version=Column(String(64))
+    matched=Column(Text)
+    rail_hits=Column(Integer)
+    last_used_at=Column(DateTime(timezone=True), server_default=func.now())
+    __table_args__=(Index('ix_scoring_cache_used', 'last_used_at'),)
+class PipelineStageRun(Base):
+    __tablename__='pipeline_stage_runs'
+    id=Column(Integer, primary_key=True)
+    job=Column(String(64), nullable=False)
+    run_started_at=Column(DateTime(timezone=True), nullable=False)
+    stage=Column(String(32), nullable=False)
+    started_at=Column(DateTime(timezone=True))
+    finished_at=Column(DateTime(timezone=True))
+    busy_seconds=Column(Numeric(12, 3), nullable=False, default=0)
+    passes=Column(Integer, nullable=False, default=0)
+    items=Column(Integer, nullable=False, default=0)
+    error=Column(Text)
+    __table_args__=(Index('ix_pipeline_stage_runs_job', 'job', 'run_started_at'),)
@@ -0,0 +1,112 @@
+import hashlib
+import re
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Optional, Union
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# query parameters that change between visits but not the page
+_VOLATILE_PARAMS = re.compile(r"^(utm_\w+|fbclid|gclid|sid|sessionid|jsessionid|phpsessid)$", re.I)
+_DEFAULT_PORTS = {"http": ":80", "https": ":443"}
+
+
+def hash_url(url: str) -> str:
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+
+def canonical_url(url: str) -> str:
+    """Stable form of a URL: lower-case scheme/host, no default port, fragment,
+    session or tracking parameters, and query parameters in sorted order."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    netloc = parts.netloc.lower()
+    if netloc.endswith(_DEFAULT_PORTS.get(scheme, "\0")):
+        netloc = netloc.rsplit(":", 1)[0]
+    path = re.sub(r";jsessionid=[^/?#]*", "", parts.path, flags=re.I) or "/"
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not _VOLATILE_PARAMS.match(k))
+    return urlunsplit((scheme, netloc, path, urlencode(query), ""))
+
+
+def parse_budget(value: Union[str, int, float, Decimal, None]) -> Optional[Decimal]:
+    """'1,000,000' / '1.000.000' / '1000000.50' / 20000 -> Decimal, else None."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float, Decimal)):
+        return Decimal(str(value))
+    s = re.sub(r"[^0-9,\.]", "", str(value))
+    if not s:
+        return None
+    # thousands separators: 1,000,000 or 1.000.000
+    if re.fullmatch(r"\d{1,3}([,\.]\d{3})+", s):
+        s = re.sub(r"[,\.]", "", s)
+    elif "," in s and "." in s:
+        # the right-most separator is the decimal one
+        if s.rfind(",") > s.rfind("."):
+            s = s.replace(".", "").replace(",", ".")
+        else:
+            s = s.replace(",", "")
+    else:
+        s = s.replace(",", ".")
+    try:
+        return Decimal(s)
+    except InvalidOperation:
+        return None
+
+
+def parse_date(value: Union[str, date, None]) -> Optional[date]:
+    """ISO 'YYYY-MM-DD' (optionally with time) -> date, else None."""
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    m = re.search(r"\d{4}-\d{2}-\d{2}", str(value))
+    if not m:
+        return None
+    try:
+        return date.fromisoformat(m.group(0))
+    except ValueError:
+        return None
+
+
+def parse_datetime(value: Union[str, datetime, None]) -> Optional[datetime]:
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value).strip().replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+def normalize_record(
+    source: str,
+    external_id: str,
+    title: str,
+    description: str,
+    url: str,
+    country: Optional[str],
+    language: Optional[str],
+    cpv: Optional[str],
+    budget,
+    deadline,
+    published_at,
+) -> Dict:
+    """Map raw source fields onto the tenders_raw column names."""
+    url = (url or "").strip()
+    return {
+        "source": source,
+        "external_id": external_id or None,
+        "title": (title or "").strip(),
+        "description": (description or "").strip() or None,
+        "country": (country or "").strip().upper() or None,
+        "language": (language or "").strip().lower() or None,
+        "cpv_codes": cpv or None,
+        "budget_amount": parse_budget(budget),
+        "deadline_date": parse_date(deadline),
+        "url": url,
+        "url_hash": hash_url(url) if url else None,
+        "published_at": parse_datetime(published_at),
+    }
@@ -0,0 +1 @@
+"""Scheduled pipeline: ingest -> cluster -> score -> alerts as concurrent, queue-connected stages."""
@@ -0,0 +1,94 @@
+"""Five-field cron expressions (minute hour day-of-month month day-of-week).
+
+Fields take `*`, numbers, ranges `a-b`, steps `*/n` / `a-b/n` and comma lists;
+day-of-week is 0-6 with 0 (or 7) = Sunday. As in cron, when both day fields
+are restricted a day matches if either does. Times are wall-clock times in
+the schedule's time zone, so "0 5 * * *" in Europe/Berlin is 05:00 CET in
+winter and 05:00 CEST in summer.
+"""
+from dataclasses import dataclass
+from datetime import datetime, timedelta, tzinfo
+from typing import FrozenSet, Tuple
+
+_FIELDS: Tuple[Tuple[str, int, int], ...] = (
+    ("minute", 0, 59),
+    ("hour", 0, 23),
+    ("day", 1, 31),
+    ("month", 1, 12),
+    ("weekday", 0, 7),
+)
+# far enough to cover "29 2 * *" style schedules
+_MAX_DAYS = 366 * 5
+
+
+class CronError(ValueError):
+    pass
+
+
+def _parse_field(value: str, name: str, low: int, high: int) -> FrozenSet[int]:
+    out = set()
+    for part in value.split(","):
+        spec, _, step_s = part.partition("/")
+        step = int(step_s) if step_s else 1
+        if spec == "*":
+            start, end = low, high
+        elif "-" in spec:
+            a, b = spec.split("-", 1)
+            start, end = int(a), int(b)
+        else:
+            start = int(spec)
+            end = high if step_s else start
+        if not (low <= start <= end <= high) or step < 1:
+            raise CronError(f"invalid {name} field: {value!r}")
+        out.update(range(start, end + 1, step))
+    return frozenset(out)
+
+
+@dataclass(frozen=True)
+class Cron:
+    expression: str
+    minutes: FrozenSet[int]
+    hours: FrozenSet[int]
+    days: FrozenSet[int]
+    months: FrozenSet[int]
+    weekdays: FrozenSet[int]  # 0 = Sunday
+    any_day: bool
+    any_weekday: bool
+
+    @classmethod
+    def parse(cls, expression: str) -> "Cron":
+        parts = expression.split()
+        if len(parts) != 5:
+            raise CronError(f"expected 5 fields, got {expression!r}")
+        try:
+            fields = [_parse_field(p, *spec) for p, spec in zip(parts, _FIELDS)]
+        except ValueError as exc:
+            raise CronError(f"invalid cron expression {expression!r}: {exc}") from exc
+        weekdays = frozenset(d % 7 for d in fields[4])
+        return cls(expression, *fields[:4], weekdays, parts[2] == "*", parts[4] == "*")
+
+    def _day_matches(self, d: datetime) -> bool:
+        day_ok = d.day in self.days
+        weekday_ok = (d.isoweekday() % 7) in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, after: datetime, tz: tzinfo) -> datetime:
+        """First matching time strictly after `after` (aware), as an aware datetime in `tz`.
+
+        A wall-clock time skipped by a DST change fires at the shifted time;
+        one repeated by a DST change fires once.
+        """
+        local = after.astimezone(tz).replace(tzinfo=None, second=0, microsecond=0) + timedelta(minutes=1)
+        for _ in range(_MAX_DAYS):
+            if local.month in self.months and self._day_matches(local):
+                for hour in sorted(h for h in self.hours if h >= local.hour):
+                    for minute in sorted(self.minutes):
+                        if hour == local.hour and minute < local.minute:
+                            continue
+                        candidate = local.replace(hour=hour, minute=minute).replace(tzinfo=tz)
+                        if candidate > after:
+                            return candidate
+            local = (local + timedelta(days=1)).replace(hour=0, minute=0)
+        raise CronError(f"{self.expression!r} never fires")
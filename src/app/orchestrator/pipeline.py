@@ -0,0 +1,308 @@
+"""Ingest -> cluster -> score -> alerts as concurrent stages.
+
+Ingest sources (API connectors, IMAP, portal crawl) run side by side and put
+the row count of every batch they commit on a bounded queue. Each following
+stage waits on its queue, coalesces whatever has queued up into one pass over
+its pending rows (`cluster_id IS NULL`, the scoring watermark, the alerts
+anti-join) and signals the next stage when the pass produced anything:
+
+    sources --q--> cluster --q--> score --q--> alerts
+
+So the first tenders of a run are clustered, scored and alerted while the
+connectors are still paging, and a stage that falls behind makes the stages
+before it wait on a full queue instead of piling up work. Once ingest is done
+every stage makes one final pass, so nothing is left pending. Stages pass
+counts, not rows: each reads its input from the database, so a pass is
+idempotent and an interrupted run resumes where it stopped.
+
+Per stage, `StageTiming` records first start, last finish, time spent in
+passes, passes and rows; `record_timings` stores them in pipeline_stage_runs.
+"""
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+import structlog
+from sqlalchemy.orm import Session
+
+from app.alerts.channels import Channel
+from app.alerts.dispatch import MIN_SCORE, dispatch_channel
+from app.models import PipelineStageRun
+
+log = structlog.get_logger()
+
+QUEUE_SIZE = 4
+STAGES = ("ingest", "cluster", "score", "alerts")
+SCORING_LOCK = "scoring"
+
+Emit = Callable[[int], Awaitable[None]]
+# an ingest source: fetches, commits batch by batch, awaits emit(rows) per batch; returns rows written
+Source = Callable[[Emit], Awaitable[int]]
+# one stage pass over the rows pending for it; returns rows it produced for the next stage
+StagePass = Callable[[], Awaitable[int]]
+
+_END = None
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+@dataclass
+class StageTiming:
+    stage: str
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    busy_seconds: float = 0.0
+    passes: int = 0
+    items: int = 0
+    error: Optional[str] = None
+
+    async def timed(self, work: Callable[[], Awaitable[int]]) -> int:
+        """Run `work` as one pass; failures are logged and recorded, not raised."""
+        self.started_at = self.started_at or _now()
+        started = time.monotonic()
+        n = 0
+        try:
+            n = await work() or 0
+        except Exception as exc:
+            self.error = f"{type(exc).__name__}: {exc}"
+            log.exception("pipeline_stage_failed", stage=self.stage)
+        self.busy_seconds += time.monotonic() - started
+        self.passes += 1
+        self.items += n
+        self.finished_at = _now()
+        return n
+
+
+async def _ingest(sources: Dict[str, Source], out: asyncio.Queue, timing: StageTiming) -> None:
+    async def emit(n: int) -> None:
+        if n:
+            await out.put(n)
+
+    def run(name: str, source: Source) -> Callable[[], Awaitable[int]]:
+        async def work() -> int:
+            n = await source(emit)
+            log.info("pipeline_source_done", source=name, rows=n)
+            return n
+
+        return work
+
+    try:
+        await asyncio.gather(*(timing.timed(run(name, source)) for name, source in sources.items()))
+    finally:
+        await out.put(_END)
+
+
+async def _stage(timing: StageTiming, work: StagePass, inbox: asyncio.Queue, outbox: Optional[asyncio.Queue]) -> None:
+    try:
+        done = False
+        while not done:
+            signals = [await inbox.get()]
+            while not inbox.empty():
+                signals.append(inbox.get_nowait())
+            done = _END in signals
+            # the final pass runs even without new rows: it picks up what earlier runs left pending
+            if done or any(signals):
+                n = await timing.timed(work)
+                if n and outbox is not None:
+                    await outbox.put(n)
+    finally:
+        if outbox is not None:
+            await outbox.put(_END)
+
+
+async def run_pipeline(
+    sources: Dict[str, Source],
+    cluster: StagePass,
+    score: StagePass,
+    alert: StagePass,
+    queue_size: int = QUEUE_SIZE,
+) -> Dict[str, StageTiming]:
+    """Run the four stages concurrently until ingest is done and every stage has drained."""
+    timings = {name: StageTiming(name) for name in STAGES}
+    to_cluster, to_score, to_alert = (asyncio.Queue(maxsize=queue_size) for _ in range(3))
+    await asyncio.gather(
+        _ingest(sources, to_cluster, timings["ingest"]),
+        _stage(timings["cluster"], cluster, to_cluster, to_score),
+        _stage(timings["score"], score, to_score, to_alert),
+        _stage(timings["alerts"], alert, to_alert, None),
+    )
+    return timings
+
+
+# --- stage passes over the app's own modules ----------------------------------
+
+
+def _in_session(session_factory: Callable[[], Session], fn: Callable[[Session], int]) -> int:
+    db = session_factory()
+    try:
+        return fn(db)
+    finally:
+        db.close()
+
+
+def cluster_pass(session_factory: Callable[[], Session]) -> StagePass:
+    from app.dedup import run_clustering
+
+    async def work() -> int:
+        return await asyncio.to_thread(_in_session, session_factory, lambda db: run_clustering(db)[0])
+
+    return work
+
+
+def locked_scoring(db: Session, **scoring_kwargs: Any) -> int:
+    """One scoring pass under the `scoring` advisory lock; 0 if another process is scoring.
+
+    The score stage and the IMAP push service both advance the one
+    scoring_state watermark, so only one of them may run a pass at a time.
+    """
+    from app.orchestrator.scheduler import advisory_lock
+    from app.scoring.pipeline import run_scoring
+
+    with advisory_lock(db.get_bind(), SCORING_LOCK) as acquired:
+        if not acquired:
+            log.info("scoring_locked")
+            return 0
+        return run_scoring(db, **scoring_kwargs)
+
+
+def score_pass(session_factory: Callable[[], Session], **scoring_kwargs: Any) -> StagePass:
+    async def work() -> int:
+        return await asyncio.to_thread(_in_session, session_factory, lambda db: locked_scoring(db, **scoring_kwargs))
+
+    return work
+
+
+def alert_pass(
+    session_factory: Callable[[], Session],
+    channels: Sequence[Channel],
+    digest: bool = False,
+    min_score: int = MIN_SCORE,
+) -> StagePass:
+    """Alerts on `channels` (kept open across passes; the caller closes them).
+
+    Rows are only alerted once clustered, so a tender that arrives while the
+    cluster stage is busy is not alerted before its duplicates are known.
+    """
+
+    async def work() -> int:
+        db = session_factory()
+        try:
+            alerted = 0
+            for channel in channels:
+                result = await dispatch_channel(db, channel, digest, min_score, clustered_only=True)
+                alerted += result.alerted
+            return alerted
+        finally:
+            db.close()
+
+    return work
+
+
+def connectors_source(session_factory: Callable[[], Session]) -> Optional[Source]:
+    from app.connectors.runner import enabled_connectors, run_connectors
+    from app.http_cache import default_cache
+
+    connectors = enabled_connectors()
+    if not connectors:
+        return None
+
+    async def source(emit: Emit) -> int:
+        runs = await run_connectors(
+            connectors,
+            cache=default_cache(),
+            on_page=lambda counts: emit(counts.inserted + counts.updated),
+            session_factory=session_factory,
+        )
+        return sum(r.inserted + r.updated for r in runs.values())
+
+    return source
+
+
+def imap_source(session_factory: Callable[[], Session]) -> Optional[Source]:
+    from app.email_parser.fetcher import fetch_and_ingest
+    from app.email_parser.imap_client import ImapConfigError
+    from app.email_parser.imap_pool import get_imap_accounts
+
+    try:
+        accounts = get_imap_accounts()
+    except ImapConfigError:
+        return None
+
+    async def source(emit: Emit) -> int:
+        loop = asyncio.get_running_loop()
+
+        def on_batch(n: int) -> None:
+            # called from the fetch thread; blocks it while the cluster queue is full
+            asyncio.run_coroutine_threadsafe(emit(n), loop).result()
+
+        return await asyncio.to_thread(
+            fetch_and_ingest, accounts, session_factory=session_factory, on_batch=on_batch
+        )
+
+    return source
+
+
+def portal_source(session_factory: Callable[[], Session]) -> Optional[Source]:
+    """The login-portal crawl, for the comma-separated PORTAL_KEYWORDS (needs PORTAL_BASE_URL)."""
+    keywords = [k.strip() for k in os.getenv("PORTAL_KEYWORDS", "").split(",") if k.strip()]
+    if not keywords or not os.getenv("PORTAL_BASE_URL"):
+        return None
+    from app.scraper.crawl import crawl_and_ingest
+
+    async def source(emit: Emit) -> int:
+        # the crawl runs its own event loop, so it gets a thread; results are stored in one upsert
+        n = await asyncio.to_thread(_in_session, session_factory, lambda db: crawl_and_ingest(db, keywords))
+        await emit(n)
+        return n
+
+    return source
+
+
+def configured_sources(session_factory: Callable[[], Session]) -> Dict[str, Source]:
+    candidates = {
+        "connectors": connectors_source,
+        "imap": imap_source,
+        "portal": portal_source,
+    }
+    sources = {}
+    for name, build in candidates.items():
+        source = build(session_factory)
+        if source is None:
+            log.info("pipeline_source_disabled", source=name)
+        else:
+            sources[name] = source
+    return sources
+
+
+def record_timings(db: Session, job: str, run_started_at: datetime, timings: Dict[str, StageTiming]) -> None:
+    db.add_all(
+        PipelineStageRun(
+            job=job,
+            run_started_at=run_started_at,
+            stage=t.stage,
+            started_at=t.started_at,
+            finished_at=t.finished_at,
+            busy_seconds=round(t.busy_seconds, 3),
+            passes=t.passes,
+            items=t.items,
+            error=t.error,
+        )
+        for t in timings.values()
+    )
+    db.commit()
+
+
+def format_timings(timings: Dict[str, StageTiming]) -> List[str]:
+    lines = []
+    for t in timings.values():
+        wall = (t.finished_at - t.started_at).total_seconds() if t.started_at and t.finished_at else 0.0
+        status = f"ERROR {t.error}" if t.error else "ok"
+        lines.append(
+            f"{t.stage:<8} passes={t.passes:<4} rows={t.items:<7} busy={t.busy_seconds:8.2f}s wall={wall:8.2f}s {status}"
+        )
+    return lines
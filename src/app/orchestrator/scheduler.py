@@ -0,0 +1,173 @@
+"""In-process cron scheduler for the pipeline.
+
+Every job sleeps until its next cron time and then runs under a Postgres
+advisory lock named after the job, so with several app instances (or a
+manual `--once` run overlapping the schedule) only one runs a job at a time;
+the others log `job_locked` and skip that run. A run that overruns its next
+cron time skips the missed times instead of running twice in a row.
+
+Configure with PIPELINE_SCHEDULE (cron, default "0 5 * * *") and
+SCHEDULE_TZ (default Europe/Berlin); alert channels as in app.alerts.channels,
+ALERT_DIGEST=1 for digest alerts.
+
+    python -m app.orchestrator.scheduler [--once]
+"""
+import argparse
+import asyncio
+import os
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import AsyncIterator, Awaitable, Callable, Iterator, List, Optional, Sequence
+from zoneinfo import ZoneInfo
+
+import structlog
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from app.orchestrator.cron import Cron
+
+log = structlog.get_logger()
+
+# first key of the two-key pg_try_advisory_lock; the second is hashtext(job name)
+LOCK_NAMESPACE = 7_342_002
+DEFAULT_SCHEDULE = "0 5 * * *"
+DEFAULT_TZ = "Europe/Berlin"
+
+
+@dataclass
+class Job:
+    name: str
+    cron: Cron
+    run: Callable[[], Awaitable[object]]
+    tz: ZoneInfo = ZoneInfo(DEFAULT_TZ)
+
+
+@contextmanager
+def advisory_lock(bind: Engine, name: str) -> Iterator[bool]:
+    """Hold the advisory lock `name` for the block; yields False if another session holds it."""
+    with bind.connect() as conn:
+        params = {"ns": LOCK_NAMESPACE, "name": name}
+        acquired = conn.execute(text("SELECT pg_try_advisory_lock(:ns, hashtext(:name))"), params).scalar()
+        conn.commit()  # the lock is session-level and outlives this transaction
+        try:
+            yield bool(acquired)
+        finally:
+            if acquired:
+                conn.execute(text("SELECT pg_advisory_unlock(:ns, hashtext(:name))"), params)
+                conn.commit()
+
+
+@asynccontextmanager
+async def job_lock(bind: Engine, name: str) -> AsyncIterator[bool]:
+    """Hold the job's advisory lock for the block; yields False if another session holds it."""
+    with advisory_lock(bind, name) as acquired:
+        yield acquired
+
+
+async def run_job(job: Job, bind: Engine) -> Optional[object]:
+    """Run `job` once if no other instance is running it; returns its result (None when skipped)."""
+    async with job_lock(bind, job.name) as acquired:
+        if not acquired:
+            log.info("job_locked", job=job.name)
+            return None
+        log.info("job_started", job=job.name)
+        try:
+            return await job.run()
+        except Exception:
+            log.exception("job_failed", job=job.name)
+            return None
+
+
+async def _job_loop(job: Job, bind: Engine, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        due = job.cron.next_after(datetime.now(timezone.utc), job.tz)
+        log.info("job_scheduled", job=job.name, at=due.isoformat())
+        delay = (due - datetime.now(timezone.utc)).total_seconds()
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=max(0.0, delay))
+            return
+        except asyncio.TimeoutError:
+            pass
+        await run_job(job, bind)
+
+
+async def run_scheduler(jobs: Sequence[Job], bind: Engine, stop: Optional[asyncio.Event] = None) -> None:
+    """Run every job on its schedule until `stop` is set."""
+    stop = stop or asyncio.Event()
+    await asyncio.gather(*(_job_loop(job, bind, stop) for job in jobs))
+
+
+def pipeline_job(name: str = "pipeline", schedule: Optional[str] = None, tz: Optional[str] = None) -> Job:
+    """The ingest -> cluster -> score -> alerts pipeline with everything configured in the environment."""
+    from app.alerts.channels import channels_from_env
+    from app.db import SessionLocal
+    from app.orchestrator.pipeline import (
+        alert_pass,
+        cluster_pass,
+        configured_sources,
+        format_timings,
+        record_timings,
+        run_pipeline,
+        score_pass,
+    )
+
+    async def run() -> object:
+        run_started_at = datetime.now(timezone.utc)
+        channels = channels_from_env()
+        try:
+            timings = await run_pipeline(
+                configured_sources(SessionLocal),
+                cluster_pass(SessionLocal),
+                score_pass(SessionLocal),
+                alert_pass(
+                    SessionLocal, channels, digest=os.getenv("ALERT_DIGEST", "").lower() in ("1", "true", "yes")
+                ),
+            )
+        finally:
+            for channel in channels:
+                await channel.aclose()
+        db = SessionLocal()
+        try:
+            record_timings(db, name, run_started_at, timings)
+        finally:
+            db.close()
+        for line in format_timings(timings):
+            log.info("pipeline_stage", job=name, summary=line)
+        return timings
+
+    return Job(
+        name,
+        Cron.parse(schedule or os.getenv("PIPELINE_SCHEDULE", DEFAULT_SCHEDULE)),
+        run,
+        ZoneInfo(tz or os.getenv("SCHEDULE_TZ", DEFAULT_TZ)),
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from app.db import engine
+    from app.logging import setup_logging
+    from app.orchestrator.pipeline import format_timings
+
+    parser = argparse.ArgumentParser(description="Run the tender pipeline on its cron schedule.")
+    parser.add_argument("--once", action="store_true", help="run the pipeline now (still under the job lock) and exit")
+    args = parser.parse_args(argv)
+
+    setup_logging()
+    job = pipeline_job()
+    if args.once:
+        timings = asyncio.run(run_job(job, engine))
+        if timings is None:
+            print("Pipeline not run (locked by another instance or failed).")
+            return
+        for line in format_timings(timings):
+            print(line)
+        return
+    try:
+        asyncio.run(run_scheduler([job], engine))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import csv
+import io
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Set
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.models import TenderRaw
+
+# columns the ingest paths write; the rest are set by the database or later stages
+_RAW_COLUMNS = {c.name for c in TenderRaw.__table__.columns} - {
+    "id",
+    "fetched_at",
+    "updated_at",
+    "cluster_id",
+    "search_vector",
+}
+# column order for COPY / INSERT ... SELECT
+_COPY_COLUMNS = [c.name for c in TenderRaw.__table__.columns if c.name in _RAW_COLUMNS]
+_KEY_COLUMNS = ("source", "external_id")
+_UPDATE_COLUMNS = [c for c in _COPY_COLUMNS if c not in _KEY_COLUMNS]
+# changing these makes the near-duplicate stage re-cluster the row (see app.dedup)
+_CLUSTER_COLUMNS = ("title", "description")
+_COPY_NULL = "\\N"
+
+
+@dataclass
+class UpsertCounts:
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+
+    def __iadd__(self, other: "UpsertCounts") -> "UpsertCounts":
+        self.inserted += other.inserted
+        self.updated += other.updated
+        self.unchanged += other.unchanged
+        return self
+
+
+def _copy_csv(records: List[Dict]) -> io.StringIO:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for rec in records:
+        writer.writerow([_COPY_NULL if rec.get(c) is None else rec[c] for c in _COPY_COLUMNS])
+    buf.seek(0)
+    return buf
+
+
+def _raw_values(rec: Dict) -> Dict:
+    return {k: v for k, v in rec.items() if k in _RAW_COLUMNS}
+
+
+class TenderRepository:
+    """Write access to tenders_raw for all ingestion paths."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def add_raw(self, rec: Dict) -> TenderRaw:
+        """Add one normalized record to the session (caller commits)."""
+        row = TenderRaw(**_raw_values(rec))
+        self.db.add(row)
+        return row
+
+    def add_many_raw(self, records: Iterable[Dict]) -> int:
+        """Add normalized records and commit; returns the number added."""
+        n = 0
+        for rec in records:
+            self.add_raw(rec)
+            n += 1
+        self.db.commit()
+        return n
+
+    def insert_many_raw_skip_existing(self, records: List[Dict]) -> int:
+        """Insert in one statement, skipping rows that hit a unique constraint (caller commits).
+
+        Returns the number of rows actually inserted.
+        """
+        if not records:
+            return 0
+        stmt = (
+            pg_insert(TenderRaw)
+            .values([_raw_values(r) for r in records])
+            .on_conflict_do_nothing()
+            .returning(TenderRaw.id)
+        )
+        return len(self.db.execute(stmt).all())
+
+    def upsert_many_raw(self, records: List[Dict]) -> UpsertCounts:
+        """Bulk load via COPY into a temp staging table + one INSERT ... ON CONFLICT DO UPDATE.
+
+        Rows are matched on (source, external_id). Existing rows are only
+        rewritten (and get a new updated_at) when a data column actually
+        differs, so re-fetching an unchanged tender costs no write and does not
+        trigger rescoring. Within `records` the last occurrence of a key wins.
+        Runs in the session's transaction (caller commits).
+        """
+        latest: Dict[tuple, Dict] = {}
+        keyless: List[Dict] = []
+        for rec in records:
+            values = _raw_values(rec)
+            if values.get("external_id"):
+                latest[(values["source"], values["external_id"])] = values
+            else:
+                keyless.append(values)
+        rows = list(latest.values()) + keyless
+        if not rows:
+            return UpsertCounts()
+
+        cols = ", ".join(_COPY_COLUMNS)
+        changed = " OR ".join(f"t.{c} IS DISTINCT FROM EXCLUDED.{c}" for c in _UPDATE_COLUMNS)
+        assignments = ", ".join(f"{c} = EXCLUDED.{c}" for c in _UPDATE_COLUMNS)
+        recluster = " OR ".join(f"t.{c} IS DISTINCT FROM EXCLUDED.{c}" for c in _CLUSTER_COLUMNS)
+        cur = self.db.connection().connection.cursor()
+        try:
+            cur.execute(
+                f"CREATE TEMP TABLE IF NOT EXISTS tenders_raw_stage ON COMMIT DROP AS "
+                f"SELECT {cols} FROM tenders_raw WITH NO DATA"
+            )
+            cur.execute("TRUNCATE tenders_raw_stage")
+            cur.copy_expert(
+                f"COPY tenders_raw_stage ({cols}) FROM STDIN WITH (FORMAT csv, NULL '{_COPY_NULL}')",
+                _copy_csv(rows),
+            )
+            cur.execute(
+                f"""
+                WITH upserted AS (
+                    INSERT INTO tenders_raw AS t ({cols})
+                    SELECT {cols} FROM tenders_raw_stage
+                    ON CONFLICT (source, external_id) DO UPDATE
+                    SET {assignments}, updated_at = now(),
+                        cluster_id = CASE WHEN {recluster} THEN NULL ELSE t.cluster_id END
+                    WHERE {changed}
+                    RETURNING (xmax = 0) AS inserted
+                )
+                SELECT count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted) FROM upserted
+                """
+            )
+            inserted, updated = cur.fetchone()
+        finally:
+            cur.close()
+        return UpsertCounts(inserted, updated, len(rows) - inserted - updated)
+
+    def existing_external_ids(self, source: str, external_ids: Iterable[str]) -> Set[str]:
+        """The subset of `external_ids` already stored for `source` (one indexed query)."""
+        ids = {i for i in external_ids if i}
+        if not ids:
+            return set()
+        stmt = select(TenderRaw.external_id).where(TenderRaw.source == source, TenderRaw.external_id.in_(ids))
+        return set(self.db.scalars(stmt))
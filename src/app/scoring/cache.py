@@ -0,0 +1,142 @@
+"""Persistent cache of the text-derived scoring signals.
+
+Tokenizing and keyword matching are the expensive part of `score_record`, and
+they only depend on title, description and language. Re-ingested tenders and
+corrections that only move a deadline or budget keep their text, so their
+entry in scoring_cache lets `score_rows` skip both and only recompute the
+cheap signals (market, deadline, budget).
+
+- entries are keyed by a hash of title, description, language and the
+  tokenizer in use (`content_key`); they hold the spaCy tokens/lemmas (regex
+  fallback tokens are cheaper to recompute than to store)
+- matched keywords and the rail-context hit count are stored with the
+  `match_version` (keyword list, RAIL_CONTEXT, matcher threshold) they were
+  computed under; after a keyword change the tokens are still reused and
+  only the matcher runs again
+- `evict` bounds the table to SCORING_CACHE_MAX_ROWS entries (default
+  200000), dropping the least recently used ones; run_scoring calls it
+  after every run
+"""
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import func, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.engine import Engine
+
+from app.models import ScoringCacheEntry
+from app.scoring.keywords import RAIL_CONTEXT
+from app.scoring.nlp import tokenizer_id
+
+DEFAULT_MAX_ROWS = int(os.getenv("SCORING_CACHE_MAX_ROWS", "200000"))
+# last_used_at is refreshed at most this often, so hits don't rewrite rows on every run
+TOUCH_INTERVAL = "1 hour"
+
+
+@dataclass
+class CachedText:
+    tokens: Optional[List[str]]  # not stored for the regex tokenizer, not loaded when matched is current
+    matched: Optional[List[str]] = None  # None: computed under another match_version
+    rail_hits: Optional[int] = None
+
+
+def content_key(title: Optional[str], description: Optional[str], lang: str) -> str:
+    h = hashlib.sha256()
+    for part in (tokenizer_id(lang), lang, title or "", description or ""):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def match_version(keywords_per_lang: Dict[str, List[str]], matcher_threshold: float) -> str:
+    payload = json.dumps(
+        {"keywords": keywords_per_lang, "rail_context": RAIL_CONTEXT, "threshold": matcher_threshold},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ScoringCache:
+    """scoring_cache access over its own connections (independent of the caller's session)."""
+
+    def __init__(self, bind: Engine, version: str):
+        self.bind = bind
+        self.version = version
+
+    def lookup(self, keys: Sequence[str]) -> Dict[str, CachedText]:
+        keys = list(set(keys))
+        if not keys:
+            return {}
+        with self.bind.begin() as conn:
+            rows = conn.execute(
+                text(
+                    # tokens are only needed when the match results are stale
+                    "SELECT key, match_version, matched, rail_hits,"
+                    " CASE WHEN match_version = :version THEN NULL ELSE tokens END AS tokens "
+                    "FROM scoring_cache WHERE key = ANY(CAST(:keys AS varchar[]))"
+                ),
+                {"keys": keys, "version": self.version},
+            ).all()
+            if rows:
+                conn.execute(
+                    text(
+                        "UPDATE scoring_cache SET last_used_at = now() WHERE key = ANY(CAST(:keys AS varchar[])) "
+                        f"AND last_used_at < now() - interval '{TOUCH_INTERVAL}'"
+                    ),
+                    {"keys": [r.key for r in rows]},
+                )
+        out = {}
+        for r in rows:
+            current = r.match_version == self.version
+            out[r.key] = CachedText(
+                json.loads(r.tokens) if r.tokens else None,
+                json.loads(r.matched) if current else None,
+                r.rail_hits if current else None,
+            )
+        return out
+
+    def store(self, entries: Dict[str, CachedText]) -> None:
+        """Upsert `entries`; their tokens are kept if given (pass None for regex tokens)."""
+        if not entries:
+            return
+        stmt = pg_insert(ScoringCacheEntry)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ScoringCacheEntry.key],
+            set_={
+                "tokens": func.coalesce(stmt.excluded.tokens, ScoringCacheEntry.tokens),
+                "match_version": stmt.excluded.match_version,
+                "matched": stmt.excluded.matched,
+                "rail_hits": stmt.excluded.rail_hits,
+                "last_used_at": text("now()"),
+            },
+        )
+        rows = [
+            {
+                "key": key,
+                "tokens": None if e.tokens is None else json.dumps(e.tokens, ensure_ascii=False),
+                "match_version": self.version,
+                "matched": json.dumps(e.matched, ensure_ascii=False),
+                "rail_hits": e.rail_hits,
+            }
+            for key, e in entries.items()
+        ]
+        # executemany: one cached statement, batched by insertmanyvalues
+        with self.bind.begin() as conn:
+            conn.execute(stmt, rows)
+
+
+def evict(bind: Engine, max_rows: int = DEFAULT_MAX_ROWS) -> int:
+    """Drop the least recently used entries beyond `max_rows`; returns the number dropped."""
+    with bind.begin() as conn:
+        result = conn.execute(
+            text(
+                "DELETE FROM scoring_cache WHERE key IN ("
+                " SELECT key FROM scoring_cache ORDER BY last_used_at DESC OFFSET :max_rows)"
+            ),
+            {"max_rows": max_rows},
+        )
+    return result.rowcount
@@ -0,0 +1,107 @@
+from collections import Counter
+from difflib import SequenceMatcher
+from typing import Dict, List, Tuple
+
+# Upper bound on distinct tokens remembered by a matcher before its cache is reset.
+TOKEN_CACHE_MAX = 200_000
+
+
+def _length_bound(la: int, lb: int) -> float:
+    """Best ratio two strings of these lengths could reach (== SequenceMatcher.real_quick_ratio)."""
+    total = la + lb
+    return 2.0 * min(la, lb) / total if total else 1.0
+
+
+def _overlap_bound(a: Counter, b: Counter, la: int, lb: int) -> float:
+    """Best ratio given shared characters (== SequenceMatcher.quick_ratio)."""
+    total = la + lb
+    if not total:
+        return 1.0
+    common = sum(min(n, b[c]) for c, n in a.items() if c in b)
+    return 2.0 * common / total
+
+
+class KeywordMatcher:
+    """Keyword matcher compiled once from `load_keywords()` output.
+
+    Gives exactly the same answers as calling `fuzzy_contains(tokens, kw)` for
+    every keyword, but without comparing every token against every keyword:
+
+    - keyword head tokens (first word, lowercased) sit in a hash index, so exact
+      and lemma hits are a dict lookup;
+    - fuzzy candidates are narrowed by length bucket and then by shared
+      characters - both are upper bounds of `SequenceMatcher.ratio()`, so no
+      true match is dropped - and only survivors run the real ratio;
+    - the per-token result is memoized, so each distinct token in a corpus is
+      compared against the keyword list once per matcher.
+    """
+
+    def __init__(self, keywords_per_lang: Dict[str, List[str]], threshold: float = 0.85):
+        self.threshold = threshold
+        self.keywords: List[str] = []
+        self._targets: List[str] = []
+        self._by_head: Dict[str, List[int]] = {}
+        self._heads_by_len: Dict[int, List[Tuple[str, Counter]]] = {}
+        self._token_cache: Dict[str, Tuple[int, ...]] = {}
+
+        for _, kws in keywords_per_lang.items():
+            for kw in kws:
+                if not kw:
+                    continue
+                kw_tokens = [w.lower() for w in kw.split() if w]
+                if not kw_tokens:
+                    continue
+                idx = len(self.keywords)
+                self.keywords.append(kw)
+                self._targets.append(" ".join(kw_tokens))
+                head = kw_tokens[0]
+                if head not in self._by_head:
+                    self._heads_by_len.setdefault(len(head), []).append((head, Counter(head)))
+                self._by_head.setdefault(head, []).append(idx)
+
+    def _head_hits(self, token: str) -> Tuple[int, ...]:
+        """Indexes of keywords whose head token is similar enough to `token`."""
+        cached = self._token_cache.get(token)
+        if cached is not None:
+            return cached
+
+        hits: List[int] = list(self._by_head.get(token, ()))
+        la = len(token)
+        counts = None
+        for lb, heads in self._heads_by_len.items():
+            if _length_bound(la, lb) < self.threshold:
+                continue
+            for head, head_counts in heads:
+                if head == token:
+                    continue
+                if counts is None:
+                    counts = Counter(token)
+                if _overlap_bound(counts, head_counts, la, lb) < self.threshold:
+                    continue
+                if SequenceMatcher(None, token, head).ratio() >= self.threshold:
+                    hits.extend(self._by_head[head])
+
+        result = tuple(hits)
+        if len(self._token_cache) >= TOKEN_CACHE_MAX:
+            self._token_cache.clear()
+        self._token_cache[token] = result
+        return result
+
+    def match(self, tokens: List[str]) -> List[str]:
+        """Return matched keywords in keyword-file order, deduplicated."""
+        hit = set()
+
+        # whole-string similarity (only possible when text and keyword have similar length)
+        text = " ".join(tokens)
+        lt = len(text)
+        for idx, target in enumerate(self._targets):
+            if _length_bound(lt, len(target)) < self.threshold:
+                continue
+            if SequenceMatcher(None, text, target).ratio() >= self.threshold:
+                hit.add(idx)
+
+        # token-wise similarity vs first keyword token
+        for t in set(tokens):
+            hit.update(self._head_hits(t))
+
+        return list(dict.fromkeys(self.keywords[i] for i in sorted(hit)))
@@ -1,5 +1,18 @@
 import re
-from typing import List, Optional, Callable, Union
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Callable, Union
+
+# spaCy pipelines per language prefix. Anything else uses the regex fallback.
+SPACY_MODELS = {
+    "en": "en_core_web_sm",
+    "de": "de_core_news_sm",
+}
+
+# We only need tokens + lemmas; the parser and NER are the expensive parts.
+SPACY_EXCLUDE = ["parser", "ner"]
+
+_WORD_RE = re.compile(r"[A-Za-zÄÖÜäöüß\-]+")
+
 
 def _try_import_spacy():
     """Try to import spaCy; return module or None."""
@@ -10,25 +23,89 @@ def _try_import_spacy():
         return None
 
 
-def get_tokenizer(lang: str) -> Union[Callable[[str], List[str]], "spacy.language.Language"]:
-    """Return spaCy model for en/de if available, else simple fallback tokenizer."""
-    spacy = _try_import_spacy()
-    if spacy:
+def _fallback(text: str) -> List[str]:
+    return [t for t in _WORD_RE.findall(text.lower()) if t]
+
+
+def _model_key(lang: str) -> Optional[str]:
+    lang = (lang or "en").lower()
+    for prefix in SPACY_MODELS:
+        if lang.startswith(prefix):
+            return prefix
+    return None
+
+
+class ModelRegistry:
+    """Process-wide cache of loaded spaCy pipelines.
+
+    Each language pipeline is loaded at most once per process. A failed load
+    (spaCy or the model not installed) is cached as well, so we don't hit the
+    disk again on every call and simply use the regex fallback.
+    """
+
+    def __init__(self) -> None:
+        self._models: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def get(self, lang: str):
+        """Return the spaCy pipeline for `lang`, or None if unavailable."""
+        key = _model_key(lang)
+        if key is None:
+            return None
+        if key in self._models:
+            return self._models[key]
+        with self._lock:
+            if key not in self._models:
+                self._models[key] = self._load(SPACY_MODELS[key])
+            return self._models[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._models.clear()
+
+    @staticmethod
+    def _load(name: str):
+        spacy = _try_import_spacy()
+        if not spacy:
+            return None
         try:
-            if lang.startswith("en"):
-                return spacy.load("en_core_web_sm")
-            if lang.startswith("de"):
-                return spacy.load("de_core_news_sm")
+            return spacy.load(name, exclude=SPACY_EXCLUDE)
         except Exception:
             # model not installed -> fallback
-            pass
+            return None
+
 
-    def _fallback(text: str) -> List[str]:
-        return [t for t in re.findall(r"[A-Za-zÄÖÜäöüß\-]+", text.lower()) if t]
+registry = ModelRegistry()
 
+
+def get_tokenizer(lang: str) -> Union[Callable[[str], List[str]], "spacy.language.Language"]:
+    """Return the cached spaCy model for en/de if available, else simple fallback tokenizer."""
+    nlp = registry.get(lang)
+    if nlp is not None:
+        return nlp
     return _fallback
 
 
+def tokenizer_id(lang: str) -> str:
+    """Which tokenizer `tokenize` uses for `lang` (model name + version, or "regex")."""
+    nlp = registry.get(lang)
+    if nlp is None:
+        return "regex"
+    meta = getattr(nlp, "meta", {}) or {}
+    return f"{meta.get('lang', '')}_{meta.get('name', '')}-{meta.get('version', '')}"
+
+
+def _doc_to_lemmas(doc) -> List[str]:
+    tokens: List[str] = []
+    for t in doc:
+        lemma = (t.lemma_ or "").strip().lower()
+        if not lemma:
+            lemma = t.text.lower()
+        if lemma:
+            tokens.append(lemma)
+    return tokens
+
+
 def tokenize(text: str, lang_hint: Optional[str] = None) -> List[str]:
     """Tokenize + lemmatize (if spaCy available), else simple regex split."""
     if not text:
@@ -43,14 +120,28 @@ def tokenize(text: str, lang_hint: Optional[str] = None) -> List[str]:
             return tok(text)
 
         # spaCy Doc
-        doc = tok(text)  # type: ignore
-        tokens: List[str] = []
-        for t in doc:
-            lemma = (t.lemma_ or "").strip().lower()
-            if not lemma:
-                lemma = t.text.lower()
-            if lemma:
-                tokens.append(lemma)
-        return tokens
+        return _doc_to_lemmas(tok(text))  # type: ignore
+    except Exception:
+        return _WORD_RE.findall(text.lower())
+
+
+def tokenize_many(
+    texts: Iterable[str],
+    lang_hint: Optional[str] = None,
+    batch_size: int = 256,
+) -> List[List[str]]:
+    """Tokenize many texts of one language in a single streamed `nlp.pipe` call.
+
+    Returns one token list per input text, in input order.
+    """
+    texts = [t or "" for t in texts]
+    lang = (lang_hint or "en").lower()
+    tok = get_tokenizer(lang)
+
+    if not hasattr(tok, "pipe"):
+        return [tok(t) if t else [] for t in texts]
+
+    try:
+        return [_doc_to_lemmas(doc) for doc in tok.pipe(texts, batch_size=batch_size)]
     except Exception:
-        return re.findall(r"[A-Za-zÄÖÜäöüß\-]+", text.lower())
+        return [tokenize(t, lang) for t in texts]
@@ -0,0 +1,78 @@
+"""Multi-process scoring for large backlogs.
+
+The parent streams pending raw-row ids and hands them out in chunks. Each
+worker process loads the keyword matcher and the spaCy pipelines once (pool
+initializer), reads its rows by id over its own database connection and returns
+the scored chunk. The parent stays the single writer of tenders_filtered and
+consumes results in submission order, so the pass's progress only ever
+moves forward. Workers read and fill scoring_cache themselves.
+"""
+import multiprocessing
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from app.models import TenderRaw
+from app.scoring.keywords import load_keywords
+from app.scoring.matcher import KeywordMatcher
+from app.scoring.nlp import SPACY_MODELS, registry
+from app.scoring.pipeline import SCORING_COLUMNS, _iter_chunks, chunk_last_id, score_rows, scoring_cache
+
+ScoredChunk = Tuple[List[Dict], List[int], Optional[int]]
+
+# Per-process state, filled by _init_worker.
+_worker: Dict = {}
+
+
+def _init_worker(db_url: str, keywords_csv_path: str, use_cache: bool) -> None:
+    keywords_per_lang = load_keywords(keywords_csv_path)
+    _worker["engine"] = create_engine(db_url, pool_pre_ping=True, pool_size=1, max_overflow=0)
+    _worker["keywords"] = keywords_per_lang
+    _worker["matcher"] = KeywordMatcher(keywords_per_lang)
+    _worker["cache"] = scoring_cache(_worker["engine"], keywords_per_lang, _worker["matcher"]) if use_cache else None
+    for lang in SPACY_MODELS:
+        registry.get(lang)
+
+
+def _score_ids(ids: List[int], threshold: int) -> ScoredChunk:
+    stmt = select(*SCORING_COLUMNS).where(TenderRaw.id.in_(ids)).order_by(TenderRaw.id)
+    with _worker["engine"].connect() as conn:
+        rows = conn.execute(stmt).all()
+    hits, misses = score_rows(
+        rows, _worker["keywords"], _worker["matcher"], threshold=threshold, cache=_worker["cache"]
+    )
+    return hits, misses, chunk_last_id(rows)
+
+
+def score_chunks_parallel(
+    db: Session,
+    stmt,
+    keywords_csv_path: str,
+    threshold: int,
+    chunk_size: int,
+    workers: int,
+    use_cache: bool = True,
+) -> Iterator[ScoredChunk]:
+    """Score the rows selected by `stmt` across `workers` processes, yielding chunks in order."""
+    ids_stmt = stmt.with_only_columns(TenderRaw.id)
+    db_url = db.get_bind().url.render_as_string(hide_password=False)
+
+    # spawn: forked children would inherit the parent's open database sockets
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=ctx,
+        initializer=_init_worker,
+        initargs=(db_url, keywords_csv_path, use_cache),
+    ) as pool:
+        pending: Deque[Future] = deque()
+        for rows in _iter_chunks(db, ids_stmt, chunk_size):
+            pending.append(pool.submit(_score_ids, [r.id for r in rows], threshold))
+            # keep every worker busy without queueing the whole table
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
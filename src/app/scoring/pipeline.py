@@ -1,14 +1,24 @@
 from __future__ import annotations
 
-from typing import Tuple, List, Dict
+import hashlib
+import json
+from typing import Tuple, List, Dict, Iterator, Optional, Sequence
 from datetime import datetime, timedelta, timezone
 from difflib import SequenceMatcher
 
+from sqlalchemy import delete, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 
-from app.models import TenderRaw, TenderFiltered
-from app.scoring.nlp import tokenize
+from app.models import TenderRaw, TenderFiltered, ScoringState
+from app.scoring.nlp import tokenize, tokenize_many, tokenizer_id
 from app.scoring.keywords import load_keywords, RAIL_CONTEXT, TARGET_MARKETS
+from app.scoring.matcher import KeywordMatcher
+from app.scoring.cache import CachedText, ScoringCache, content_key, match_version
+from app.scoring.cache import evict as evict_cache
+
+# Bump when compute_score weights or signal rules change; forces a full rescore.
+SCORING_VERSION = 1
 
 
 def fuzzy_contains(text_tokens: List[str], keyword: str, threshold: float = 0.85) -> bool:
@@ -34,28 +44,47 @@ def fuzzy_contains(text_tokens: List[str], keyword: str, threshold: float = 0.85
     return False
 
 
+def _record_text(title: str, description: str) -> str:
+    return (title or "") + " " + (description or "")
+
+
 def match_keywords(
     title: str,
     description: str,
     lang: str,
     keywords_per_lang: Dict[str, List[str]],
+    tokens: Optional[List[str]] = None,
+    matcher: Optional[KeywordMatcher] = None,
 ) -> List[str]:
-    tokens = tokenize((title or "") + " " + (description or ""), lang_hint=lang)
-    matched: List[str] = []
+    """Keywords fuzzy-matching the record (same result as `fuzzy_contains` per keyword).
 
-    for _, kws in keywords_per_lang.items():
-        for kw in kws:
-            if fuzzy_contains(tokens, kw):
-                matched.append(kw)
+    Pass a prebuilt `matcher` when scoring many records; building one per call works
+    but throws away its token cache.
+    """
+    if tokens is None:
+        tokens = tokenize(_record_text(title, description), lang_hint=lang)
+    if matcher is None:
+        matcher = KeywordMatcher(keywords_per_lang)
+    return matcher.match(tokens)
 
-    # dedupe, keep order
-    return list(dict.fromkeys(matched))
+
+def rail_context_signal(
+    title: str,
+    description: str,
+    lang: str,
+    tokens: Optional[List[str]] = None,
+) -> float:
+    if tokens is None:
+        tokens = tokenize(_record_text(title, description), lang_hint=lang)
+    return rail_signal_from_hits(rail_context_hits(tokens, lang))
 
 
-def rail_context_signal(title: str, description: str, lang: str) -> float:
-    tokens = tokenize((title or "") + " " + (description or ""), lang_hint=lang)
+def rail_context_hits(tokens: List[str], lang: str) -> int:
     ctx = RAIL_CONTEXT.get("de" if lang.startswith("de") else "en", [])
-    hits = sum(1 for c in ctx if c in tokens)
+    return sum(1 for c in ctx if c in tokens)
+
+
+def rail_signal_from_hits(hits: int) -> float:
     if hits >= 2:
         return 1.0
     if hits == 1:
@@ -110,39 +139,343 @@ def score_record(
     rec: TenderRaw,
     keywords_per_lang: Dict[str, List[str]],
     threshold: int = 60,
+    tokens: Optional[List[str]] = None,
+    matcher: Optional[KeywordMatcher] = None,
 ) -> Tuple[int, List[str]]:
+    """Score one record.
+
+    Pass `tokens` (from `tokenize_records`) to skip tokenization and a compiled
+    `matcher` to reuse it across records.
+    """
     lang = (rec.language or "en").lower()
-    matched = match_keywords(rec.title or "", rec.description or "", lang, keywords_per_lang)
-    keyword_sig = 1.0 if matched else 0.0
-    rail_sig = rail_context_signal(rec.title or "", rec.description or "", lang)
-    market_sig = market_signal(rec.country or "")
-    deadline_sig = deadline_signal(rec.deadline_date)
-    budget_sig = budget_signal(rec.budget_amount)
+    if tokens is None:
+        tokens = tokenize(_record_text(rec.title, rec.description), lang_hint=lang)
+    matched = match_keywords(
+        rec.title or "",
+        rec.description or "",
+        lang,
+        keywords_per_lang,
+        tokens=tokens,
+        matcher=matcher,
+    )
+    return score_from_text_signals(rec, matched, rail_context_hits(tokens, lang)), matched
+
+
+def score_from_text_signals(rec: TenderRaw, matched: List[str], rail_hits: int) -> int:
+    """Score from the (cacheable) text results plus the cheap per-row signals."""
+    return compute_score(
+        1.0 if matched else 0.0,
+        rail_signal_from_hits(rail_hits),
+        market_signal(rec.country or ""),
+        deadline_signal(rec.deadline_date),
+        budget_signal(rec.budget_amount),
+    )
+
+
+def tokenize_records(records: Sequence[TenderRaw], batch_size: int = 256) -> List[List[str]]:
+    """Tokenize title + description of many records, one `nlp.pipe` stream per language.
+
+    Returns token lists aligned with `records`.
+    """
+    by_lang: Dict[str, List[int]] = {}
+    for i, rec in enumerate(records):
+        lang = (rec.language or "en").lower()
+        by_lang.setdefault(lang, []).append(i)
+
+    out: List[List[str]] = [[] for _ in records]
+    for lang, idxs in by_lang.items():
+        texts = [_record_text(records[i].title, records[i].description) for i in idxs]
+        for i, toks in zip(idxs, tokenize_many(texts, lang_hint=lang, batch_size=batch_size)):
+            out[i] = toks
+    return out
+
+
+def scoring_config_hash(keywords_per_lang: Dict[str, List[str]], threshold: int) -> str:
+    """Hash of everything that affects scores; a change invalidates the scoring watermark."""
+    payload = json.dumps(
+        {
+            "version": SCORING_VERSION,
+            "threshold": threshold,
+            "keywords": keywords_per_lang,
+            "rail_context": RAIL_CONTEXT,
+            "markets": sorted(TARGET_MARKETS),
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _get_state(db: Session, name: str) -> ScoringState:
+    state = db.get(ScoringState, name)
+    if state is None:
+        state = ScoringState(name=name, last_raw_id=0)
+        db.add(state)
+    return state
+
+
+def _upsert_filtered(db: Session, rows: List[Dict]) -> None:
+    stmt = pg_insert(TenderFiltered).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[TenderFiltered.raw_id],
+        set_={
+            "relevance_score": stmt.excluded.relevance_score,
+            "matched_keywords": stmt.excluded.matched_keywords,
+        },
+    )
+    db.execute(stmt)
+
+
+def _text_signals(
+    rows: Sequence[TenderRaw],
+    matcher: KeywordMatcher,
+    cache: Optional[ScoringCache],
+) -> List[Tuple[List[str], int]]:
+    """(matched keywords, rail-context hits) per row; cached text skips tokenizing and/or matching."""
+    langs = [(rec.language or "en").lower() for rec in rows]
+    if cache is None:
+        keys = [None] * len(rows)
+        cached: Dict[str, CachedText] = {}
+    else:
+        keys = [content_key(rec.title, rec.description, lang) for rec, lang in zip(rows, langs)]
+        cached = cache.lookup(keys)
+
+    todo = [
+        i for i, key in enumerate(keys)
+        if key not in cached or (cached[key].matched is None and cached[key].tokens is None)
+    ]
+    fresh = dict(zip(todo, tokenize_records([rows[i] for i in todo])))
+
+    out: List[Tuple[List[str], int]] = []
+    computed: Dict[str, CachedText] = {}
+    for i, (key, lang) in enumerate(zip(keys, langs)):
+        entry = cached.get(key) or computed.get(key)
+        if entry is not None and entry.matched is not None:
+            out.append((entry.matched, entry.rail_hits))
+            continue
+        tokens = fresh[i] if i in fresh else entry.tokens
+        matched, hits = matcher.match(tokens), rail_context_hits(tokens, lang)
+        out.append((matched, hits))
+        if key is not None:
+            keep = tokens if tokenizer_id(lang) != "regex" else None
+            computed[key] = CachedText(keep, matched, hits)
+    if cache is not None:
+        cache.store(computed)
+    return out
+
+
+def score_rows(
+    rows: Sequence[TenderRaw],
+    keywords_per_lang: Dict[str, List[str]],
+    matcher: KeywordMatcher,
+    threshold: int = 60,
+    cache: Optional[ScoringCache] = None,
+) -> Tuple[List[Dict], List[int]]:
+    """Score a batch of rows; return (TenderFiltered row dicts for hits, raw ids of misses).
+
+    `rows` only need the attributes `score_record` reads (see SCORING_COLUMNS).
+    With a `cache`, rows whose text was scored before only recompute the cheap
+    signals; gives the same result as `score_record` per row.
+    """
+    hits: List[Dict] = []
+    misses: List[int] = []
+    for rec, (matched, rail_hits) in zip(rows, _text_signals(rows, matcher, cache)):
+        score = score_from_text_signals(rec, matched, rail_hits)
+        if score >= threshold:
+            hits.append(
+                {
+                    "raw_id": rec.id,
+                    "relevance_score": score,
+                    "matched_keywords": ", ".join(matched),
+                    "notes": None,
+                }
+            )
+        else:
+            misses.append(rec.id)
+    return hits, misses
+
+
+# Only what score_record needs; descriptions are the bulk of a row.
+SCORING_COLUMNS = (
+    TenderRaw.id,
+    TenderRaw.title,
+    TenderRaw.description,
+    TenderRaw.language,
+    TenderRaw.country,
+    TenderRaw.deadline_date,
+    TenderRaw.budget_amount,
+)
 
-    score = compute_score(keyword_sig, rail_sig, market_sig, deadline_sig, budget_sig)
-    return score, matched
+# A row's updated_at is now() of the transaction that wrote it, i.e. that
+# transaction's start. Rows of a transaction still open when a pass starts are
+# invisible to the pass and may commit later, so the pass covers every
+# updated_at from the oldest open writing transaction on (other roles'
+# sessions are only visible to pg_read_all_stats members).
+_PASS_START_SQL = text(
+    """
+    SELECT LEAST(now(), min(xact_start)) FROM pg_stat_activity
+    WHERE backend_xid IS NOT NULL AND pid <> pg_backend_pid()
+    """
+)
+
+
+def _pending_rows_stmt(state: ScoringState):
+    cond = TenderRaw.id > (state.last_raw_id or 0)
+    if state.last_updated_at is not None:
+        cond = cond & (TenderRaw.updated_at >= state.last_updated_at)
+    return select(*SCORING_COLUMNS).where(cond).order_by(TenderRaw.id)
+
+
+def _iter_chunks(db: Session, stmt, chunk_size: int) -> Iterator[Sequence]:
+    """Stream `stmt` through a server-side cursor, `chunk_size` rows at a time.
+
+    Reads go through their own connection so the session can commit after
+    every chunk without closing the cursor.
+    """
+    with db.get_bind().connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=chunk_size).execute(stmt)
+        for chunk in result.partitions():
+            yield chunk
+
+
+def chunk_last_id(rows: Sequence) -> Optional[int]:
+    """Highest id of an id-ordered chunk: how far the pass got."""
+    return rows[-1].id if rows else None
+
+
+def _write_chunk(
+    db: Session,
+    state: ScoringState,
+    hits: List[Dict],
+    misses: List[int],
+    last_id: Optional[int],
+) -> None:
+    """Persist one scored chunk and the pass's progress in the same transaction."""
+    if hits:
+        _upsert_filtered(db, hits)
+    if misses:
+        db.execute(delete(TenderFiltered).where(TenderFiltered.raw_id.in_(misses)))
+
+    if last_id is not None:
+        state.last_raw_id = max(state.last_raw_id or 0, last_id)
+    db.commit()
+
+
+def _score_chunks_serial(
+    db: Session,
+    stmt,
+    keywords_per_lang: Dict[str, List[str]],
+    threshold: int,
+    chunk_size: int,
+    use_cache: bool = True,
+) -> Iterator[Tuple[List[Dict], List[int], Optional[int]]]:
+    matcher = KeywordMatcher(keywords_per_lang)
+    cache = scoring_cache(db.get_bind(), keywords_per_lang, matcher) if use_cache else None
+    for rows in _iter_chunks(db, stmt, chunk_size):
+        hits, misses = score_rows(rows, keywords_per_lang, matcher, threshold=threshold, cache=cache)
+        yield hits, misses, chunk_last_id(rows)
+
+
+def scoring_cache(bind, keywords_per_lang: Dict[str, List[str]], matcher: KeywordMatcher) -> ScoringCache:
+    return ScoringCache(bind, match_version(keywords_per_lang, matcher.threshold))
 
 
 def run_scoring(
     db: Session,
     keywords_csv_path: str = "config/keywords_multilingual.csv",
     threshold: int = 60,
+    full: bool = False,
+    state_name: str = "default",
+    chunk_size: int = 1000,
+    workers: int = 1,
+    use_cache: bool = True,
 ) -> int:
-    """Iterate over all TenderRaw, write matching tenders into TenderFiltered."""
+    """Score new or changed TenderRaw rows and upsert hits into TenderFiltered.
+
+    Incremental by default: a pass scores the rows written (updated_at) since
+    the previous pass started, counting from the oldest transaction that was
+    still open then, so rows committed late are not skipped. Everything is
+    rescored when `full` is set or the keyword/scoring config changed since
+    the last run. Rescored rows that fall below `threshold` lose their
+    TenderFiltered row. The deadline part of a score is computed from today's
+    date, so it only moves for rows that are scored again: a full rescore
+    (`--full`) refreshes it everywhere.
+
+    Rows are streamed `chunk_size` at a time in id order and each chunk is
+    committed together with the pass's progress (last id), so memory stays flat
+    and an interrupted pass resumes where it stopped. With `workers` > 1 chunks are scored in a process pool
+    (see app.scoring.parallel); this process stays the only writer of
+    tenders_filtered. With `use_cache`, text that was scored before is not
+    tokenized or matched again (see app.scoring.cache).
+
+    Returns the number of TenderFiltered rows written.
+    """
     keywords_per_lang = load_keywords(keywords_csv_path)
-    inserted = 0
+    config_hash = scoring_config_hash(keywords_per_lang, threshold)
+    state = _get_state(db, state_name)
 
-    for rec in db.query(TenderRaw).all():
-        score, matched = score_record(rec, keywords_per_lang, threshold=threshold)
-        if score >= threshold:
-            tf = TenderFiltered(
-                raw_id=rec.id,
-                relevance_score=score,
-                matched_keywords=", ".join(matched),
-                notes=None,
-            )
-            db.add(tf)
-            inserted += 1
+    if full or state.config_hash != config_hash:
+        # a full rescore is an incremental pass from an empty watermark
+        state.last_updated_at = None
+        state.pass_started_at = None
+    state.config_hash = config_hash
+    if state.pass_started_at is None:
+        # a new pass; otherwise resume the interrupted one with its own start
+        state.pass_started_at = db.execute(_PASS_START_SQL).scalar_one()
+        state.last_raw_id = 0
+    db.commit()
+
+    stmt = _pending_rows_stmt(state)
+    if workers > 1:
+        from app.scoring.parallel import score_chunks_parallel
 
+        chunks = score_chunks_parallel(db, stmt, keywords_csv_path, threshold, chunk_size, workers, use_cache)
+    else:
+        chunks = _score_chunks_serial(db, stmt, keywords_per_lang, threshold, chunk_size, use_cache)
+
+    written = 0
+    for hits, misses, last_id in chunks:
+        _write_chunk(db, state, hits, misses, last_id)
+        written += len(hits)
+    state.last_updated_at = state.pass_started_at
+    state.pass_started_at = None
+    state.last_raw_id = 0
     db.commit()
-    return inserted
+
+    if use_cache:
+        evict_cache(db.get_bind())
+    return written
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import argparse
+
+    from app.db import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Score tenders_raw into tenders_filtered.")
+    parser.add_argument("--keywords", default="config/keywords_multilingual.csv")
+    parser.add_argument("--threshold", type=int, default=60)
+    parser.add_argument("--full", action="store_true", help="rescore every row")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=1, help="scoring processes (default 1)")
+    parser.add_argument("--no-cache", action="store_true", help="don't read or write scoring_cache")
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        written = run_scoring(
+            db,
+            keywords_csv_path=args.keywords,
+            threshold=args.threshold,
+            full=args.full,
+            chunk_size=args.chunk_size,
+            workers=args.workers,
+            use_cache=not args.no_cache,
+        )
+    finally:
+        db.close()
+    print(f"Scored; {written} filtered rows written.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,411 @@
+"""Concurrent portal crawl on one browser (async Playwright).
+
+One Chromium instance serves a pool of browser contexts that all start from the
+saved login session (`storage_state`), so N keyword searches run side by side
+without logging in N times. Politeness comes from a per-host token bucket
+instead of fixed random sleeps: every navigation/click against a host takes a
+token, so the request rate per portal stays bounded no matter how many
+searches run concurrently.
+
+Fetch modes (`mode=`):
+
+- "browser": every search runs in a browser context; only the HTML document
+  is loaded (images, fonts, stylesheets, scripts, XHR are aborted at the route
+  level) and pages wait for DOMContentLoaded instead of network idle.
+- "http": result pages are plain GET requests with the cookies of the saved
+  session (`app.scraper.http_fetch`); no browser at all.
+- "auto" (default): HTTP first, browser for a keyword only when HTTP fails or
+  the session has expired. The browser is launched lazily, so a crawl with a
+  valid session never starts Chromium.
+
+    records = run_crawl(["wheel lathe", "Radsatz"], max_pages=3, concurrency=4)
+"""
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, AsyncIterator, Callable, Dict, FrozenSet, List, Optional, Sequence
+from urllib.parse import urlsplit
+
+import structlog
+from sqlalchemy.orm import Session
+
+from app.repository import TenderRepository
+
+if TYPE_CHECKING:
+    from app.http_cache import HttpCache
+    from app.scraper.portal import KnownIds
+
+log = structlog.get_logger()
+
+# Requests per second and burst allowed per portal host. The old sequential
+# scraper waited 1.5-3.5 s between actions; 0.5/s keeps the same average pace.
+DEFAULT_RATE = float(os.getenv("PORTAL_RATE_PER_SEC", "0.5"))
+DEFAULT_BURST = int(os.getenv("PORTAL_RATE_BURST", "2"))
+DEFAULT_CONCURRENCY = int(os.getenv("PORTAL_CONCURRENCY", "4"))
+DEFAULT_MODE = os.getenv("PORTAL_FETCH_MODE", "auto")
+FETCH_MODES = ("auto", "http", "browser")
+
+# Resource types the browser still loads; everything else is aborted. Portals
+# that render results client-side need "script", "xhr" and "fetch" here.
+ALLOWED_RESOURCE_TYPES = frozenset(
+    t.strip() for t in os.getenv("PORTAL_ALLOWED_RESOURCES", "document").split(",") if t.strip()
+)
+WAIT_UNTIL = os.getenv("PORTAL_WAIT_UNTIL", "domcontentloaded")
+
+
+class TokenBucket:
+    """Async token bucket: `rate` tokens per second, at most `burst` banked."""
+
+    def __init__(self, rate: float, burst: int = 1, clock: Callable[[], float] = time.monotonic):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._clock = clock
+        self._tokens = float(self.burst)
+        self._updated = clock()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        # the lock makes waiters queue up in order instead of racing for tokens
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+
+class HostRateLimiter:
+    """One `TokenBucket` per host, created on first use."""
+
+    def __init__(self, rate: float = DEFAULT_RATE, burst: int = DEFAULT_BURST, per_host: Optional[Dict[str, float]] = None):
+        self.rate = rate
+        self.burst = burst
+        self.per_host = per_host or {}
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    def bucket(self, url: str) -> TokenBucket:
+        host = urlsplit(url).netloc.lower()
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = TokenBucket(self.per_host.get(host, self.rate), self.burst)
+        return bucket
+
+    async def wait(self, url: str) -> None:
+        await self.bucket(url).acquire()
+
+
+class ContextPool:
+    """Fixed set of browser contexts sharing one saved session, checked out one at a time."""
+
+    def __init__(
+        self,
+        browser,
+        size: int,
+        storage_state: Optional[Path] = None,
+        allowed_resources: Optional[FrozenSet[str]] = ALLOWED_RESOURCE_TYPES,
+    ):
+        self.browser = browser
+        self.size = max(1, size)
+        self.storage_state = storage_state
+        self.allowed_resources = allowed_resources
+        self._free: "asyncio.Queue" = asyncio.Queue()
+        self._all: List = []
+
+    async def start(self) -> "ContextPool":
+        kwargs = {}
+        if self.storage_state is not None and Path(self.storage_state).exists():
+            kwargs["storage_state"] = str(self.storage_state)
+        for _ in range(self.size):
+            context = await self.browser.new_context(**kwargs)
+            if self.allowed_resources is not None:
+                await block_resources(context, self.allowed_resources)
+            self._all.append(context)
+            self._free.put_nowait(context)
+        return self
+
+    @asynccontextmanager
+    async def context(self) -> AsyncIterator:
+        context = await self._free.get()
+        try:
+            yield context
+        finally:
+            self._free.put_nowait(context)
+
+    async def close(self) -> None:
+        for context in self._all:
+            await context.close()
+        self._all.clear()
+
+
+async def block_resources(context, allowed: FrozenSet[str] = ALLOWED_RESOURCE_TYPES) -> None:
+    """Abort every request of `context` whose resource type is not in `allowed`."""
+
+    async def handle(route) -> None:
+        if route.request.resource_type in allowed:
+            await route.continue_()
+        else:
+            await route.abort()
+
+    await context.route("**/*", handle)
+
+
+async def ensure_session(browser, creds: Dict[str, str], storage_path: Path, limiter: HostRateLimiter) -> None:
+    """Log in once and save cookies to `storage_path` unless a session is already stored."""
+    if storage_path.exists():
+        return
+    storage_path.parent.mkdir(parents=True, exist_ok=True)
+    context = await browser.new_context()
+    try:
+        page = await context.new_page()
+        login_url = f"{creds['base_url']}/login"
+        await limiter.wait(login_url)
+        await page.goto(login_url, wait_until="networkidle")
+        # --- adapt selectors to your portal ---
+        await page.fill('input[name="username"]', creds["user"])
+        await page.fill('input[name="password"]', creds["password"])
+        await limiter.wait(login_url)
+        await page.click('button[type="submit"]')
+        await page.wait_for_load_state("networkidle")
+        await context.storage_state(path=str(storage_path))
+    finally:
+        await context.close()
+
+
+async def search_keyword(
+    context,
+    base_url: str,
+    keywords: str,
+    limiter: HostRateLimiter,
+    max_pages: int = 3,
+    known: Optional["KnownIds"] = None,
+) -> List[Dict]:
+    """Run one keyword search in `context` and return normalized records of up to `max_pages` pages.
+
+    With `known`, stops at the first page whose records are all stored already.
+    """
+    from app.scraper.portal import normalize_records, page_is_known, parse_results_html
+
+    records: List[Dict] = []
+    page = await context.new_page()
+    try:
+        # --- Search step (adapt URL and selectors!) ---
+        search_url = f"{base_url}/search"
+        await limiter.wait(search_url)
+        await page.goto(search_url, wait_until=WAIT_UNTIL)
+        try:
+            await page.fill('input[name="q"]', keywords)
+        except Exception:
+            pass
+        await limiter.wait(search_url)
+        try:
+            await page.click('button[type="submit"]')
+        except Exception:
+            pass
+        await page.wait_for_load_state(WAIT_UNTIL)
+
+        current_page = 1
+        while current_page <= max_pages:
+            page_records = normalize_records(parse_results_html(await page.content()))
+            if page_is_known(page_records, known):
+                break
+            records.extend(page_records)
+            if current_page == max_pages:
+                break
+            next_button = await page.query_selector("a.next, button.next")
+            if not next_button:
+                break
+            try:
+                await limiter.wait(page.url)
+                await next_button.click()
+                await page.wait_for_load_state(WAIT_UNTIL)
+            except Exception:
+                break
+            current_page += 1
+    finally:
+        await page.close()
+    return records
+
+
+class BrowserSession:
+    """Browser + context pool for one crawl, launched on first use."""
+
+    def __init__(
+        self,
+        creds: Dict[str, str],
+        storage_path: Path,
+        limiter: HostRateLimiter,
+        size: int,
+        login: bool = True,
+        headless: bool = True,
+        allowed_resources: Optional[FrozenSet[str]] = ALLOWED_RESOURCE_TYPES,
+    ):
+        self.creds = creds
+        self.storage_path = storage_path
+        self.limiter = limiter
+        self.size = size
+        self.login = login
+        self.headless = headless
+        self.allowed_resources = allowed_resources
+        self._lock = asyncio.Lock()
+        self._playwright = None
+        self._browser = None
+        self._pool: Optional[ContextPool] = None
+
+    async def _start(self) -> ContextPool:
+        async with self._lock:
+            if self._pool is None:
+                try:
+                    from playwright.async_api import async_playwright  # type: ignore
+                except Exception as exc:
+                    raise RuntimeError(
+                        "playwright is not installed. Install with 'pip install playwright' and run 'playwright install'."
+                    ) from exc
+                self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.chromium.launch(headless=self.headless)
+                if self.login:
+                    await ensure_session(self._browser, self.creds, self.storage_path, self.limiter)
+                self._pool = await ContextPool(
+                    self._browser, self.size, self.storage_path, self.allowed_resources
+                ).start()
+            return self._pool
+
+    @asynccontextmanager
+    async def context(self) -> AsyncIterator:
+        pool = await self._start()
+        async with pool.context() as context:
+            yield context
+
+    async def close(self) -> None:
+        if self._pool is not None:
+            await self._pool.close()
+        if self._browser is not None:
+            await self._browser.close()
+        if self._playwright is not None:
+            await self._playwright.stop()
+
+
+async def crawl_keywords(
+    keywords: Sequence[str],
+    base_url: Optional[str] = None,
+    max_pages: int = 3,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    limiter: Optional[HostRateLimiter] = None,
+    storage_state: Optional[Path] = None,
+    login: bool = True,
+    headless: bool = True,
+    mode: str = DEFAULT_MODE,
+    allowed_resources: Optional[FrozenSet[str]] = ALLOWED_RESOURCE_TYPES,
+    results_path: Optional[str] = None,
+    known: Optional["KnownIds"] = None,
+    cache: Optional["HttpCache"] = None,
+) -> Dict[str, List[Dict]]:
+    """Search every keyword concurrently; returns {keyword: normalized records}.
+
+    A failed search is logged and yields an empty list so one bad keyword does
+    not abort the whole crawl. `allowed_resources=None` disables route blocking.
+    `known` enables early-stop pagination (see `run_playwright_search`).
+    HTTP fetches go through `cache` (default: `app.http_cache.default_cache()`).
+    """
+    import httpx
+
+    from app.http_cache import default_cache
+    from app.scraper.http_fetch import RESULTS_PATH, PortalHttpClient, SessionExpired
+    from app.scraper.portal import STORAGE_STATE_PATH, _get_credentials
+
+    if mode not in FETCH_MODES:
+        raise ValueError(f"mode must be one of {FETCH_MODES}, got {mode!r}")
+    creds = _get_credentials() if login or base_url is None else {"base_url": base_url.rstrip("/")}
+    base_url = (base_url or creds["base_url"]).rstrip("/")
+    storage_path = Path(storage_state or STORAGE_STATE_PATH)
+    limiter = limiter or HostRateLimiter()
+    results: Dict[str, List[Dict]] = {}
+
+    # HTTP needs the saved session unless the portal is public (login=False)
+    use_http = mode != "browser" and (storage_path.exists() or not login)
+    http = (
+        PortalHttpClient(
+            base_url,
+            storage_path,
+            limiter,
+            results_path=results_path or RESULTS_PATH,
+            cache=cache if cache is not None else default_cache(),
+        )
+        if use_http
+        else None
+    )
+    browser = BrowserSession(creds, storage_path, limiter, concurrency, login, headless, allowed_resources)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def one(keyword: str) -> None:
+        nonlocal use_http
+        started = time.monotonic()
+        records: Optional[List[Dict]] = None
+        how = "http"
+        async with semaphore:
+            try:
+                if use_http:
+                    try:
+                        records = await http.search(keyword, max_pages, known)
+                    except SessionExpired as exc:
+                        log.warning("portal_session_expired", keyword=keyword, error=str(exc))
+                        if mode == "auto":
+                            # rest of this crawl goes through the browser, which logs in again
+                            use_http = False
+                            if login:
+                                storage_path.unlink(missing_ok=True)
+                    except httpx.HTTPError as exc:
+                        log.warning("portal_http_fetch_failed", keyword=keyword, error=str(exc))
+                if records is None and mode != "http":
+                    how = "browser"
+                    async with browser.context() as context:
+                        records = await search_keyword(context, base_url, keyword, limiter, max_pages, known)
+            except Exception:
+                log.exception("portal_search_failed", keyword=keyword)
+        results[keyword] = records or []
+        log.info(
+            "portal_search_done",
+            keyword=keyword,
+            via=how,
+            records=len(results[keyword]),
+            seconds=round(time.monotonic() - started, 2),
+        )
+
+    try:
+        await asyncio.gather(*(one(k) for k in keywords))
+    finally:
+        if http is not None:
+            await http.close()
+        await browser.close()
+
+    return {k: results.get(k, []) for k in keywords}
+
+
+def run_crawl(keywords: Sequence[str], **kwargs) -> Dict[str, List[Dict]]:
+    """Blocking wrapper around `crawl_keywords`."""
+    return asyncio.run(crawl_keywords(keywords, **kwargs))
+
+
+def crawl_and_ingest(db: Session, keywords: Sequence[str], stop_when_known: bool = True, **kwargs) -> int:
+    """Crawl all keywords and upsert the results into tenders_raw; returns rows inserted.
+
+    Keywords overlap, so the same tender can come back several times; rows that
+    already exist are only rewritten when their content changed.
+    """
+    from app.scraper.portal import known_ids_lookup
+
+    if stop_when_known:
+        kwargs.setdefault("known", known_ids_lookup(db))
+    per_keyword = run_crawl(keywords, **kwargs)
+    records = [r for recs in per_keyword.values() for r in recs]
+    counts = TenderRepository(db).upsert_many_raw(records)
+    db.commit()
+    return counts.inserted
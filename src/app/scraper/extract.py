@@ -0,0 +1,278 @@
+"""Single-pass extraction of result records from portal search pages.
+
+A `PortalProfile` describes where records and their fields live (tag + CSS
+class, optional attribute, optional label prefix to strip). Each profile
+compiles one token pattern that only matches the tag names it uses (plus
+comments, <script> and <style>, which are skipped), so everything else on the
+page is passed over by the regex engine; an element whose content has no
+tags at all is a single token. `ResultExtractor` walks those tokens in one
+pass, can be fed chunks as they arrive, and runs in linear time.
+
+Nesting is tracked by counting open/close tags of the block's (and field's)
+own tag name, so a record ends at its matching `</div>` rather than the first
+one, and unclosed tags of other kinds (<p>, <li>, ...) don't derail it. Field
+text is the tag-stripped slice between a field's start tag and its matching
+end tag.
+"""
+import html as _html
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Optional, Pattern, Tuple
+
+VOID_TAGS = frozenset({
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "param", "source", "track", "wbr",
+})
+
+# what follows the "<" of a comment / script / style; patterns share one leading
+# "<" for all alternatives, which lets the engine skip straight to candidates
+_SKIP = r"!--.*?-->|(?:script|style)\b.*?</(?:script|style)\s*>"
+_ATTR_RE = re.compile(r"""([^\s=/>"']+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+)))?""")
+_SKIP_RE = re.compile(r"<(?:" + _SKIP + ")", re.S | re.I)
+_MARKUP_RE = re.compile(r"<(?:" + _SKIP + r"|[^>]*>)", re.S | re.I)
+_OPEN_SKIP_RE = re.compile(r"<!--|<(?:script|style)\b", re.I)
+
+
+def _token_pattern(tags) -> Pattern:
+    """Token regex: group 1 is a closing tag's name; an opening tag has its name
+    in group 2 and attributes in 3, and when its content has no tags at all
+    (and it isn't self-closing) the whole element is one token with the
+    content in 4. Comments, <script> and <style> match with no group set.
+    """
+    names = "|".join(sorted((re.escape(t) for t in tags), key=len, reverse=True))
+    # attribute text is matched in runs rather than per character
+    return re.compile(
+        r"<(?:" + _SKIP
+        + r"|/(" + names + r")(?=[\s/>])[^>]*>"
+        r"|(" + names + r")(?=[\s/>])((?:[^'\">]+|\"[^\"]*\"|'[^']*')*)>(?:(?<!/>)([^<]*)</\2\s*>)?)",
+        re.S | re.I,
+    )
+
+
+def _parse_attrs(raw: str) -> Dict[str, str]:
+    attrs: Dict[str, str] = {}
+    for m in _ATTR_RE.finditer(raw):
+        name = m.group(1).lower()
+        if name not in attrs:
+            value = m.group(2) if m.group(2) is not None else m.group(3) if m.group(3) is not None else m.group(4)
+            attrs[name] = _html.unescape(value) if value else ""
+    return attrs
+
+
+@lru_cache(maxsize=None)
+def _attr_re(name: str) -> Pattern:
+    return re.compile(r"""(?:^|\s)%s\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))""" % re.escape(name), re.I)
+
+
+def _attr_value(raw: str, name: str) -> Optional[str]:
+    """Value of one attribute in a raw attribute string (None if absent or valueless)."""
+    m = _attr_re(name).search(raw)
+    if m is None:
+        return None
+    value = next(v for v in m.groups() if v is not None)
+    return _html.unescape(value)
+
+
+@lru_cache(maxsize=4096)
+def _classes(raw: str) -> FrozenSet[str]:
+    """CSS classes of a raw attribute string (cached: result pages repeat the same few)."""
+    value = _attr_value(raw, "class")
+    return frozenset(value.split()) if value else frozenset()
+
+
+@dataclass(frozen=True)
+class FieldSpec:
+    tag: str
+    css_class: str
+    attr: Optional[str] = None  # take this attribute instead of the text
+    strip_prefix: Optional[str] = None  # regex removed from the start of the text
+
+
+@dataclass
+class PortalProfile:
+    block_tag: str
+    block_class: str
+    fields: Dict[str, FieldSpec]
+    _prefixes: Dict[str, Pattern] = field(init=False, repr=False)
+    _by_tag: Dict[str, List[Tuple[str, FieldSpec]]] = field(init=False, repr=False)
+    _token_re: Pattern = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self._prefixes = {
+            name: re.compile(r"^\s*(?:%s)\s*" % spec.strip_prefix, re.I)
+            for name, spec in self.fields.items()
+            if spec.strip_prefix
+        }
+        self._by_tag = {}
+        for name, spec in self.fields.items():
+            self._by_tag.setdefault(spec.tag, []).append((name, spec))
+        self._token_re = _token_pattern(set(self._by_tag) | {self.block_tag})
+
+    def clean(self, name: str, markup: str) -> Optional[str]:
+        if "<" in markup:
+            markup = _MARKUP_RE.sub(" ", markup)
+        text = " ".join(_html.unescape(markup).split())
+        prefix = self._prefixes.get(name)
+        if prefix:
+            text = prefix.sub("", text, count=1)
+        return text or None
+
+
+DEFAULT_PROFILE = PortalProfile(
+    block_tag="div",
+    block_class="result",
+    fields={
+        "title": FieldSpec("a", "result-title"),
+        "url": FieldSpec("a", "result-title", attr="href"),
+        "budget": FieldSpec("span", "result-budget", strip_prefix="Budget:"),
+        "deadline": FieldSpec("span", "result-deadline", strip_prefix="Deadline:"),
+        "description": FieldSpec("div", "result-description"),
+        "country": FieldSpec("span", "result-country", strip_prefix="Country:"),
+    },
+)
+
+PROFILES: Dict[str, PortalProfile] = {"default": DEFAULT_PROFILE}
+
+
+class ResultExtractor:
+    """Incremental extractor; `feed()` HTML, then `close()` and read `records`."""
+
+    def __init__(self, profile: PortalProfile = DEFAULT_PROFILE):
+        self.profile = profile
+        self.records: List[Dict[str, Optional[str]]] = []
+        self._buf = ""
+        # tokens before this offset in _buf were handled already; _buf may still
+        # start earlier, at the content of a field being captured
+        self._scan = 0
+        self._current: Optional[Dict[str, Optional[str]]] = None
+        self._block_depth = 0
+        # fields currently capturing: name -> [tag, depth, content start offset in _buf]
+        self._open: Dict[str, list] = {}
+
+    def feed(self, data: str) -> None:
+        self._buf += data
+        self._consume(final=False)
+
+    def close(self) -> None:
+        self._consume(final=True)
+        if self._current is not None:  # truncated page: keep what we have
+            self._finish_record(len(self._buf))
+
+    def _safe_end(self) -> int:
+        """Offset before which every token is complete (more data may follow)."""
+        buf = self._buf
+        end = buf.rfind("<")
+        if end < 0:
+            return len(buf)
+        # an unterminated comment/script could still hide tags we must not see
+        i = self._scan
+        while True:
+            m = _OPEN_SKIP_RE.search(buf, i, end)
+            if m is None:
+                return end
+            skipped = _SKIP_RE.match(buf, m.start())
+            if skipped is None:
+                return m.start()
+            if skipped.end() > end:  # the last "<" was inside a finished comment/script
+                return skipped.end()
+            i = skipped.end()
+
+    def _consume(self, final: bool) -> None:
+        buf = self._buf
+        # never back before _scan: the last "<" can be one inside a comment/script consumed already
+        limit = len(buf) if final else max(self._scan, self._safe_end())
+        block_tag = self.profile.block_tag
+        for m in self.profile._token_re.finditer(buf, self._scan, limit):
+            closing, tag, attrs, text = m.group(1, 2, 3, 4)
+            if closing is not None:
+                if self._current is not None:
+                    self._end(closing.lower(), m.start())
+            elif tag is not None:  # else comment / script / style
+                tag = tag.lower()
+                if self._current is None and tag != block_tag:
+                    continue  # outside a record only the block's start tag matters
+                self._start(tag, attrs, attrs.endswith("/"), m.end(), text)
+
+        # keep the unprocessed tail plus any field content still being captured
+        keep = limit
+        for state in self._open.values():
+            keep = min(keep, state[2])
+        self._scan = limit - keep
+        if keep:
+            self._buf = buf[keep:]
+            for state in self._open.values():
+                state[2] -= keep
+
+    # -- record boundaries --------------------------------------------------
+
+    def _start_record(self) -> None:
+        self._current = {name: None for name in self.profile.fields}
+        self._block_depth = 1
+        self._open = {}
+
+    def _finish_record(self, at: int) -> None:
+        for name, (_, _, start) in self._open.items():
+            if self._current.get(name) is None:
+                self._current[name] = self.profile.clean(name, self._buf[start:at])
+        self.records.append(self._current)
+        self._current = None
+        self._open = {}
+
+    # -- token handlers -----------------------------------------------------
+
+    def _start(self, tag: str, raw_attrs: str, self_closing: bool, content_start: int, text: Optional[str]) -> None:
+        """Start tag; `text` is set when the element has no nested tags and ends in the same token."""
+        p = self.profile
+        opens_scope = not self_closing and tag not in VOID_TAGS
+        if self._current is None:
+            if opens_scope and p.block_class in _classes(raw_attrs):
+                self._start_record()
+                if text is not None:
+                    self._finish_record(content_start)
+            return
+
+        if opens_scope and text is None:
+            if tag == p.block_tag:
+                self._block_depth += 1
+            for state in self._open.values():
+                if state[0] == tag:
+                    state[1] += 1
+
+        specs = p._by_tag.get(tag)
+        if not specs:
+            return
+        classes = _classes(raw_attrs)
+        for name, spec in specs:
+            if spec.css_class not in classes or self._current[name] is not None or name in self._open:
+                continue  # first occurrence wins
+            if spec.attr:
+                value = _attr_value(raw_attrs, spec.attr)
+                self._current[name] = value.strip() if value else None
+            elif text is not None:
+                self._current[name] = p.clean(name, text)
+            elif opens_scope:
+                self._open[name] = [tag, 1, content_start]
+
+    def _end(self, tag: str, at: int) -> None:
+        if self._current is None:
+            return
+        if self._open:
+            for name in list(self._open):
+                state = self._open[name]
+                if state[0] == tag:
+                    state[1] -= 1
+                    if state[1] == 0:
+                        self._current[name] = self.profile.clean(name, self._buf[state[2]:at])
+                        del self._open[name]
+        if tag == self.profile.block_tag:
+            self._block_depth -= 1
+            if self._block_depth == 0:
+                self._finish_record(at)
+
+
+def extract_results(html: str, profile: PortalProfile = DEFAULT_PROFILE) -> List[Dict[str, Optional[str]]]:
+    parser = ResultExtractor(profile)
+    parser.feed(html)
+    parser.close()
+    return parser.records
@@ -0,0 +1,132 @@
+"""Browserless fetching of portal result pages.
+
+Once Playwright has logged in and saved `storage_state`, result pages are plain
+GET requests: the session cookies are loaded into an httpx client and the HTML
+goes straight to `parse_results_html` -- no browser, no images, fonts or
+scripts. A redirect to the login page (or 401/403) raises `SessionExpired` so
+the crawler can fall back to the browser and log in again.
+
+With an `HttpCache` (see `app.http_cache`) pages are revalidated with
+If-None-Match / If-Modified-Since, so an unchanged page costs a 304 instead of
+a download. It is still parsed: the cache entry is written when the page is
+fetched, before its records are stored, so skipping it could lose records
+whose ingest failed. Already stored pages end the crawl through `known`.
+"""
+import json
+import os
+import re
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+import httpx
+
+from app.http_cache import HttpCache, caching_transport, not_modified
+from app.scraper.extract import _parse_attrs
+
+if TYPE_CHECKING:
+    from app.scraper.crawl import HostRateLimiter
+    from app.scraper.portal import KnownIds
+
+# Where the search form submits to and the name of its query field.
+RESULTS_PATH = os.getenv("PORTAL_RESULTS_PATH", "/search")
+QUERY_PARAM = os.getenv("PORTAL_QUERY_PARAM", "q")
+LOGIN_PATH = "/login"
+
+_NEXT_RE = re.compile(r"""<(?:a|link)\b([^>]*\bclass\s*=\s*["'][^"']*\bnext\b[^"']*["'][^>]*)>""", re.I)
+
+
+class SessionExpired(RuntimeError):
+    pass
+
+
+def load_storage_cookies(path: Path) -> httpx.Cookies:
+    """Cookies of a Playwright storage_state file (empty if the file is missing)."""
+    cookies = httpx.Cookies()
+    path = Path(path)
+    if not path.exists():
+        return cookies
+    state = json.loads(path.read_text(encoding="utf-8"))
+    for c in state.get("cookies", []):
+        cookies.set(c["name"], c["value"], domain=c.get("domain", ""), path=c.get("path", "/"))
+    return cookies
+
+
+def next_page_url(html: str, current_url: str) -> Optional[str]:
+    """Absolute URL of the "next" pagination link (a.next), if any."""
+    m = _NEXT_RE.search(html)
+    if m is None:
+        return None
+    href = _parse_attrs(m.group(1)).get("href")
+    return urljoin(current_url, href) if href else None
+
+
+class PortalHttpClient:
+    """Async HTTP client carrying the browser session's cookies."""
+
+    def __init__(
+        self,
+        base_url: str,
+        storage_state: Optional[Path] = None,
+        limiter: Optional["HostRateLimiter"] = None,
+        results_path: str = RESULTS_PATH,
+        query_param: str = QUERY_PARAM,
+        timeout: float = 30.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        cache: Optional[HttpCache] = None,
+        offline: Optional[bool] = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.limiter = limiter
+        self.results_path = results_path
+        self.query_param = query_param
+        self._client = httpx.AsyncClient(
+            cookies=load_storage_cookies(storage_state) if storage_state else None,
+            follow_redirects=True,
+            timeout=timeout,
+            transport=caching_transport(cache, transport, offline),
+            headers={"Accept": "text/html,application/xhtml+xml"},
+        )
+
+    async def __aenter__(self) -> "PortalHttpClient":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+    async def get_html(self, url: str, params: Optional[Dict[str, str]] = None) -> Tuple[str, str, bool]:
+        """GET a page; returns (html, final url, unchanged since last fetch).
+
+        Raises SessionExpired / httpx.HTTPError.
+        """
+        if self.limiter is not None:
+            await self.limiter.wait(url)
+        resp = await self._client.get(url, params=params)
+        if resp.status_code in (401, 403) or urlsplit(str(resp.url)).path.rstrip("/").endswith(LOGIN_PATH):
+            raise SessionExpired(f"{url} -> {resp.status_code} {resp.url}")
+        resp.raise_for_status()
+        return resp.text, str(resp.url), not_modified(resp)
+
+    async def search(self, keywords: str, max_pages: int = 3, known: Optional["KnownIds"] = None) -> List[Dict]:
+        """Normalized records of up to `max_pages` result pages for `keywords`.
+
+        With `known`, stops at the first page whose records are all stored
+        already -- also for pages served from the cache (see module docstring).
+        """
+        from app.scraper.portal import normalize_records, page_is_known, parse_results_html
+
+        records: List[Dict] = []
+        html, url, _ = await self.get_html(self.base_url + self.results_path, {self.query_param: keywords})
+        for current_page in range(1, max_pages + 1):
+            page_records = normalize_records(parse_results_html(html))
+            if page_is_known(page_records, known):
+                break
+            records.extend(page_records)
+            nxt = next_page_url(html, url) if current_page < max_pages else None
+            if nxt is None:
+                break
+            html, url, _ = await self.get_html(nxt)
+        return records
@@ -1,13 +1,14 @@
 import os
-import time
-import random
-from pathlib import Path
-from typing import List, Dict, Optional
+import re
+from typing import Callable, List, Dict, Optional, Sequence, Set
+from urllib.parse import parse_qsl, urlsplit
 
 from sqlalchemy.orm import Session
 
-from app.normalize import normalize_record
+from app.http_cache import HttpCache
+from app.normalize import canonical_url, hash_url, normalize_record
 from app.repository import TenderRepository
+from app.scraper.extract import DEFAULT_PROFILE, PortalProfile, extract_results
 
 # -------------------------------------------------------------------------
 # Configuration (adapt to your portal)
@@ -24,12 +25,20 @@ SOURCE_NAME = "LOGIN_PORTAL"
 
 STORAGE_STATE_PATH = os.getenv("PORTAL_STORAGE_STATE", ".playwright/portal_state.json")
 
+# Where the portal's own tender id appears in result URLs (adapt to your portal):
+# a trailing path segment like /t/123 or /tender/ABC-2025-7, or a query parameter.
+TENDER_ID_PATH_RE = re.compile(r"/(?:t|tenders?|notices?)/([A-Za-z0-9][\w.-]*)/?$", re.I)
+TENDER_ID_PARAMS = ("id", "tenderid", "tender_id", "noticeid")
+
+# Given external ids, return the ones already stored.
+KnownIds = Callable[[Sequence[str]], Set[str]]
+
 
 # -------------------------------------------------------------------------
 # HTML parsing helpers (pure functions, easy to test)
 # -------------------------------------------------------------------------
 
-def parse_results_html(html: str) -> List[Dict[str, Optional[str]]]:
+def parse_results_html(html: str, profile: PortalProfile = DEFAULT_PROFILE) -> List[Dict[str, Optional[str]]]:
     """Parse a search results HTML page into a list of raw records.
 
     Assumes a structure like:
@@ -42,53 +51,41 @@ def parse_results_html(html: str) -> List[Dict[str, Optional[str]]]:
           <span class="result-country">Country: DE</span>
         </div>
 
-    Adjust CSS classes to your real portal and keep this function pure.
+    Adjust the selectors in a PortalProfile (app.scraper.extract) for your real
+    portal and keep this function pure.
     """
-    import re
-    results: List[Dict[str, Optional[str]]] = []
-
-    # Split by result blocks
-    blocks = re.findall(r'<div class="result">(.*?)</div>', html, flags=re.S | re.I)
-
-    def _extract(pattern: str, text: str) -> Optional[str]:
-        m = re.search(pattern, text, flags=re.S | re.I)
-        if not m:
-            return None
-        return m.group(1).strip()
-
-    for block in blocks:
-        title = _extract(r'<a[^>]*class="result-title"[^>]*>(.*?)</a>', block)
-        url = _extract(r'<a[^>]*class="result-title"[^>]*href="([^"]+)"', block)
-        budget = _extract(r'<span[^>]*class="result-budget"[^>]*>\s*Budget:\s*(.*?)</span>', block)
-        deadline = _extract(r'<span[^>]*class="result-deadline"[^>]*>\s*Deadline:\s*(.*?)</span>', block)
-        desc = _extract(r'<div[^>]*class="result-description"[^>]*>(.*?)</div>', block)
-        country = _extract(r'<span[^>]*class="result-country"[^>]*>\s*Country:\s*(.*?)</span>', block)
-
-        results.append(
-            {
-                "title": title,
-                "url": url,
-                "budget": budget,
-                "deadline": deadline,
-                "description": desc,
-                "country": country,
-            }
-        )
+    return extract_results(html, profile)
 
-    return results
+
+def stable_external_id(url: str, title: str = "", deadline: Optional[str] = None) -> str:
+    """The portal's tender id from `url`, else a hash of the canonical URL.
+
+    Only when a result has no link at all does the id fall back to a hash of
+    its title and deadline.
+    """
+    if url:
+        parts = urlsplit(url)
+        m = TENDER_ID_PATH_RE.search(parts.path)
+        if m:
+            return m.group(1)[:128]
+        for key, value in parse_qsl(parts.query):
+            if key.lower() in TENDER_ID_PARAMS and value:
+                return value[:128]
+        return hash_url(canonical_url(url))
+    return hash_url(f"{title.strip().lower()}|{deadline or ''}")
 
 
 def normalize_records(raw_records: List[Dict[str, Optional[str]]]) -> List[Dict]:
     """Map parsed HTML records to DB-ready normalized dicts using normalize_record()."""
     normalized: List[Dict] = []
-    for i, r in enumerate(raw_records, start=1):
+    for r in raw_records:
         url = r.get("url") or ""
         if url and url.startswith("/"):
             base = os.getenv("PORTAL_BASE_URL", "").rstrip("/")
             url = f"{base}{url}"
         norm = normalize_record(
             source=SOURCE_NAME,
-            external_id=str(i),
+            external_id=stable_external_id(url, r.get("title") or "", r.get("deadline")),
             title=r.get("title") or "",
             description=r.get("description") or "",
             url=url,
@@ -103,12 +100,35 @@ def normalize_records(raw_records: List[Dict[str, Optional[str]]]) -> List[Dict]
     return normalized
 
 
+def reparse_cached_pages(cache: HttpCache, profile: PortalProfile = DEFAULT_PROFILE) -> Dict[str, List[Dict[str, Optional[str]]]]:
+    """Run `parse_results_html` over every HTML page in the HTTP cache: {url: records}.
+
+    Lets parser/profile changes be checked against real pages without
+    touching the portal.
+    """
+    return {e.url: parse_results_html(e.text(), profile) for e in cache.entries(content_type="html")}
+
+
+def page_is_known(records: List[Dict], known: Optional[KnownIds]) -> bool:
+    """True if every record of a (non-empty) result page is already stored."""
+    if known is None or not records:
+        return False
+    ids = {r["external_id"] for r in records}
+    return len(known(list(ids))) == len(ids)
+
+
+def known_ids_lookup(db: Session, source: str = SOURCE_NAME) -> KnownIds:
+    repo = TenderRepository(db)
+    return lambda ids: repo.existing_external_ids(source, ids)
+
+
 def ingest_results_html(db: Session, html: str) -> int:
-    """Convenience for tests: parse HTML and insert into tenders_raw via ORM."""
+    """Convenience for tests: parse HTML and upsert into tenders_raw; returns rows inserted."""
     raw_records = parse_results_html(html)
     normalized = normalize_records(raw_records)
-    repo = TenderRepository(db)
-    return repo.add_many_raw(normalized)
+    counts = TenderRepository(db).upsert_many_raw(normalized)
+    db.commit()
+    return counts.inserted
 
 
 # -------------------------------------------------------------------------
@@ -124,97 +144,32 @@ def _get_credentials() -> Dict[str, str]:
     return {"base_url": base_url.rstrip("/"), "user": user, "password": password}
 
 
-def _polite_delay():
-    """Sleep a small random time between requests to be polite."""
-    time.sleep(random.uniform(1.5, 3.5))
-
-
-def run_playwright_search(keywords: str, max_pages: int = 3) -> List[Dict]:
+def run_playwright_search(keywords: str, max_pages: int = 3, known: Optional[KnownIds] = None) -> List[Dict]:
     """Run a keyword search on the login portal using Playwright.
 
     - Headless browser
     - Uses env PORTAL_USER/PASS/BASE_URL
     - Stores cookies in STORAGE_STATE_PATH
-    - You MUST adjust selectors and URLs to your actual portal.
+    - You MUST adjust selectors and URLs to your actual portal (app.scraper.crawl).
     - Respect robots.txt / Terms of Service. Do NOT use this if not allowed.
     - No captcha bypass.
+
+    Single-keyword form of `app.scraper.crawl.run_crawl`, which searches many
+    keywords concurrently under a per-host rate limit.
+
+    With `known` (see `known_ids_lookup`), pagination stops at the first page
+    whose results are all already stored: results are newest first, so a daily
+    crawl only fetches the new head of the list instead of `max_pages`.
     """
-    creds = _get_credentials()
-
-    try:
-        from playwright.sync_api import sync_playwright  # type: ignore
-    except Exception as exc:
-        raise RuntimeError("playwright is not installed. Install with 'pip install playwright' and run 'playwright install'.") from exc
-
-    storage_path = Path(STORAGE_STATE_PATH)
-    storage_path.parent.mkdir(parents=True, exist_ok=True)
-
-    all_records: List[Dict] = []
-
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        context_args = {}
-        if storage_path.exists():
-            context_args["storage_state"] = str(storage_path)
-        context = browser.new_context(**context_args)
-        page = context.new_page()
-
-        # --- Login step (adapt selectors!) ---
-        if not storage_path.exists():
-            page.goto(f"{creds['base_url']}/login", wait_until="networkidle")
-            _polite_delay()
-            page.fill('input[name="username"]', creds["user"])
-            page.fill('input[name="password"]', creds["password"])
-            _polite_delay()
-            page.click('button[type="submit"]')
-            page.wait_for_load_state("networkidle")
-            _polite_delay()
-            # Save cookies/session
-            context.storage_state(path=str(storage_path))
-
-        # --- Search step (adapt URL and selectors!) ---
-        search_url = f"{creds['base_url']}/search"
-        page.goto(search_url, wait_until="networkidle")
-        _polite_delay()
-        # Example: simple search form
-        try:
-            page.fill('input[name="q"]', keywords)
-        except Exception:
-            # Adjust selector for your portal
-            pass
-        _polite_delay()
-        try:
-            page.click('button[type="submit"]')
-        except Exception:
-            pass
-        page.wait_for_load_state("networkidle")
-        _polite_delay()
-
-        current_page = 1
-        while current_page <= max_pages:
-            html = page.content()
-            raw_records = parse_results_html(html)
-            all_records.extend(normalize_records(raw_records))
-
-            # Try to click "next" (adapt selector for your portal)
-            try:
-                next_button = page.query_selector("a.next, button.next")
-                if not next_button:
-                    break
-                next_button.click()
-                page.wait_for_load_state("networkidle")
-                _polite_delay()
-                current_page += 1
-            except Exception:
-                break
-
-        browser.close()
-
-    return all_records
-
-
-def scrape_and_ingest(db: Session, keywords: str, max_pages: int = 3) -> int:
-    """High-level helper: run Playwright search and store results in DB."""
-    records = run_playwright_search(keywords=keywords, max_pages=max_pages)
-    repo = TenderRepository(db)
-    return repo.add_many_raw(records)
+    from app.scraper.crawl import run_crawl
+
+    return run_crawl([keywords], max_pages=max_pages, concurrency=1, known=known)[keywords]
+
+
+def scrape_and_ingest(db: Session, keywords: str, max_pages: int = 3, stop_when_known: bool = True) -> int:
+    """High-level helper: run Playwright search and store new results in DB."""
+    known = known_ids_lookup(db) if stop_when_known else None
+    records = run_playwright_search(keywords=keywords, max_pages=max_pages, known=known)
+    counts = TenderRepository(db).upsert_many_raw(records)
+    db.commit()
+    return counts.inserted
@@ -0,0 +1,218 @@
+"""Full-text search over tenders_raw.
+
+Every row carries `search_vector`: title (weight A) and description (weight
+B), stemmed with the text search configuration of its language
+(models.SEARCH_CONFIGS, 'simple' for others). A trigger keeps it current on
+insert and whenever title, description or language change; ix_raw_search
+(GIN) serves the `@@` match, so a search costs the matching rows instead of
+an ILIKE scan over every description.
+
+Queries use web search syntax (`Radsatz or wheelset`, `"wheel lathe"`,
+`-bogie`). The language of a query is unknown, so it is parsed once per
+configuration and the results are OR'ed: "Radsätze" finds German rows
+stemmed to 'radsatz', "wheelsets" finds English rows stemmed to 'wheelset'.
+That OR only selects candidates from the index: a row matches if its own
+language's parse of the query matches, so exclusions (`-bogie`) hold.
+Hits are ranked with ts_rank_cd; snippets (ts_headline) are only computed
+for the returned rows.
+
+`saved_searches` turns config/keywords_multilingual.csv into one saved search
+per language plus `keywords` (all languages); each keyword is a phrase.
+`search_async` / `run_saved_async` run the same query on an AsyncSession
+(the API).
+
+    python -m app.search "Radsatz or wheelset" --since 2023-01-01
+    python -m app.search --saved keywords-de
+"""
+import argparse
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import TextClause, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models import SEARCH_CONFIGS
+from app.scoring.keywords import load_keywords
+
+KEYWORDS_CSV = "config/keywords_multilingual.csv"
+MAX_LIMIT = 200
+HEADLINE_OPTIONS = 'StartSel=<<, StopSel=>>, MaxWords=30, MinWords=12, MaxFragments=2, FragmentDelimiter=" … "'
+
+
+class SearchError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class SavedSearch:
+    name: str
+    query: str  # web search syntax
+    languages: Optional[Sequence[str]] = None  # parse the query with these languages' configs only
+
+
+@dataclass
+class SearchHit:
+    id: int
+    source: str
+    title: str
+    url: str
+    country: Optional[str]
+    language: Optional[str]
+    deadline_date: Optional[date]
+    published_at: Optional[datetime]
+    relevance_score: Optional[int]  # tenders_filtered score, if the tender was scored relevant
+    rank: float
+    snippet: str
+
+
+def search_configs(languages: Optional[Sequence[str]] = None) -> List[str]:
+    if languages is None:
+        return sorted(set(SEARCH_CONFIGS.values()) | {"simple"})
+    return sorted({SEARCH_CONFIGS.get(lang.lower(), "simple") for lang in languages})
+
+
+def _tsquery(configs: Sequence[str]) -> str:
+    # the configs are our own constants (SEARCH_CONFIGS), safe to inline
+    return " || ".join(f"websearch_to_tsquery('{cfg}'::regconfig, :q)" for cfg in configs)
+
+
+def _search_query(
+    query: str,
+    languages: Optional[Sequence[str]] = None,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    country: Optional[Sequence[str]] = None,
+    source: Optional[Sequence[str]] = None,
+    limit: int = 20,
+) -> Tuple[TextClause, Dict[str, Any]]:
+    if not query or not query.strip():
+        raise SearchError("empty query")
+    if not 1 <= limit <= MAX_LIMIT:
+        raise SearchError(f"limit must be between 1 and {MAX_LIMIT}")
+    # the OR over all configs only prefilters (through ix_raw_search); each row is
+    # then judged by its own language's parse, or one config's `-term` could be
+    # undone by another's: the 'simple' parse of `wheel -bogies` passes against
+    # an English row stemmed to 'bogi'
+    conds = [
+        "r.search_vector @@ q.query",
+        "r.search_vector @@ websearch_to_tsquery(tender_search_config(r.language), :q)",
+    ]
+    params = {"q": query, "limit": limit, "headline": HEADLINE_OPTIONS}
+    if since is not None:
+        conds.append("coalesce(r.published_at, r.fetched_at) >= CAST(:since AS date)")
+        params["since"] = since
+    if until is not None:
+        conds.append("coalesce(r.published_at, r.fetched_at) < CAST(:until AS date) + 1")
+        params["until"] = until
+    if country:
+        conds.append("r.country = ANY(CAST(:country AS varchar[]))")
+        params["country"] = list(country)
+    if source:
+        conds.append("r.source = ANY(CAST(:source AS varchar[]))")
+        params["source"] = list(source)
+    sql = f"""
+        WITH q AS (SELECT {_tsquery(search_configs(languages))} AS query),
+        hits AS (
+            SELECT r.id, ts_rank_cd(r.search_vector, q.query) AS rank
+            FROM tenders_raw r, q
+            WHERE {" AND ".join(conds)}
+            ORDER BY rank DESC, r.id DESC
+            LIMIT :limit
+        )
+        SELECT r.id, r.source, r.title, r.url, r.country, r.language, r.deadline_date, r.published_at,
+               f.relevance_score, h.rank,
+               ts_headline(tender_search_config(r.language), coalesce(r.description, r.title), q.query, :headline)
+                   AS snippet
+        FROM hits h
+        JOIN tenders_raw r ON r.id = h.id
+        LEFT JOIN tenders_filtered f ON f.raw_id = r.id
+        CROSS JOIN q
+        ORDER BY h.rank DESC, r.id DESC
+    """
+    return text(sql), params
+
+
+def search(db: Session, query: str, **kwargs) -> List[SearchHit]:
+    """Tenders matching `query`, best rank first.
+
+    `since` / `until` bound the publication date (fetch date for rows
+    without one); `languages` restricts which stemmers parse the query;
+    `country`, `source` and `limit` as in the API.
+    """
+    stmt, params = _search_query(query, **kwargs)
+    return [SearchHit(**row._mapping) for row in db.execute(stmt, params)]
+
+
+async def search_async(db: AsyncSession, query: str, **kwargs) -> List[SearchHit]:
+    """`search` on an AsyncSession."""
+    stmt, params = _search_query(query, **kwargs)
+    return [SearchHit(**row._mapping) for row in await db.execute(stmt, params)]
+
+
+def _phrase(keyword: str) -> str:
+    return '"' + keyword.replace('"', " ").strip() + '"'
+
+
+def saved_searches(csv_path: str = KEYWORDS_CSV) -> Dict[str, SavedSearch]:
+    per_lang = load_keywords(csv_path)
+    saved = {
+        f"keywords-{lang}": SavedSearch(f"keywords-{lang}", " or ".join(map(_phrase, keywords)), (lang,))
+        for lang, keywords in sorted(per_lang.items())
+    }
+    everything = [kw for keywords in per_lang.values() for kw in keywords]
+    saved["keywords"] = SavedSearch("keywords", " or ".join(map(_phrase, everything)), tuple(sorted(per_lang)))
+    return saved
+
+
+def _saved(name: str, csv_path: str) -> SavedSearch:
+    saved = saved_searches(csv_path).get(name)
+    if saved is None:
+        raise SearchError(f"unknown saved search {name!r}")
+    return saved
+
+
+def run_saved(db: Session, name: str, csv_path: str = KEYWORDS_CSV, **kwargs) -> List[SearchHit]:
+    saved = _saved(name, csv_path)
+    kwargs.setdefault("languages", saved.languages)
+    return search(db, saved.query, **kwargs)
+
+
+async def run_saved_async(db: AsyncSession, name: str, csv_path: str = KEYWORDS_CSV, **kwargs) -> List[SearchHit]:
+    saved = _saved(name, csv_path)
+    kwargs.setdefault("languages", saved.languages)
+    return await search_async(db, saved.query, **kwargs)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from app.db import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Full-text search over tenders.")
+    parser.add_argument("query", nargs="?", help='web search syntax, e.g. \'Radsatz or "wheelset lathe"\'')
+    parser.add_argument("--saved", help="run a saved search instead (see --list)")
+    parser.add_argument("--list", action="store_true", help="show the saved searches")
+    parser.add_argument("--since", type=date.fromisoformat)
+    parser.add_argument("--until", type=date.fromisoformat)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for s in saved_searches().values():
+            print(f"{s.name:<14} {s.query}")
+        return
+    if not args.query and not args.saved:
+        parser.error("give a query or --saved NAME")
+    db = SessionLocal()
+    try:
+        kwargs = {"since": args.since, "until": args.until, "limit": args.limit}
+        hits = run_saved(db, args.saved, **kwargs) if args.saved else search(db, args.query, **kwargs)
+    finally:
+        db.close()
+    for h in hits:
+        print(f"{h.rank:6.3f} {h.id:>8} {h.source:<12} {h.title[:80]}")
+        print(f"       {h.snippet}")
+
+
+if __name__ == "__main__":
+    main()
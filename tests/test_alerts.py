@@ -0,0 +1,223 @@
+import asyncio
+import json
+import socketserver
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from sqlalchemy import text
+
+from app.alerts.channels import SmtpChannel, WebhookChannel
+from app.alerts.dispatch import dispatch_alerts
+from app.alerts.template import Template, load_template
+from app.models import Base, TenderRaw, TenderFiltered, AlertSent
+from app.db import engine, SessionLocal
+
+
+def setup_module():
+    Base.metadata.create_all(bind=engine)
+
+
+class DebugSmtp(socketserver.StreamRequestHandler):
+    """Just enough SMTP to accept messages; records every DATA payload and connection."""
+
+    messages = []
+    connections = 0
+
+    def reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        DebugSmtp.connections += 1
+        self.reply("220 localhost ready")
+        while True:
+            line = self.rfile.readline().decode().strip()
+            if not line:
+                return
+            verb = line.split(" ", 1)[0].upper()
+            if verb in ("EHLO", "HELO"):
+                self.reply("250 localhost")
+            elif verb in ("MAIL", "RCPT", "RSET", "NOOP"):
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 end with .")
+                lines = []
+                while (data := self.rfile.readline().decode()) not in (".\r\n", ""):
+                    lines.append(data)
+                DebugSmtp.messages.append("".join(lines))
+                self.reply("250 queued")
+            elif verb == "QUIT":
+                self.reply("221 bye")
+                return
+            else:
+                self.reply("502 not implemented")
+
+
+class StubWebhook(BaseHTTPRequestHandler):
+    posts = []
+    fail_next = 0
+    always_fail = False
+    reject = False
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if StubWebhook.reject:
+            status = 400
+        elif StubWebhook.always_fail:
+            status = 500
+        elif StubWebhook.fail_next:
+            StubWebhook.fail_next -= 1
+            status = 429
+        else:
+            StubWebhook.posts.append(body)
+            status = 200
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class _ThreadedSmtp(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+
+
+@pytest.fixture
+def smtp():
+    server = _ThreadedSmtp(("127.0.0.1", 0), DebugSmtp)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    DebugSmtp.messages = []
+    DebugSmtp.connections = 0
+    yield server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def webhook():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubWebhook)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    StubWebhook.posts = []
+    StubWebhook.fail_next = 0
+    StubWebhook.always_fail = False
+    StubWebhook.reject = False
+    yield f"http://127.0.0.1:{server.server_address[1]}/hook"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def scored():
+    """Three relevant tenders (two of them one cluster) and one below the alert threshold."""
+    db = SessionLocal()
+    db.execute(text("DELETE FROM alerts_sent"))
+    db.execute(text("DELETE FROM tenders_filtered"))
+    db.execute(text("DELETE FROM tenders_raw WHERE source = 'ALERT'"))
+    raws = [
+        TenderRaw(source="ALERT", external_id=str(i), title=f"Wheel lathe {i}", country="DE", url=f"https://alert/{i}")
+        for i in range(4)
+    ]
+    db.add_all(raws)
+    db.flush()
+    raws[1].cluster_id = raws[0].id
+    raws[0].cluster_id = raws[0].id
+    filtered = [TenderFiltered(raw_id=r.id, relevance_score=s, matched_keywords="wheel lathe") for r, s in zip(raws, (70, 90, 80, 40))]
+    db.add_all(filtered)
+    db.commit()
+    ids = [f.id for f in filtered]
+    db.close()
+    return ids
+
+
+def _email(port, name):
+    return SmtpChannel("127.0.0.1", port, "bot@example.org", ["sales@example.org"], rate=100, name=name)
+
+
+def _run(channels, **kwargs):
+    db = SessionLocal()
+    try:
+        return asyncio.run(dispatch_alerts(db, channels, **kwargs))
+    finally:
+        db.close()
+
+
+def _statuses(channel):
+    db = SessionLocal()
+    rows = db.query(AlertSent.filtered_id, AlertSent.status).filter(AlertSent.channel == channel).all()
+    db.close()
+    return dict(rows)
+
+
+def test_instant_alerts_are_sent_once_per_cluster_and_recorded_idempotently(smtp, scored):
+    result = _run([_email(smtp, "email-instant")])["email-instant"]
+
+    # the cluster's best-scoring member (90) is sent, its 70 sibling is recorded as duplicate
+    assert (result.messages, result.alerted, result.duplicates, result.failed) == (2, 2, 1, 0)
+    assert _statuses("email-instant") == {scored[0]: "duplicate", scored[1]: "sent", scored[2]: "sent"}
+    assert len(DebugSmtp.messages) == 2
+    assert any("Subject: New relevant tender: Wheel lathe 1" in m for m in DebugSmtp.messages)
+    assert DebugSmtp.connections <= 2  # connections are reused across messages
+
+    again = _run([_email(smtp, "email-instant")])["email-instant"]
+    assert (again.messages, again.alerted, again.duplicates) == (0, 0, 0)
+    assert len(DebugSmtp.messages) == 2
+
+
+def test_digest_mode_coalesces_hits_into_one_message(webhook, scored):
+    StubWebhook.fail_next = 1  # a 429 is retried
+
+    result = _run([WebhookChannel(webhook, rate=100, name="hook-digest")], digest=True)["hook-digest"]
+
+    assert (result.messages, result.alerted) == (1, 2)
+    assert len(StubWebhook.posts) == 1
+    assert StubWebhook.posts[0]["title"] == "2 new relevant tenders"
+    assert "Wheel lathe 1" in StubWebhook.posts[0]["text"] and "Wheel lathe 2" in StubWebhook.posts[0]["text"]
+
+
+def test_failed_delivery_releases_claims_for_the_next_run(webhook, scored):
+    StubWebhook.always_fail = True
+    result = _run([WebhookChannel(webhook, rate=100, name="hook-fail", attempts=1)])["hook-fail"]
+    assert (result.alerted, result.failed) == (0, 2)
+    assert _statuses("hook-fail") == {scored[0]: "duplicate"}
+
+    StubWebhook.always_fail = False
+    result = _run([WebhookChannel(webhook, rate=100, name="hook-fail")])["hook-fail"]
+    assert result.alerted == 2
+    assert set(_statuses("hook-fail").values()) == {"duplicate", "sent"}
+
+
+def test_line_breaks_in_titles_are_collapsed_in_the_subject(smtp, scored):
+    db = SessionLocal()
+    db.execute(
+        text("UPDATE tenders_raw SET title = :t WHERE id = (SELECT raw_id FROM tenders_filtered WHERE id = :id)"),
+        {"t": "Wheel lathe\r\n  with\nline breaks", "id": scored[1]},
+    )
+    db.commit()
+    db.close()
+
+    result = _run([_email(smtp, "email-crlf")])["email-crlf"]
+
+    assert (result.alerted, result.failed, result.rejected) == (2, 0, 0)
+    assert any("Subject: New relevant tender: Wheel lathe with line breaks\r\n" in m for m in DebugSmtp.messages)
+
+
+def test_rejected_messages_are_recorded_as_failed_and_not_retried(webhook, scored):
+    StubWebhook.reject = True
+    result = _run([WebhookChannel(webhook, rate=100, name="hook-reject")])["hook-reject"]
+    # a 4xx is not retried, and does not stop the channel like a transient failure
+    assert (result.alerted, result.failed, result.rejected) == (0, 0, 2)
+    assert _statuses("hook-reject") == {scored[0]: "duplicate", scored[1]: "failed", scored[2]: "failed"}
+
+    StubWebhook.reject = False
+    result = _run([WebhookChannel(webhook, rate=100, name="hook-reject")])["hook-reject"]
+    assert (result.messages, result.alerted) == (0, 0)
+    assert StubWebhook.posts == []
+
+
+def test_templates_render_placeholders_and_keep_other_braces():
+    template = Template.compile("Subject: {{ count }} hits\n\n{literal} {{ missing }}{{count}}")
+    message = template.render({"count": 3})
+    assert message.subject == "3 hits"
+    assert message.body == "{literal} 3"
+    assert load_template("alert_email.txt") is load_template("alert_email.txt")
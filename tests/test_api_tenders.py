@@ -0,0 +1,146 @@
+import csv
+import io
+import json
+from datetime import date
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app.api import tenders
+from app.db import engine, SessionLocal
+from app.main import app
+from app.models import Base, ScoringState, TenderFiltered, TenderRaw
+from app.scoring import pipeline
+from app.scoring.keywords import load_keywords
+from app.scoring.matcher import KeywordMatcher
+
+SOURCE = "API_TEST"
+
+
+def setup_module():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    db.execute(text("DELETE FROM tenders_raw WHERE source IN (:s, :de)"), {"s": SOURCE, "de": SOURCE + "_DE"})
+    rows = [
+        # (external_id, country, deadline, score, keywords)
+        ("1", "DE", date(2031, 1, 10), 90, "underfloor wheel lathe, wheelset lathe"),
+        ("2", "DE", date(2031, 2, 10), 80, "wheelset lathe"),
+        ("3", "AT", date(2031, 3, 10), 80, "wheel reprofiling machine"),
+        ("4", "PL", None, 70, "wheelset lathe"),
+        ("5", "DE", date(2031, 5, 10), 65, "rail wheel lathe"),
+        ("6", "AT", date(2031, 6, 10), 65, "wheelset lathe"),
+        ("7", "DE", date(2031, 7, 10), 61, "underfloor wheel lathe"),
+    ]
+    for external_id, country, deadline, score, keywords in rows:
+        raw = TenderRaw(
+            source=SOURCE, external_id=external_id, title=f"Lathe {external_id}", description="long text",
+            country=country, deadline_date=deadline, budget_amount=1000.5, url=f"https://api.example/{external_id}",
+        )
+        db.add(raw)
+        db.flush()
+        db.add(TenderFiltered(raw_id=raw.id, relevance_score=score, matched_keywords=keywords))
+    db.commit()
+    db.close()
+    tenders.cache.clear()
+
+
+@pytest.fixture(scope="module")
+def client():
+    # one event loop for the module: pooled asyncpg connections are bound to it
+    with TestClient(app) as c:
+        yield c
+
+
+def _all_pages(client, **params):
+    items, cursor, pages = [], None, 0
+    while True:
+        query = dict(params, source=SOURCE, limit=3)
+        if cursor:
+            query["cursor"] = cursor
+        body = client.get("/tenders", params=query).json()
+        items += body["items"]
+        pages += 1
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return items, pages
+
+
+def test_keyset_pages_cover_every_row_once_in_score_order(client):
+    items, pages = _all_pages(client)
+    assert [i["external_id"] for i in items] == ["1", "3", "2", "4", "6", "5", "7"]
+    assert pages == 3
+    assert items[0]["budget_amount"] == 1000.5 and items[0]["deadline_date"] == "2031-01-10"
+    assert "description" not in items[0]
+
+
+def test_filters_combine(client):
+    items, _ = _all_pages(client, country=["DE", "AT"], min_score=65, keyword="Wheelset Lathe")
+    assert [i["external_id"] for i in items] == ["1", "2", "6"]
+    items, _ = _all_pages(client, deadline_from="2031-02-01", deadline_to="2031-05-31", max_score=79)
+    assert [i["external_id"] for i in items] == ["5"]
+
+
+def test_etag_revalidation_and_invalidation_by_scoring(client):
+    params = {"source": SOURCE, "min_score": 85}
+    first = client.get("/tenders", params=params)
+    etag = first.headers["etag"]
+    assert client.get("/tenders", params=params, headers={"If-None-Match": etag}).status_code == 304
+
+    db = SessionLocal()
+    raw = TenderRaw(source=SOURCE, external_id="8", title="Lathe 8", country="DE", url="https://api.example/8")
+    db.add(raw)
+    db.flush()
+    db.add(TenderFiltered(raw_id=raw.id, relevance_score=95, matched_keywords="wheelset lathe"))
+    db.commit()
+    # cached until a scoring run commits
+    assert client.get("/tenders", params=params).content == first.content
+
+    db.merge(ScoringState(name="api-test", last_raw_id=raw.id))
+    db.commit()
+    db.close()
+    fresh = client.get("/tenders", params=params, headers={"If-None-Match": etag})
+    assert fresh.status_code == 200 and fresh.headers["etag"] != etag
+    assert [i["external_id"] for i in fresh.json()["items"]] == ["8", "1"]
+
+
+def test_exports_stream_all_rows_in_batches(client, monkeypatch):
+    monkeypatch.setattr(tenders, "EXPORT_BATCH", 2)
+    ndjson = client.get("/tenders/export", params={"source": SOURCE, "max_score": 90})
+    assert ndjson.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in ndjson.text.splitlines()]
+    assert [r["external_id"] for r in lines] == ["1", "3", "2", "4", "6", "5", "7"]
+
+    exported = client.get("/tenders/export", params={"source": SOURCE, "format": "csv", "country": "AT"})
+    rows = list(csv.DictReader(io.StringIO(exported.text)))
+    assert [(r["external_id"], r["score"]) for r in rows] == [("3", "80"), ("6", "65")]
+
+
+def test_detail_and_errors(client):
+    first = client.get("/tenders", params={"source": SOURCE, "country": "PL"}).json()["items"][0]
+    detail = client.get(f"/tenders/{first['id']}").json()
+    assert (detail["external_id"], detail["description"]) == ("4", "long text")
+    assert client.get("/tenders/0").status_code == 404
+    assert client.get("/tenders", params={"cursor": "not-a-cursor"}).status_code == 400
+
+
+def test_keyword_filter_ignores_case_of_scored_keywords(client):
+    # keywords are stored as spelled in the keyword file, not lowercased
+    db = SessionLocal()
+    raw = TenderRaw(
+        source=SOURCE + "_DE", external_id="1", title="Lieferung einer Radsatzdrehmaschine",
+        description="Unterflur Drehmaschine für das Depot", language="de", country="DE",
+        url="https://api.example/de/1",
+    )
+    db.add(raw)
+    db.flush()
+    keywords = load_keywords("config/keywords_multilingual.csv")
+    hits, _ = pipeline.score_rows([raw], keywords, KeywordMatcher(keywords), threshold=0)
+    pipeline._upsert_filtered(db, hits)
+    db.commit()
+    db.close()
+    assert "Radsatzdrehmaschine" in hits[0]["matched_keywords"].split(", ")
+    tenders.cache.clear()
+    for keyword in ("radsatzdrehmaschine", "Radsatzdrehmaschine", " RADSATZDREHMASCHINE "):
+        body = client.get("/tenders", params={"source": SOURCE + "_DE", "keyword": keyword}).json()
+        assert [i["external_id"] for i in body["items"]] == ["1"]
@@ -0,0 +1,68 @@
+from pathlib import Path
+
+from sqlalchemy import text
+
+from app.models import Base, TenderRaw
+from app.db import engine, SessionLocal
+from app.email_parser.bulk_import import bulk_import, iter_maildir, iter_mbox, iter_messages
+
+
+def setup_module():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    db.execute(text("DELETE FROM tenders_raw WHERE source = 'EMAIL_BULK'"))
+    db.commit()
+    db.close()
+
+
+def _eml(n, extra=""):
+    return (
+        f"Subject: Alert {n}\nFrom: tenders@example.com\n\n"
+        f"Title: Wheelset lathe {n}\n{extra}https://tenders.example.com/bulk/{n}\n"
+    ).encode()
+
+
+def _write_archive(tmp_path: Path):
+    mbox = tmp_path / "alerts.mbox"
+    mbox.write_bytes(
+        b"From tenders@example.com Mon Jan 13 10:00:00 2025\n"
+        + _eml(1, extra=">From the archive\n")
+        + b"\nFrom tenders@example.com Tue Jan 14 10:00:00 2025\n"
+        + _eml(2)
+        + b"\nFrom tenders@example.com Wed Jan 15 10:00:00 2025\n"
+        + _eml(1)  # repeated alert
+    )
+    maildir = tmp_path / "Maildir"
+    for sub in ("cur", "new", "tmp"):
+        (maildir / sub).mkdir(parents=True)
+    (maildir / "cur" / "1.host:2,S").write_bytes(_eml(3))
+    (maildir / "new" / "2.host").write_bytes(_eml(4))
+    emls = tmp_path / "emls"
+    emls.mkdir()
+    (emls / "a.eml").write_bytes(_eml(5))
+    return [mbox, maildir, emls]
+
+
+def test_message_sources(tmp_path):
+    mbox, maildir, emls = _write_archive(tmp_path)
+
+    msgs = list(iter_mbox(mbox))
+    assert len(msgs) == 3
+    assert msgs[0].startswith(b"Subject: Alert 1")
+    assert b"\nFrom the archive" in msgs[0]
+    assert len(list(iter_maildir(maildir))) == 2
+    assert len(list(iter_messages([mbox, maildir, emls]))) == 6
+
+
+def test_bulk_import_parallel_dedups(tmp_path):
+    paths = _write_archive(tmp_path)
+    db = SessionLocal()
+
+    stats = bulk_import(db, paths, source="EMAIL_BULK", workers=2, batch_size=2, parse_chunk=2)
+    assert stats.messages == 6
+    assert stats.inserted == 5
+    assert db.query(TenderRaw).filter(TenderRaw.source == "EMAIL_BULK").count() == 5
+
+    again = bulk_import(db, paths, source="EMAIL_BULK", workers=1)
+    assert again.inserted == 0
+    db.close()
@@ -0,0 +1,156 @@
+import asyncio
+import json
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from app.models import Base, ConnectorState, TenderRaw
+from app.db import engine, SessionLocal
+from app.connectors.runner import enabled_connectors, run_connectors
+from app.connectors.sources import TedConnector, WorldBankConnector
+
+FIXTURES = Path("tests/fixtures/connectors")
+
+
+def setup_module():
+    Base.metadata.create_all(bind=engine)
+    # start without the cursors and rows of an earlier run
+    db = SessionLocal()
+    db.query(ConnectorState).filter(ConnectorState.source.in_(["TED", "WORLDBANK"])).delete()
+    db.query(TenderRaw).filter(TenderRaw.source.in_(["TED", "WORLDBANK"])).delete()
+    db.commit()
+    db.close()
+
+
+class StandInApi(BaseHTTPRequestHandler):
+    """Replays recorded API responses: TED search (POST) and World Bank notices (GET)."""
+
+    requests = []
+    fail_next = 0
+
+    def _reply(self, status, payload=None):
+        body = json.dumps(payload or {}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        StandInApi.requests.append(("POST", self.path, body))
+        if StandInApi.fail_next:
+            StandInApi.fail_next -= 1
+            return self._reply(503)
+        token = body.get("iterationNextToken")
+        name = {None: "ted_page1", "tok-2": "ted_page2", "tok-3": "ted_page3"}[token]
+        self._reply(200, json.loads((FIXTURES / f"{name}.json").read_text()))
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+        StandInApi.requests.append(("GET", parts.path, query))
+        data = json.loads((FIXTURES / "worldbank.json").read_text())
+        offset, rows = int(query["os"]), int(query["rows"])
+        data["procnotices"] = data["procnotices"][offset : offset + rows]
+        data["os"], data["rows"] = offset, rows
+        self._reply(200, data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def api():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInApi)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    StandInApi.requests = []
+    StandInApi.fail_next = 0
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def _run(connectors, **kwargs):
+    return asyncio.run(run_connectors(connectors, **kwargs))
+
+
+def test_ted_resumes_from_stored_cursor_and_then_fetches_since_last_run(api):
+    db = SessionLocal()
+    ted = TedConnector(base_url=api, rate=100)
+
+    first = _run([ted], max_pages=1)["TED"]
+    state = db.get(ConnectorState, ("TED", "default"))
+    assert (first.pages, first.inserted) == (1, 2)
+    assert state.cursor == "tok-2" and state.last_since is None
+    chain_started = state.chain_started_at
+    assert chain_started is not None
+
+    # next run continues at page 2 and finishes the stream
+    resumed = datetime.now(timezone.utc)
+    second = _run([ted])["TED"]
+    db.refresh(state)
+    assert [r[2].get("iterationNextToken") for r in StandInApi.requests] == [None, "tok-2", "tok-3"]
+    assert second.inserted == 1 and second.error is None
+    # since = when the interrupted chain began, not when it was resumed:
+    # notices published in between are asked for next time
+    assert state.cursor is None and state.last_since == chain_started < resumed
+
+    # a later run only asks for notices published since then
+    third = _run([ted])["TED"]
+    assert "publication-date>=" in StandInApi.requests[-2][2]["query"]
+    assert third.inserted == 0
+
+    row = db.query(TenderRaw).filter_by(source="TED", external_id="123456-2025").one()
+    assert row.title == "Germany – Underfloor wheel lathe"
+    assert row.country == "DEU"
+    assert row.cpv_codes == "34632000,42600000"
+    assert str(row.deadline_date) == "2025-09-30"
+    french = db.query(TenderRaw).filter_by(source="TED", external_id="123999-2025").one()
+    assert french.url.endswith("/fr/notice/-/detail/123999-2025")
+    db.close()
+
+
+def test_connectors_run_concurrently_with_offset_paging_and_retries(api):
+    db = SessionLocal()
+    StandInApi.fail_next = 1  # first TED request gets a 503 and is retried
+    sessions = []
+
+    def session_factory():
+        sessions.append(SessionLocal())
+        return sessions[-1]
+
+    runs = _run(
+        [TedConnector(base_url=api, rate=100), WorldBankConnector(base_url=api, page_size=2, rate=100)],
+        session_factory=session_factory,
+    )
+
+    assert runs["WORLDBANK"].error is None and runs["TED"].error is None
+    assert (runs["WORLDBANK"].pages, runs["WORLDBANK"].inserted) == (2, 3)
+    # one session per stream: the two connectors never share a transaction
+    assert len(sessions) == 2 and sessions[0] is not sessions[1]
+    offsets = [r[2]["os"] for r in StandInApi.requests if r[0] == "GET"]
+    assert offsets == ["0", "2"]
+
+    # World Bank has no since filter: newest-first results stop at the last run
+    state = db.get(ConnectorState, ("WORLDBANK", "default"))
+    state.last_since = state.last_since.replace(year=2025, month=5, day=25)
+    db.commit()
+    StandInApi.requests = []
+    again = _run([WorldBankConnector(base_url=api, page_size=2, rate=100)])["WORLDBANK"]
+    assert (again.pages, again.fetched) == (1, 1)
+    db.close()
+
+
+def test_enabled_connectors_follow_portal_master(monkeypatch):
+    monkeypatch.delenv("SAM_GOV_API_KEY", raising=False)
+    names = {c.portal for c in enabled_connectors()}
+    # implemented API portals; SAM.gov needs a key, ADB/AfDB/... have no connector yet
+    assert names == {"TED", "WorldBank", "UK FTS"}
+
+    monkeypatch.setenv("SAM_GOV_API_KEY", "secret")
+    assert {c.portal for c in enabled_connectors(only=["sam.gov"])} == {"SAM.gov"}
@@ -0,0 +1,76 @@
+from app.db import engine, SessionLocal
+from app.dedup import run_clustering, signature_for, similarity
+from app.models import Base, TenderRaw
+from app.normalize import normalize_record
+from app.repository import TenderRepository
+
+LATHE = (
+    "Underfloor wheel lathe for the Nürnberg depot",
+    "Supply, installation and commissioning of an underfloor wheel lathe incl. "
+    "foundation works, operator training and a five year maintenance contract.",
+)
+
+
+def setup_module():
+    Base.metadata.create_all(bind=engine)
+
+
+def _rec(source, external_id, title, description):
+    return normalize_record(
+        source=source,
+        external_id=external_id,
+        title=title,
+        description=description,
+        url=f"https://{source.lower()}.example/{external_id}",
+        country="DE",
+        language="en",
+        cpv=None,
+        budget=None,
+        deadline=None,
+        published_at=None,
+    )
+
+
+def test_signature_similarity_tracks_shared_text():
+    a = signature_for(*LATHE)
+    b = signature_for(LATHE[0].upper(), LATHE[1] + " Lot 2.")
+    c = signature_for("Office chairs and desks", "General office furniture for the head office.")
+    assert similarity(a, b) > 0.7
+    assert similarity(a, c) < 0.2
+    assert signature_for("", None) is None
+
+
+def test_same_tender_from_several_sources_shares_one_cluster():
+    db = SessionLocal()
+    repo = TenderRepository(db)
+    repo.upsert_many_raw(
+        [
+            _rec("DEDUP_TED", "1", *LATHE),
+            _rec("DEDUP_AGG", "a-77", LATHE[0].replace("Nürnberg", "Nuernberg"), LATHE[1]),
+            _rec("DEDUP_MAIL", "m-1", "Underfloor wheel lathe for the Nurnberg depot", LATHE[1] + " Deadline 31.01."),
+            _rec("DEDUP_TED", "2", "Office chairs and desks", "General office furniture for the head office."),
+        ]
+    )
+    db.commit()
+    run_clustering(db, chunk_size=2)
+
+    rows = {(r.source, r.external_id): r for r in db.query(TenderRaw).filter(TenderRaw.source.like("DEDUP_%"))}
+    ted = rows[("DEDUP_TED", "1")]
+    stamp = ted.updated_at
+    assert ted.cluster_id == ted.id
+    assert rows[("DEDUP_AGG", "a-77")].cluster_id == ted.id
+    assert rows[("DEDUP_MAIL", "m-1")].cluster_id == ted.id
+    chairs = rows[("DEDUP_TED", "2")]
+    assert chairs.cluster_id == chairs.id
+
+    # an edited tender is re-clustered; unchanged rows keep their cluster and updated_at
+    repo.upsert_many_raw([_rec("DEDUP_AGG", "a-77", "Bogie drop table", "Replacement of the bogie drop table.")])
+    db.commit()
+    db.expire_all()
+    assert rows[("DEDUP_AGG", "a-77")].cluster_id is None
+    assert run_clustering(db) == (1, 0)
+    db.expire_all()
+    agg = rows[("DEDUP_AGG", "a-77")]
+    assert agg.cluster_id == agg.id
+    assert ted.updated_at == stamp
+    db.close()
@@ -1,17 +1,24 @@
 from pathlib import Path
 
+from sqlalchemy import text
+
 from app.models import Base, TenderRaw
 from app.db import engine, SessionLocal
 from app.email_parser.parser import (
     parse_eml_bytes,
     extract_records_from_body,
     normalize_email_records,
+    insert_normalized_with_dedup,
     process_eml_file,
 )
 
 
 def setup_module():
     Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    db.execute(text("DELETE FROM tenders_raw WHERE source IN ('EMAIL_DEDUP', 'EMAIL_BATCH')"))
+    db.commit()
+    db.close()
 
 
 def test_parse_eml_and_extract_records():
@@ -32,18 +39,39 @@ def test_normalize_and_insert_with_dedup():
 
     # process first email
     p1 = Path("tests/fixtures/email_alert_1.eml")
-    inserted1 = process_eml_file(db, p1, source="EMAIL_ALERT")
+    inserted1 = process_eml_file(db, p1, source="EMAIL_DEDUP")
     assert inserted1 >= 1
 
-    count_after_first = db.query(TenderRaw).count()
+    count_after_first = db.query(TenderRaw).filter(TenderRaw.source == "EMAIL_DEDUP").count()
+    assert count_after_first == inserted1
 
     # process duplicate email with same URL -> should not increase count
     p2 = Path("tests/fixtures/email_alert_2_duplicate.eml")
-    inserted2 = process_eml_file(db, p2, source="EMAIL_ALERT")
-    count_after_second = db.query(TenderRaw).count()
+    inserted2 = process_eml_file(db, p2, source="EMAIL_DEDUP")
+    count_after_second = db.query(TenderRaw).filter(TenderRaw.source == "EMAIL_DEDUP").count()
 
     # second insert should be 0 because of dedup
     assert inserted2 == 0
     assert count_after_second == count_after_first
 
     db.close()
+
+
+def test_dedup_within_batch_and_against_db():
+    db = SessionLocal()
+    body = (
+        "Title: Radsatzdrehmaschine\n"
+        "https://tenders.example.com/t/900\n"
+        "Details: https://tenders.example.com/t/900\n"
+        "Also: https://tenders.example.com/t/901\n"
+    )
+    normalized = normalize_email_records("EMAIL_BATCH", extract_records_from_body(body))
+    assert len(normalized) == 3
+
+    assert insert_normalized_with_dedup(db, "EMAIL_BATCH", normalized) == 2
+
+    again = normalize_email_records("EMAIL_BATCH", extract_records_from_body(body))
+    assert insert_normalized_with_dedup(db, "EMAIL_BATCH", again) == 0
+    assert db.query(TenderRaw).filter(TenderRaw.source == "EMAIL_BATCH").count() == 2
+
+    db.close()
@@ -0,0 +1,110 @@
+import asyncio
+import gzip
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from app.http_cache import CachingTransport, HttpCache, cache_key, not_modified
+
+
+class VersionedPage(BaseHTTPRequestHandler):
+    version = "v1"
+    seen = []
+
+    def do_GET(self):
+        etag = f'"{VersionedPage.version}"'
+        VersionedPage.seen.append(self.headers.get("If-None-Match"))
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        body = f"<html>page {VersionedPage.version}</html>".encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        if self.path.startswith("/gzip"):
+            body = gzip.compress(body)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), VersionedPage)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    VersionedPage.version = "v1"
+    VersionedPage.seen = []
+    yield f"http://127.0.0.1:{srv.server_address[1]}"
+    srv.shutdown()
+    srv.server_close()
+
+
+def _get(cache, url, offline=False, **params):
+    async def run():
+        async with httpx.AsyncClient(transport=CachingTransport(cache, offline=offline)) as client:
+            return await client.get(url, params=params)
+
+    return asyncio.run(run())
+
+
+def test_revalidates_with_etag_and_serves_304_from_cache(server, tmp_path):
+    cache = HttpCache(tmp_path)
+
+    first = _get(cache, server + "/search", q="lathe")
+    second = _get(cache, server + "/search", q="lathe")
+    assert first.text == second.text == "<html>page v1</html>"
+    assert not not_modified(first) and not_modified(second)
+    assert VersionedPage.seen == [None, '"v1"']
+
+    VersionedPage.version = "v2"
+    third = _get(cache, server + "/search", q="lathe")
+    assert third.text == "<html>page v2</html>" and not not_modified(third)
+    assert len(cache) == 1
+
+
+def test_gzip_responses_are_stored_decoded(server, tmp_path):
+    cache = HttpCache(tmp_path)
+    first = _get(cache, server + "/gzip")
+    second = _get(cache, server + "/gzip")
+    offline = _get(cache, server + "/gzip", offline=True)
+    assert first.text == second.text == offline.text == "<html>page v1</html>"
+    assert not_modified(second)
+    (entry,) = cache.entries()
+    assert entry.body == b"<html>page v1</html>" and "content-encoding" not in entry.headers
+
+
+def test_offline_mode_replays_hits_and_never_touches_the_network(server, tmp_path):
+    cache = HttpCache(tmp_path)
+    _get(cache, server + "/search", q="lathe")
+    VersionedPage.seen = []
+
+    hit = _get(cache, server + "/search", offline=True, q="lathe")
+    miss = _get(cache, server + "/search", offline=True, q="chairs")
+    assert hit.status_code == 200 and hit.text == "<html>page v1</html>"
+    assert miss.status_code == 504
+    assert VersionedPage.seen == []
+
+
+def test_lru_eviction_keeps_recently_used_entries(tmp_path):
+    cache = HttpCache(tmp_path, max_bytes=250)
+    for name in ("a", "b", "c"):
+        cache.put(name, "GET", f"https://x/{name}", 200, {}, b"x" * 100)
+    # "a" was evicted when "c" pushed the total over 250 bytes
+    assert cache.get("a") is None
+    cache.touch("b")
+    cache.put("d", "GET", "https://x/d", 200, {}, b"x" * 100)
+    assert cache.get("b") is not None and cache.get("c") is None
+    assert cache.total_bytes() <= 250
+
+
+def test_cache_key_ignores_param_order_but_not_body():
+    assert cache_key("GET", "https://x/s?a=1&b=2") == cache_key("GET", "https://x/s?b=2&a=1")
+    assert cache_key("POST", "https://x/s", b'{"page": 1}') != cache_key("POST", "https://x/s", b'{"page": 2}')
@@ -0,0 +1,310 @@
+from app.models import Base, ImapSyncState, TenderRaw
+from app.db import engine, SessionLocal
+from app.email_parser.imap_client import _uid_set, sync_folder
+from app.email_parser.parser import process_eml_bytes
+
+
+def setup_module():
+    Base.metadata.create_all(bind=engine)
+
+
+class FakeImap:
+    """Just enough of imaplib.IMAP4 for UID sync: select / response / uid."""
+
+    def __init__(self, messages, uidvalidity=1):
+        self.messages = dict(messages)  # uid -> raw bytes
+        self.uidvalidity = uidvalidity
+        self.fetch_calls = []
+        self.readonly = None
+        self.uid_after_literal = False
+        self.unfetchable = set()  # uids SEARCH reports but FETCH leaves out
+
+    def select(self, folder, readonly=False):
+        self.readonly = readonly
+        return "OK", [str(len(self.messages)).encode()]
+
+    def response(self, code):
+        assert code == "UIDVALIDITY"
+        return "OK", [str(self.uidvalidity).encode()]
+
+    def uid(self, command, *args):
+        if command == "SEARCH":
+            start = int(args[1].split()[1].split(":")[0])
+            uids = sorted(u for u in self.messages if u >= start) or [max(self.messages)]
+            return "OK", [b" ".join(str(u).encode() for u in uids)]
+        if command == "FETCH":
+            uid_set, query = args
+            assert "BODY.PEEK[]" in query
+            self.fetch_calls.append(uid_set)
+            wanted = set()
+            for part in uid_set.split(","):
+                lo, _, hi = part.partition(":")
+                wanted.update(range(int(lo), int(hi or lo) + 1))
+            data = []
+            for u in sorted(wanted & set(self.messages) - self.unfetchable):
+                raw = self.messages[u]
+                if self.uid_after_literal:
+                    data.append((f"{u} (BODY[] {{{len(raw)}}}".encode(), raw))
+                    data.append(f" UID {u})".encode())
+                else:
+                    data.append((f"{u} (UID {u} BODY[] {{{len(raw)}}}".encode(), raw))
+                    data.append(b")")
+            return "OK", data
+        raise AssertionError(command)
+
+
+def _eml(n):
+    return (
+        f"Subject: Alert {n}\r\nFrom: a@example.com\r\n\r\n"
+        f"Title: Wheelset lathe {n}\r\nhttps://tenders.example.com/imap/{n}\r\n"
+    ).encode()
+
+
+def _forget(accounts, source=None):
+    """Drop sync state (and `source` rows) an earlier run left for these accounts."""
+    db = SessionLocal()
+    db.query(ImapSyncState).filter(ImapSyncState.account.in_(accounts)).delete()
+    if source:
+        db.query(TenderRaw).filter(TenderRaw.source == source).delete()
+    db.commit()
+    db.close()
+
+
+def test_uid_set_compresses_ranges():
+    assert _uid_set([1, 2, 3, 7, 9, 10]) == "1:3,7,9:10"
+    assert _uid_set([5]) == "5"
+
+
+def test_sync_folder_is_incremental_and_batched():
+    _forget(["bot@imap.test"])
+    db = SessionLocal()
+    mail = FakeImap({1: _eml(1), 2: _eml(2), 3: _eml(3), 5: _eml(5)})
+
+    got = [uid for uid, _ in sync_folder(db, mail, "bot@imap.test", "INBOX", batch_size=2)]
+    assert got == [1, 2, 3, 5]
+    assert mail.readonly is True
+    assert mail.fetch_calls == ["1:2", "3,5"]
+    assert db.get(ImapSyncState, ("bot@imap.test", "INBOX")).last_uid == 5
+
+    # nothing new: server still answers "6:*" with the newest message, which must be ignored
+    assert list(sync_folder(db, mail, "bot@imap.test", "INBOX")) == []
+
+    mail.messages[6] = _eml(6)
+    assert [uid for uid, _ in sync_folder(db, mail, "bot@imap.test", "INBOX")] == [6]
+
+    # UIDVALIDITY change -> folder is read again from the start
+    mail.uidvalidity = 2
+    assert len(list(sync_folder(db, mail, "bot@imap.test", "INBOX"))) == 5
+
+    db.close()
+
+
+def test_sync_reads_uid_after_the_literal_and_never_skips_unfetched_uids():
+    _forget(["gap@imap.test"])
+    db = SessionLocal()
+    mail = FakeImap({1: _eml(1), 2: _eml(2), 3: _eml(3), 4: _eml(4)})
+    mail.uid_after_literal = True
+    mail.unfetchable = {3}
+
+    assert [uid for uid, _ in sync_folder(db, mail, "gap@imap.test", "INBOX", batch_size=2)] == [1, 2, 4]
+    assert db.get(ImapSyncState, ("gap@imap.test", "INBOX")).last_uid == 2
+
+    mail.unfetchable = set()
+    assert [uid for uid, _ in sync_folder(db, mail, "gap@imap.test", "INBOX")] == [3, 4]
+    assert db.get(ImapSyncState, ("gap@imap.test", "INBOX")).last_uid == 4
+
+    db.close()
+
+
+def test_sync_moves_past_a_uid_the_server_never_returns():
+    _forget(["lost@imap.test"])
+    db = SessionLocal()
+    mail = FakeImap({1: _eml(1), 2: _eml(2), 3: _eml(3), 4: _eml(4)})
+    mail.unfetchable = {3}
+
+    assert [uid for uid, _ in sync_folder(db, mail, "lost@imap.test", "INBOX", max_attempts=3)] == [1, 2, 4]
+    assert [uid for uid, _ in sync_folder(db, mail, "lost@imap.test", "INBOX", max_attempts=3)] == [4]
+    state = db.get(ImapSyncState, ("lost@imap.test", "INBOX"))
+    assert (state.last_uid, state.missing_uid, state.missing_attempts) == (2, 3, 2)
+
+    assert [uid for uid, _ in sync_folder(db, mail, "lost@imap.test", "INBOX", max_attempts=3)] == [4]
+    db.refresh(state)
+    assert (state.last_uid, state.missing_uid, state.missing_attempts) == (4, None, 0)
+    assert list(sync_folder(db, mail, "lost@imap.test", "INBOX", max_attempts=3)) == []
+
+    db.close()
+
+
+def test_synced_messages_ingest_through_parser():
+    _forget(["ingest@imap.test"], source="EMAIL_IMAP")
+    db = SessionLocal()
+    mail = FakeImap({10: _eml(10), 11: _eml(11)})
+
+    inserted = sum(
+        process_eml_bytes(db, raw, source="EMAIL_IMAP")
+        for _, raw in sync_folder(db, mail, "ingest@imap.test", "Tender Alerts")
+    )
+    assert inserted == 2
+    assert db.query(TenderRaw).filter(TenderRaw.source == "EMAIL_IMAP").count() == 2
+
+    db.close()
+
+
+class MultiFolderImap(FakeImap):
+    def __init__(self, folders):
+        super().__init__({})
+        self.folders = folders
+        self.noops = 0
+        self.logged_out = False
+
+    def select(self, folder, readonly=False):
+        self.messages = self.folders[folder.strip('"')]
+        return super().select(folder, readonly)
+
+    def noop(self):
+        self.noops += 1
+        return "OK", [b""]
+
+    def logout(self):
+        self.logged_out = True
+        return "BYE", [b""]
+
+
+def test_pool_reuses_connections_and_limits_per_host():
+    import threading
+
+    from app.email_parser.imap_pool import ImapAccount, ImapConnectionPool
+
+    opened = []
+    lock = threading.Lock()
+
+    def connect_fn(host, port, user, password):
+        with lock:
+            opened.append(user)
+        return MultiFolderImap({"INBOX": {1: _eml(1)}})
+
+    a = ImapAccount("a", "imap.test", 993, "a", "pw")
+    b = ImapAccount("b", "imap.test", 993, "b", "pw")
+    pool = ImapConnectionPool(max_per_host=1, keepalive=0, connect_fn=connect_fn)
+
+    with pool.connection(a) as m1:
+        pass
+    with pool.connection(a) as m2:
+        pass
+    assert m1 is m2 and m2.noops == 1  # reused, NOOP keepalive before reuse
+    assert opened == ["a"]
+
+    # limit 1 per host: b evicts a's idle connection instead of opening a second one
+    with pool.connection(b):
+        assert m1.logged_out
+    assert opened == ["a", "b"]
+    assert pool._open["imap.test"] == 1
+    pool.close()
+
+
+def test_fetch_and_ingest_across_accounts_and_folders():
+    from app.email_parser.fetcher import fetch_and_ingest
+    from app.email_parser.imap_pool import ImapAccount, ImapConnectionPool
+
+    _forget(["sales@imap.test", "ops@imap.test"], source="EMAIL_MULTI")
+    mailboxes = {
+        "sales": {"INBOX": {1: _eml(101), 2: _eml(102)}, "Alerts": {7: _eml(103)}},
+        "ops": {"INBOX": {3: _eml(104), 4: _eml(101)}},
+    }
+    pool = ImapConnectionPool(
+        max_per_host=1, connect_fn=lambda host, port, user, pw: MultiFolderImap(mailboxes[user])
+    )
+    accounts = [
+        ImapAccount("sales", "imap.test", 993, "sales", "pw", ("INBOX", "Alerts")),
+        ImapAccount("ops", "imap.test", 993, "ops", "pw", ("INBOX",)),
+    ]
+
+    inserted = fetch_and_ingest(accounts, source="EMAIL_MULTI", workers=3, batch_size=1, pool=pool)
+    assert inserted == 4  # 101 arrives twice, stored once
+
+    mailboxes["ops"]["INBOX"][5] = _eml(105)
+    assert fetch_and_ingest(accounts, source="EMAIL_MULTI", workers=3, pool=pool) == 1
+    pool.close()
+
+
+class SocketImap:
+    """imaplib-like client end of a socketpair; the test plays the server on the other end."""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.file = sock.makefile("rb")
+        self._tag = 0
+
+    def _new_tag(self):
+        self._tag += 1
+        return b"A%03d" % self._tag
+
+    def send(self, data):
+        self.sock.sendall(data)
+
+    def readline(self):
+        return self.file.readline()
+
+
+def _idle_server(sock, events):
+    f = sock.makefile("rb")
+    tag = f.readline().split()[0]
+    sock.sendall(b"+ idling\r\n")
+    for line in events:
+        sock.sendall(line)
+    assert f.readline() == b"DONE\r\n"
+    sock.sendall(tag + b" OK IDLE terminated\r\n")
+
+
+def test_idle_wait_wakes_on_exists_and_times_out():
+    import socket
+    import threading
+
+    from app.email_parser.push import idle_wait
+
+    for events, timeout, expected in (([b"* 4 EXISTS\r\n"], 5.0, True), ([], 0.2, False)):
+        client, server = socket.socketpair()
+        t = threading.Thread(target=_idle_server, args=(server, events))
+        t.start()
+        assert idle_wait(SocketImap(client), timeout=timeout) is expected
+        t.join(timeout=5)
+        client.close()
+        server.close()
+
+
+def test_watch_folder_ingests_then_scores_new_rows():
+    import threading
+
+    from app.email_parser.imap_pool import ImapAccount, ImapConnectionPool
+    from app.email_parser.push import watch_folder
+
+    account = ImapAccount("push", "imap.test", 993, "push", "pw")
+    # a previous run's sync state or rows would leave nothing new to ingest
+    db = SessionLocal()
+    db.query(ImapSyncState).filter(ImapSyncState.account == account.key).delete()
+    db.query(TenderRaw).filter(TenderRaw.source == "EMAIL_PUSH").delete()
+    db.commit()
+    db.close()
+
+    box = {"INBOX": {1: _eml(201), 2: _eml(202)}}
+    pool = ImapConnectionPool(connect_fn=lambda *a: MultiFolderImap(box))
+    stop = threading.Event()
+    calls = []
+
+    def on_ingested(db, n):
+        calls.append(n)
+        stop.set()
+
+    # MultiFolderImap advertises no IDLE capability -> polling fallback
+    t = threading.Thread(
+        target=watch_folder,
+        args=(pool, account, "INBOX", stop),
+        kwargs={"source": "EMAIL_PUSH", "poll_interval": 0.01, "on_ingested": on_ingested},
+    )
+    t.start()
+    t.join(timeout=5)
+    stop.set()
+    t.join(timeout=5)
+    assert not t.is_alive()
+    assert calls == [2]
+    pool.close()
@@ -0,0 +1,55 @@
+import random
+
+from app.scoring.keywords import load_keywords
+from app.scoring.matcher import KeywordMatcher
+from app.scoring.nlp import tokenize
+from app.scoring.pipeline import fuzzy_contains
+
+
+def _reference(tokens, keywords_per_lang):
+    matched = [kw for kws in keywords_per_lang.values() for kw in kws if fuzzy_contains(tokens, kw)]
+    return list(dict.fromkeys(matched))
+
+
+def _corpus():
+    texts = [
+        "Underfloor wheel lathe for railway depot",
+        "Delivery and installation of a wheelset lathe (UWL)",
+        "Office chairs and desks",
+        "Radsatzdrehmaschine fuer Werkstatt",
+        "Radsatzbearbeitung und Unterflur-Drehmaschine",
+        "wheelsets lathes reprofilng machines",
+        "rail wheel lathe",
+        "tornio sotto pavimento",
+        "torno de ruedas",
+        "",
+    ]
+    # random variations: typos, swapped words, noise tokens
+    vocab = " ".join(texts).lower().split() + ["tour", "roues", "whel", "lath", "radsatz", "gleis"]
+    rnd = random.Random(7)
+    for _ in range(300):
+        words = rnd.sample(vocab, rnd.randint(1, 6))
+        if rnd.random() < 0.5:
+            w = list(rnd.choice(words))
+            if w:
+                w[rnd.randrange(len(w))] = rnd.choice("aeiourst")
+            words.append("".join(w))
+        texts.append(" ".join(words))
+    return texts
+
+
+def test_matcher_matches_fuzzy_contains_reference():
+    keywords_per_lang = load_keywords("config/keywords_multilingual.csv")
+    matcher = KeywordMatcher(keywords_per_lang)
+
+    for text in _corpus():
+        tokens = tokenize(text, lang_hint="en")
+        assert matcher.match(tokens) == _reference(tokens, keywords_per_lang), text
+
+
+def test_matcher_short_text_whole_string_match():
+    keywords_per_lang = {"en": ["wheelset lathe"]}
+    matcher = KeywordMatcher(keywords_per_lang)
+
+    tokens = ["wheelst", "lathe"]
+    assert matcher.match(tokens) == _reference(tokens, keywords_per_lang) == ["wheelset lathe"]
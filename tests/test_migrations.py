@@ -0,0 +1,78 @@
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from app.config import settings
+from app.migrations.migrate import applied_versions, discover, upgrade
+from app.normalize import hash_url
+
+SCHEMA = "migration_test"
+
+
+@pytest.fixture
+def scratch_engine():
+    from app.db import engine
+
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+    eng = create_engine(settings.database_url, connect_args={"options": f"-csearch_path={SCHEMA}"})
+    yield eng
+    eng.dispose()
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+
+
+def _indexes(eng, table):
+    return {ix["name"] for ix in inspect(eng).get_indexes(table, schema=SCHEMA)}
+
+
+def test_fresh_database_gets_latest_schema_and_reruns_are_noops(scratch_engine):
+    applied = upgrade(scratch_engine)
+    assert [m.version for m in applied] == [m.version for m in discover()]
+    assert {"ix_raw_url_hash", "ix_raw_updated_at", "ix_raw_fetched_at_brin"} <= _indexes(scratch_engine, "tenders_raw")
+
+    assert upgrade(scratch_engine) == []
+    with scratch_engine.begin() as conn:
+        assert applied_versions(conn) == [m.version for m in discover()]
+
+
+def test_existing_deployment_is_upgraded_in_place(scratch_engine):
+    with scratch_engine.begin() as conn:
+        # the baseline schema (models.py before the migrations), as create_all wrote it
+        conn.execute(text(
+            "CREATE TABLE tenders_raw (id SERIAL PRIMARY KEY, source VARCHAR(64) NOT NULL,"
+            " external_id VARCHAR(128), title TEXT NOT NULL, description TEXT, country VARCHAR(64),"
+            " language VARCHAR(8), cpv_codes TEXT, budget_amount NUMERIC, deadline_date DATE,"
+            " url TEXT NOT NULL, published_at TIMESTAMPTZ, fetched_at TIMESTAMPTZ DEFAULT now(),"
+            " CONSTRAINT uq_raw_source_external UNIQUE (source, external_id))"
+        ))
+        conn.execute(text(
+            "CREATE TABLE tenders_filtered (id SERIAL PRIMARY KEY, raw_id INTEGER NOT NULL,"
+            " relevance_score INTEGER NOT NULL, matched_keywords TEXT, notes TEXT,"
+            " created_at TIMESTAMPTZ DEFAULT now())"
+        ))
+        conn.execute(text(
+            "CREATE TABLE alerts_sent (id SERIAL PRIMARY KEY, filtered_id INTEGER NOT NULL,"
+            " channel VARCHAR(32) NOT NULL, sent_at TIMESTAMPTZ DEFAULT now())"
+        ))
+        conn.execute(text(
+            "INSERT INTO tenders_raw (id, source, external_id, title, url) VALUES (1, 'S', '1', 't', 'https://x/ä?id=1')"
+        ))
+        conn.execute(text("INSERT INTO tenders_filtered (raw_id, relevance_score) VALUES (1, 80), (1, 75), (999, 70)"))
+
+    upgrade(scratch_engine)
+
+    with scratch_engine.begin() as conn:
+        assert conn.execute(text("SELECT url_hash FROM tenders_raw")).scalar() == hash_url("https://x/ä?id=1")
+        assert conn.execute(text("SELECT updated_at IS NOT NULL FROM tenders_raw")).scalar()
+        assert conn.execute(text("SELECT relevance_score FROM tenders_filtered")).scalars().all() == [80]
+        # the scoring upsert's conflict target exists
+        conn.execute(text(
+            "INSERT INTO tenders_filtered (raw_id, relevance_score) VALUES (1, 90)"
+            " ON CONFLICT ON CONSTRAINT uq_filtered_raw DO UPDATE SET relevance_score = excluded.relevance_score"
+        ))
+        conn.execute(text("DELETE FROM tenders_raw WHERE id = 1"))
+        assert conn.execute(text("SELECT count(*) FROM tenders_filtered")).scalar() == 0
+    uniques = {uq["name"] for uq in inspect(scratch_engine).get_unique_constraints("alerts_sent", schema=SCHEMA)}
+    assert "uq_alerts_filtered_channel" in uniques
+    assert "connector_state" in inspect(scratch_engine).get_table_names(schema=SCHEMA)
@@ -0,0 +1,63 @@
+from types import SimpleNamespace
+
+from app.scoring import nlp
+from app.scoring.nlp import tokenize, tokenize_many
+
+
+class _FakeNlp:
+    """Minimal stand-in for a spaCy Language: whitespace tokens, lemma == lower text."""
+
+    def __init__(self):
+        self.pipe_calls = 0
+
+    def _doc(self, text):
+        return [SimpleNamespace(text=w, lemma_=w.lower()) for w in text.split()]
+
+    def __call__(self, text):
+        return self._doc(text)
+
+    def pipe(self, texts, batch_size=256):
+        self.pipe_calls += 1
+        for t in texts:
+            yield self._doc(t)
+
+
+def _install_fake_spacy(monkeypatch):
+    loads = []
+
+    def load(name, exclude=None):
+        loads.append((name, tuple(exclude or ())))
+        return _FakeNlp()
+
+    monkeypatch.setattr(nlp, "_try_import_spacy", lambda: SimpleNamespace(load=load))
+    monkeypatch.setattr(nlp, "registry", nlp.ModelRegistry())
+    return loads
+
+
+def test_registry_loads_each_model_once(monkeypatch):
+    loads = _install_fake_spacy(monkeypatch)
+
+    for _ in range(5):
+        tokenize("Underfloor wheel lathe", lang_hint="en")
+        tokenize("Radsatz Drehmaschine", lang_hint="de")
+
+    assert [name for name, _ in loads] == ["en_core_web_sm", "de_core_news_sm"]
+    assert all("parser" in excl and "ner" in excl for _, excl in loads)
+
+
+def test_tokenize_many_uses_single_pipe_call(monkeypatch):
+    _install_fake_spacy(monkeypatch)
+    texts = ["Wheel Lathe", "", "Railway depot workshop"]
+
+    out = tokenize_many(texts, lang_hint="en")
+
+    assert out == [["wheel", "lathe"], [], ["railway", "depot", "workshop"]]
+    assert nlp.registry.get("en").pipe_calls == 1
+
+
+def test_tokenize_many_fallback_matches_tokenize(monkeypatch):
+    monkeypatch.setattr(nlp, "_try_import_spacy", lambda: None)
+    monkeypatch.setattr(nlp, "registry", nlp.ModelRegistry())
+    texts = ["Underfloor wheel-lathe for depot", "Büromöbel"]
+
+    assert tokenize_many(texts, lang_hint="fr") == [tokenize(t, "fr") for t in texts]
@@ -0,0 +1,218 @@
+import asyncio
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from app.alerts.channels import Channel
+from app.db import engine, SessionLocal
+from app.models import Base, AlertSent, PipelineStageRun, TenderFiltered, TenderRaw
+from app.normalize import normalize_record
+from app.orchestrator.cron import Cron, CronError
+from app.email_parser.push import score_new_rows
+from app.orchestrator.pipeline import SCORING_LOCK, alert_pass, cluster_pass, record_timings, run_pipeline, score_pass
+from app.orchestrator.scheduler import Job, advisory_lock, job_lock, run_job
+from app.repository import TenderRepository
+
+BERLIN = ZoneInfo("Europe/Berlin")
+
+
+def setup_module():
+    Base.metadata.create_all(bind=engine)
+
+
+def _utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+def test_daily_cron_follows_local_time_across_dst():
+    daily = Cron.parse("0 5 * * *")
+    assert daily.next_after(_utc(2025, 1, 10, 12, 0), BERLIN) == _utc(2025, 1, 11, 4, 0)
+    assert daily.next_after(_utc(2025, 7, 10, 2, 0), BERLIN) == _utc(2025, 7, 10, 3, 0)
+    assert daily.next_after(_utc(2025, 7, 10, 3, 0), BERLIN) == _utc(2025, 7, 11, 3, 0)
+
+
+def test_cron_fields_ranges_steps_and_weekdays():
+    office = Cron.parse("*/30 8-9 * * 1-5")
+    # Friday 09:45 -> Monday 08:00 (UTC here)
+    assert office.next_after(_utc(2025, 1, 10, 9, 45), timezone.utc) == _utc(2025, 1, 13, 8, 0)
+    assert office.next_after(_utc(2025, 1, 13, 8, 0), timezone.utc) == _utc(2025, 1, 13, 8, 30)
+    # both day fields restricted: either matches (the 1st, or a Sunday)
+    assert Cron.parse("0 0 1 * 0").next_after(_utc(2025, 1, 2), timezone.utc) == _utc(2025, 1, 5)
+    for bad in ("0 5 * *", "61 * * * *", "0 5 * * mon"):
+        with pytest.raises(CronError):
+            Cron.parse(bad)
+
+
+def test_stages_run_while_ingest_is_still_producing():
+    calls = []
+
+    async def scenario():
+        first_alert = asyncio.Event()
+
+        async def source(emit):
+            await emit(10)
+            # a phase-by-phase pipeline would never get here
+            await asyncio.wait_for(first_alert.wait(), timeout=5)
+            await emit(5)
+            return 15
+
+        async def cluster():
+            calls.append("cluster")
+            return 1
+
+        async def score():
+            calls.append("score")
+            return 1
+
+        async def alert():
+            calls.append("alert")
+            first_alert.set()
+            return 1
+
+        return await run_pipeline({"fake": source}, cluster, score, alert, queue_size=1)
+
+    timings = asyncio.run(scenario())
+    assert calls[:3] == ["cluster", "score", "alert"]
+    assert timings["ingest"].items == 15
+    assert timings["ingest"].error is None
+    # every stage finishes with a final pass after ingest is done
+    assert calls.count("alert") == timings["alerts"].passes >= 2
+
+
+def test_failing_stage_is_recorded_and_does_not_stop_the_pipeline():
+    async def source(emit):
+        await emit(1)
+        return 1
+
+    async def broken():
+        raise RuntimeError("boom")
+
+    async def ok():
+        return 0
+
+    timings = asyncio.run(run_pipeline({"fake": source}, broken, ok, ok))
+    assert timings["cluster"].error == "RuntimeError: boom"
+    assert timings["alerts"].passes == 1
+
+
+class RecordingChannel(Channel):
+    def __init__(self, name):
+        super().__init__(name, rate=100)
+        self.sent = []
+
+    async def _send(self, message):
+        self.sent.append(message)
+
+
+def test_pipeline_ingests_clusters_scores_and_alerts_end_to_end():
+    db = SessionLocal()
+    db.query(AlertSent).filter(AlertSent.channel == "pipeline-test").delete()
+    db.query(TenderRaw).filter(TenderRaw.source.like("PIPE_%")).delete(synchronize_session=False)
+    db.commit()
+    db.close()
+    channel = RecordingChannel("pipeline-test")
+    # text no other test module uses, so earlier runs' rows cannot join the cluster
+    title = "Underfloor wheel lathe for the Linz tram depot"
+    description = "Supply and commissioning of a wheelset lathe (UWL) for the tram depot"
+
+    async def source(emit):
+        db = SessionLocal()
+        try:
+            for i in range(2):
+                rec = normalize_record(
+                    source=f"PIPE_{i}", external_id="1", title=title, description=description,
+                    url=f"https://pipe{i}.example/1", country="DE", language="EN", cpv="42620000",
+                    budget=1_000_000, deadline=None, published_at=None,
+                )
+                counts = TenderRepository(db).upsert_many_raw([rec])
+                db.commit()
+                await emit(counts.inserted)
+        finally:
+            db.close()
+        return 2
+
+    started = datetime.now(timezone.utc)
+    timings = asyncio.run(
+        run_pipeline(
+            {"test": source},
+            cluster_pass(SessionLocal),
+            score_pass(SessionLocal),
+            alert_pass(SessionLocal, [channel]),
+        )
+    )
+    assert all(t.error is None for t in timings.values())
+
+    db = SessionLocal()
+    rows = db.query(TenderRaw).filter(TenderRaw.source.like("PIPE_%")).all()
+    assert len({r.cluster_id for r in rows}) == 1
+    # the same tender from two sources is alerted once (other modules' rows may be alerted too)
+    assert sum(".example/1" in m.body and "pipe" in m.body for m in channel.sent) == 1
+    statuses = dict(
+        db.query(TenderRaw.source, AlertSent.status)
+        .join(TenderFiltered, TenderFiltered.raw_id == TenderRaw.id)
+        .join(AlertSent, AlertSent.filtered_id == TenderFiltered.id)
+        .filter(AlertSent.channel == "pipeline-test", TenderRaw.source.like("PIPE_%"))
+    )
+    assert sorted(statuses.values()) == ["duplicate", "sent"]
+
+    record_timings(db, "test-job", started, timings)
+    stored = db.query(PipelineStageRun).filter(PipelineStageRun.job == "test-job").all()
+    assert {s.stage for s in stored} == {"ingest", "cluster", "score", "alerts"}
+    db.close()
+
+
+def test_job_lock_lets_only_one_instance_run_a_job():
+    ran = []
+
+    async def scenario():
+        async def work():
+            ran.append(True)
+            return "done"
+
+        job = Job("lock-test", Cron.parse("* * * * *"), work)
+        async with job_lock(engine, "lock-test") as held:
+            assert held
+            assert await run_job(job, engine) is None
+        return await run_job(job, engine)
+
+    assert asyncio.run(scenario()) == "done"
+    assert ran == [True]
+
+
+def test_push_scoring_skips_while_another_process_holds_the_scoring_lock(monkeypatch):
+    import app.scoring.pipeline
+
+    passes = []
+    monkeypatch.setattr(app.scoring.pipeline, "run_scoring", lambda db, **kw: passes.append(True) or 3)
+    db = SessionLocal()
+    try:
+        with advisory_lock(engine, SCORING_LOCK) as held:
+            assert held
+            assert score_new_rows(db) == 0
+        assert passes == []
+        assert score_new_rows(db) == 3
+        assert passes == [True]
+    finally:
+        db.close()
+
+
+def test_alert_pass_keeps_database_work_off_the_event_loop():
+    import threading
+
+    from sqlalchemy import event
+
+    threads = set()
+
+    def session_factory():
+        db = SessionLocal()
+        event.listen(db, "do_orm_execute", lambda state: threads.add(threading.get_ident()))
+        return db
+
+    async def run():
+        loop_thread = threading.get_ident()
+        await alert_pass(session_factory, [RecordingChannel("off-loop-test")])()
+        return loop_thread
+
+    loop_thread = asyncio.run(run())
+    assert threads and loop_thread not in threads
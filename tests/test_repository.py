@@ -0,0 +1,75 @@
+from decimal import Decimal
+
+from sqlalchemy import text
+
+from app.models import Base, TenderRaw
+from app.db import engine, SessionLocal
+from app.normalize import normalize_record
+from app.repository import TenderRepository, UpsertCounts
+
+
+def setup_module():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    db.execute(text("DELETE FROM tenders_raw WHERE source = 'UPSERT_TEST'"))
+    db.commit()
+    db.close()
+
+
+def _rec(external_id, title, budget=None, description=""):
+    return normalize_record(
+        source="UPSERT_TEST",
+        external_id=external_id,
+        title=title,
+        description=description,
+        url=f"https://portal.example/t/{external_id}",
+        country="de",
+        language=None,
+        cpv=None,
+        budget=budget,
+        deadline="2026-01-31",
+        published_at=None,
+    )
+
+
+def _rows(db):
+    return {r.external_id: r for r in db.query(TenderRaw).filter_by(source="UPSERT_TEST")}
+
+
+def test_upsert_counts_inserted_updated_unchanged():
+    db = SessionLocal()
+    repo = TenderRepository(db)
+    batch = [_rec("1", "Wheel lathe", "1.000.000"), _rec("2", "Bogie press"), _rec("3", "Chairs")]
+
+    assert repo.upsert_many_raw(batch) == UpsertCounts(inserted=3)
+    db.commit()
+    stamps = {k: r.updated_at for k, r in _rows(db).items()}
+
+    assert repo.upsert_many_raw(batch) == UpsertCounts(unchanged=3)
+    db.commit()
+
+    changed = [_rec("1", "Wheel lathe", "1.200.000"), _rec("2", "Bogie press"), _rec("4", "New lot")]
+    assert repo.upsert_many_raw(changed) == UpsertCounts(inserted=1, updated=1, unchanged=1)
+    db.commit()
+
+    db.expire_all()
+    rows = _rows(db)
+    assert rows["1"].budget_amount == Decimal("1200000")
+    assert rows["1"].updated_at > stamps["1"]
+    assert rows["2"].updated_at == stamps["2"]
+    assert len(rows) == 4
+    db.close()
+
+
+def test_upsert_survives_copy_special_characters_and_duplicate_keys():
+    db = SessionLocal()
+    repo = TenderRepository(db)
+    tricky = 'Lot "A", part 2\nRadsatz-Drehmaschine – ÖBB\\N'
+    counts = repo.upsert_many_raw([_rec("10", "first"), _rec("10", tricky, description="")])
+    db.commit()
+
+    assert counts == UpsertCounts(inserted=1)
+    row = _rows(db)["10"]
+    assert row.title == tricky
+    assert row.description is None and row.budget_amount is None
+    db.close()
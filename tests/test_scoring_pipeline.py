@@ -1,11 +1,24 @@
-from app.models import Base, TenderRaw, TenderFiltered
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+from sqlalchemy import func
+
+from app.models import Base, TenderRaw, TenderFiltered, ScoringCacheEntry
 from app.db import engine, SessionLocal
-from app.scoring.pipeline import run_scoring
+from app.scoring import pipeline
+from app.scoring.cache import ScoringCache, evict, match_version
+from app.scoring.matcher import KeywordMatcher
+from app.scoring.pipeline import run_scoring, score_rows
 
 
 def setup_module():
     # create tables once (idempotent)
     Base.metadata.create_all(bind=engine)
+    # the tests insert these rows themselves
+    db = SessionLocal()
+    db.query(TenderRaw).filter(TenderRaw.source == "TED", TenderRaw.external_id.in_(["X1", "X2", "X3"])).delete()
+    db.commit()
+    db.close()
 
 
 def test_scoring_inserts_filtered_rows():
@@ -55,3 +68,200 @@ def test_scoring_inserts_filtered_rows():
     assert rows[0].relevance_score >= 60
 
     db.close()
+
+
+def test_scoring_is_incremental_and_upserts():
+    db = SessionLocal()
+
+    # catch up with whatever earlier tests inserted
+    run_scoring(db, keywords_csv_path="config/keywords_multilingual.csv", threshold=60)
+    before = db.query(TenderFiltered).count()
+
+    # nothing new -> nothing scored, no duplicate filtered rows
+    assert run_scoring(db, keywords_csv_path="config/keywords_multilingual.csv", threshold=60) == 0
+    assert db.query(TenderFiltered).count() == before
+
+    db.add(
+        TenderRaw(
+            source="TED",
+            external_id="X3",
+            title="Wheelset lathe for railway workshop",
+            description="Underfloor wheel lathe",
+            country="AT",
+            language="EN",
+            url="https://example/ted/3",
+        )
+    )
+    db.commit()
+
+    assert run_scoring(db, keywords_csv_path="config/keywords_multilingual.csv", threshold=60) == 1
+    assert db.query(TenderFiltered).count() == before + 1
+
+    # full rescore rewrites in place instead of duplicating
+    # (it may also restore rows other modules deleted from tenders_filtered)
+    full = run_scoring(db, keywords_csv_path="config/keywords_multilingual.csv", threshold=60, full=True)
+    assert full >= before + 1
+    assert db.query(TenderFiltered).count() == full
+
+    db.close()
+
+
+def _lathe(external_id):
+    return TenderRaw(
+        source="LATE_COMMIT",
+        external_id=external_id,
+        title="Wheelset lathe for railway workshop",
+        description="Underfloor wheel lathe",
+        country="AT",
+        language="EN",
+        url=f"https://example/late/{external_id}",
+    )
+
+
+def test_incremental_scoring_picks_up_rows_committed_after_the_pass_started():
+    db = SessionLocal()
+    db.query(TenderRaw).filter(TenderRaw.source == "LATE_COMMIT").delete()
+    db.commit()
+    run_scoring(db, keywords_csv_path="config/keywords_multilingual.csv", threshold=60)
+
+    # a slow writer takes the lower id and commits only after a run saw a higher one
+    late = SessionLocal()
+    late.add(_lathe("slow"))
+    late.flush()
+    db.add(_lathe("fast"))
+    db.commit()
+    assert run_scoring(db, keywords_csv_path="config/keywords_multilingual.csv", threshold=60) == 1
+    late.commit()
+    slow_id = late.query(TenderRaw.id).filter_by(source="LATE_COMMIT", external_id="slow").scalar()
+    late.close()
+
+    # the late row, and "fast" again: it was written after the slow transaction started
+    assert run_scoring(db, keywords_csv_path="config/keywords_multilingual.csv", threshold=60) == 2
+    assert db.query(TenderFiltered).filter_by(raw_id=slow_id).count() == 1
+    db.close()
+
+
+def test_scoring_rescores_all_when_keywords_change(tmp_path):
+    db = SessionLocal()
+    run_scoring(db, keywords_csv_path="config/keywords_multilingual.csv", threshold=60)
+    assert db.query(TenderFiltered).count() >= 1
+
+    csv_path = tmp_path / "keywords.csv"
+    csv_path.write_text("lang,keyword\nen,office chairs\n", encoding="utf-8")
+    run_scoring(db, keywords_csv_path=str(csv_path), threshold=60)
+
+    # only furniture-like tenders can reach the threshold now; wheel lathes lost their keyword hit
+    raw_ids = [r.raw_id for r in db.query(TenderFiltered).all()]
+    titles = [db.get(TenderRaw, i).title for i in raw_ids]
+    assert not any("lathe" in t.lower() for t in titles)
+
+    # restoring the original keywords brings them back
+    run_scoring(db, keywords_csv_path="config/keywords_multilingual.csv", threshold=60)
+    assert db.query(TenderFiltered).count() >= 1
+
+    db.close()
+
+
+def test_chunked_full_rescore_matches_single_chunk():
+    db = SessionLocal()
+
+    run_scoring(db, keywords_csv_path="config/keywords_multilingual.csv", threshold=60, full=True)
+    expected = {(r.raw_id, r.relevance_score, r.matched_keywords) for r in db.query(TenderFiltered).all()}
+
+    run_scoring(db, keywords_csv_path="config/keywords_multilingual.csv", threshold=60, full=True, chunk_size=1)
+    db.expire_all()
+    got = {(r.raw_id, r.relevance_score, r.matched_keywords) for r in db.query(TenderFiltered).all()}
+
+    assert got == expected
+    db.close()
+
+
+def test_parallel_scoring_matches_serial():
+    db = SessionLocal()
+
+    run_scoring(db, keywords_csv_path="config/keywords_multilingual.csv", threshold=60, full=True)
+    expected = {(r.raw_id, r.relevance_score, r.matched_keywords) for r in db.query(TenderFiltered).all()}
+
+    written = run_scoring(
+        db,
+        keywords_csv_path="config/keywords_multilingual.csv",
+        threshold=60,
+        full=True,
+        chunk_size=1,
+        workers=2,
+    )
+    db.expire_all()
+    got = {(r.raw_id, r.relevance_score, r.matched_keywords) for r in db.query(TenderFiltered).all()}
+
+    assert written == len(expected)
+    assert got == expected
+    db.close()
+
+
+def _cache_row(deadline, **kw):
+    values = dict(
+        id=1,
+        title="Underfloor wheel lathe for tram depot (cache test)",
+        description="Wheelset lathe incl. installation",
+        language="en",
+        country="DE",
+        deadline_date=deadline,
+        budget_amount=None,
+    )
+    values.update(kw)
+    return SimpleNamespace(**values)
+
+
+def test_scoring_cache_reuses_text_signals(monkeypatch):
+    keywords = {"en": ["wheel lathe", "wheelset lathe"]}
+    matcher = KeywordMatcher(keywords)
+    cache = ScoringCache(engine, match_version(keywords, matcher.threshold))
+    far = date.today() + timedelta(days=60)
+
+    first = score_rows([_cache_row(None)], keywords, matcher, cache=cache)
+    assert first == score_rows([_cache_row(None)], keywords, matcher)
+
+    # unchanged text: no tokenizing or matching, only the cheap signals move
+    def no_tokenizing(rows, *args, **kwargs):
+        assert not rows
+        return []
+
+    monkeypatch.setattr(pipeline, "tokenize_records", no_tokenizing)
+    monkeypatch.setattr(matcher, "match", lambda tokens: 1 / 0)
+    hits, _ = score_rows([_cache_row(far)], keywords, matcher, cache=cache)
+    assert hits[0]["relevance_score"] == first[0][0]["relevance_score"] + 10
+
+    # new keywords rerun the matcher (regex tokens are recomputed, spaCy tokens come from the cache)
+    monkeypatch.undo()
+    other = {"en": ["tram depot"]}
+    other_matcher = KeywordMatcher(other)
+    other_cache = ScoringCache(engine, match_version(other, other_matcher.threshold))
+    hits, _ = score_rows([_cache_row(None)], other, other_matcher, cache=other_cache)
+    assert hits[0]["matched_keywords"] == "tram depot"
+
+
+def test_scoring_cache_keeps_spacy_tokens_across_keyword_changes(monkeypatch):
+    from app.scoring import cache as cache_module
+
+    monkeypatch.setattr(cache_module, "tokenizer_id", lambda lang: "en_test-1.0")
+    monkeypatch.setattr(pipeline, "tokenizer_id", lambda lang: "en_test-1.0")
+    row = _cache_row(None, title="Bogie drop table for tram depot (cache test)")
+    keywords = {"en": ["bogie drop table"]}
+    matcher = KeywordMatcher(keywords)
+    score_rows([row], keywords, matcher, cache=ScoringCache(engine, match_version(keywords, matcher.threshold)))
+
+    monkeypatch.setattr(pipeline, "tokenize_records", lambda rows, *a, **kw: [] if not rows else 1 / 0)
+    other = {"en": ["tram depot"]}
+    other_matcher = KeywordMatcher(other)
+    other_cache = ScoringCache(engine, match_version(other, other_matcher.threshold))
+    hits, _ = score_rows([row], other, other_matcher, cache=other_cache)
+    assert hits[0]["matched_keywords"] == "tram depot"
+
+
+def test_scoring_cache_is_bounded():
+    db = SessionLocal()
+    run_scoring(db, keywords_csv_path="config/keywords_multilingual.csv", threshold=60, full=True)
+    assert db.query(func.count(ScoringCacheEntry.key)).scalar() > 2
+    evict(engine, max_rows=2)
+    assert db.query(func.count(ScoringCacheEntry.key)).scalar() == 2
+    db.close()
@@ -0,0 +1,177 @@
+import asyncio
+import functools
+import json
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.scraper.crawl import HostRateLimiter, TokenBucket, run_crawl
+from app.scraper.http_fetch import PortalHttpClient, SessionExpired, next_page_url
+
+SITE_DIR = "tests/fixtures/portal_site"
+
+
+class _SiteHandler(SimpleHTTPRequestHandler):
+    # fixture pages have extensionless paths like the portal (/search, /results)
+    extensions_map = {**SimpleHTTPRequestHandler.extensions_map, "": "text/html"}
+    cookies = []
+
+    def do_GET(self):
+        _SiteHandler.cookies.append(self.headers.get("Cookie"))
+        if self.path.startswith("/expired"):
+            self.send_response(302)
+            self.send_header("Location", "/login")
+            self.end_headers()
+            return
+        super().do_GET()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def portal_site():
+    handler = functools.partial(_SiteHandler, directory=SITE_DIR)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    _SiteHandler.cookies = []
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def _chromium_or_skip():
+    pytest.importorskip("playwright")
+    from playwright.sync_api import Error, sync_playwright
+
+    try:
+        with sync_playwright() as p:
+            p.chromium.launch(headless=True).close()
+    except Error as exc:
+        pytest.skip(f"chromium not available: {exc}")
+
+
+def test_token_bucket_spaces_out_requests():
+    async def run():
+        bucket = TokenBucket(rate=20, burst=1)
+        started = time.monotonic()
+        for _ in range(5):
+            await bucket.acquire()
+        return time.monotonic() - started
+
+    # first token is banked, the other four wait 1/20 s each
+    assert asyncio.run(run()) >= 0.19
+
+
+def test_host_rate_limiter_buckets_are_independent():
+    async def run():
+        limiter = HostRateLimiter(rate=0.1, burst=1)
+        started = time.monotonic()
+        await asyncio.gather(limiter.wait("https://a.example/x"), limiter.wait("https://b.example/y"))
+        return time.monotonic() - started
+
+    assert asyncio.run(run()) < 1.0
+
+
+def test_next_page_url_resolves_relative_link():
+    html = '<a href="?page=1">1</a> <a class="btn next" href="results2">Next</a>'
+    assert next_page_url(html, "https://portal.example/results?q=x") == "https://portal.example/results2"
+    assert next_page_url("<p>last page</p>", "https://portal.example/") is None
+
+
+def test_http_mode_reuses_session_cookies_without_browser(portal_site, tmp_path):
+    state = tmp_path / "state.json"
+    state.write_text(json.dumps({"cookies": [{"name": "sid", "value": "abc", "domain": "127.0.0.1", "path": "/"}]}))
+
+    results = run_crawl(
+        ["wheel lathe", "chairs"],
+        base_url=portal_site,
+        mode="http",
+        login=False,
+        storage_state=state,
+        results_path="/results",
+        limiter=HostRateLimiter(rate=50, burst=5),
+    )
+
+    for records in results.values():
+        assert [r["title"] for r in records] == ["Underfloor wheel lathe for depot", "Office chairs"]
+        # the portal's ids, not the position on the page (both are the first result of their page)
+        assert [r["external_id"] for r in records] == ["123", "124"]
+    # 2 keywords x 2 result pages, each request carrying the saved session
+    assert _SiteHandler.cookies == ["sid=abc"] * 4
+
+
+def test_http_search_stops_at_first_fully_known_page(portal_site):
+    asked = []
+
+    def known(ids):
+        asked.append(sorted(ids))
+        return {"124"} & set(ids)
+
+    async def run():
+        async with PortalHttpClient(portal_site, results_path="/results") as client:
+            return await client.search("lathe", max_pages=5, known=known)
+
+    records = asyncio.run(run())
+
+    # page 1 (/t/123) is new, page 2 (/t/124) is already stored -> stop there
+    assert [r["external_id"] for r in records] == ["123"]
+    assert asked == [["123"], ["124"]]
+    assert len(_SiteHandler.cookies) == 2
+
+
+def test_http_search_reparses_pages_the_cache_reports_unchanged(portal_site, tmp_path):
+    from app.http_cache import HttpCache
+    from app.scraper.portal import reparse_cached_pages
+
+    cache = HttpCache(tmp_path / "cache")
+
+    async def run(known=None):
+        async with PortalHttpClient(portal_site, results_path="/results", cache=cache) as client:
+            return await client.search("lathe", known=known)
+
+    first = asyncio.run(run())
+    assert len(first) == 2
+    # second crawl: both pages answered 304 (If-Modified-Since), still parsed -- the
+    # first crawl's records may never have been stored
+    assert asyncio.run(run()) == first
+    assert len(_SiteHandler.cookies) == 4
+    # once they are stored, the first (unchanged) page ends the crawl
+    assert asyncio.run(run(known=lambda ids: set(ids))) == []
+    assert len(_SiteHandler.cookies) == 5
+
+    pages = reparse_cached_pages(cache)
+    assert sorted(len(records) for records in pages.values()) == [1, 1]
+
+
+def test_http_redirect_to_login_means_session_expired(portal_site):
+    async def run():
+        async with PortalHttpClient(portal_site, results_path="/expired") as client:
+            await client.search("anything")
+
+    with pytest.raises(SessionExpired):
+        asyncio.run(run())
+
+
+def test_crawl_keywords_in_browser_against_local_site(portal_site, tmp_path):
+    _chromium_or_skip()
+
+    results = run_crawl(
+        ["wheel lathe", "chairs", "depot"],
+        base_url=portal_site,
+        max_pages=3,
+        concurrency=2,
+        limiter=HostRateLimiter(rate=50, burst=5),
+        storage_state=tmp_path / "state.json",
+        login=False,
+        mode="browser",
+    )
+
+    assert set(results) == {"wheel lathe", "chairs", "depot"}
+    for records in results.values():
+        assert [r["title"] for r in records] == ["Underfloor wheel lathe for depot", "Office chairs"]
+        # the portal's ids, not the position on the page (both are the first result of their page)
+        assert [r["external_id"] for r in records] == ["123", "124"]
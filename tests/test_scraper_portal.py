@@ -1,12 +1,18 @@
 from pathlib import Path
 
+from sqlalchemy import text
+
 from app.models import Base, TenderRaw
 from app.db import engine, SessionLocal
-from app.scraper.portal import parse_results_html, ingest_results_html
+from app.scraper.portal import SOURCE_NAME, parse_results_html, ingest_results_html
 
 
 def setup_module():
     Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    db.execute(text("DELETE FROM tenders_raw WHERE source = :s"), {"s": SOURCE_NAME})
+    db.commit()
+    db.close()
 
 
 def test_parse_results_html_fixture():
@@ -25,10 +31,94 @@ def test_ingest_results_html_inserts_into_db():
     html = html_path.read_text(encoding="utf-8")
 
     db = SessionLocal()
-    before = db.query(TenderRaw).count()
+    before = db.query(TenderRaw).filter(TenderRaw.source == SOURCE_NAME).count()
     inserted = ingest_results_html(db, html)
-    after = db.query(TenderRaw).count()
+    after = db.query(TenderRaw).filter(TenderRaw.source == SOURCE_NAME).count()
     db.close()
 
     assert inserted == 2
     assert after == before + 2
+
+
+NESTED_DESCRIPTION = """
+    <div class="results">
+      <div class="result featured">
+        <a class="result-title" href="/t/900">Radsatz &amp; wheelset lathe</a>
+        <div class="result-description">
+          <p>Supply of an <b>underfloor</b> wheel lathe.
+          <div class="note">Includes <br> training</div>
+          Option for a second machine.
+        </div>
+        <span class="result-country">Country: AT</span>
+      </div>
+      <div class="result"><a class="result-title" href="/t/901">Second</a></div>
+    </div>
+    """
+
+
+def test_parse_results_html_nested_description():
+    records = parse_results_html(NESTED_DESCRIPTION)
+    assert len(records) == 2
+    first = records[0]
+    assert first["title"] == "Radsatz & wheelset lathe"
+    assert first["url"] == "/t/900"
+    assert first["description"] == (
+        "Supply of an underfloor wheel lathe. Includes training Option for a second machine."
+    )
+    assert first["country"] == "AT"
+    assert first["budget"] is None
+    assert records[1]["title"] == "Second"
+
+
+def test_block_tags_and_line_breaks_separate_words():
+    html = (
+        '<div class="result"><a class="result-title" href="/t/902">Lathe</a>'
+        '<div class="result-description"><p>Supply of a wheel lathe</p><p>Radsatz</p>line<br>two<br/>three</div>'
+        "</div>"
+    )
+    records = parse_results_html(html)
+    assert records[0]["description"] == "Supply of a wheel lathe Radsatz line two three"
+
+
+def test_extractor_fed_in_chunks_matches_whole_page():
+    from app.scraper.extract import ResultExtractor
+
+    html = Path("tests/fixtures/portal_search_results.html").read_text(encoding="utf-8")
+    html += "<!-- <div class=\"result\">commented out</div> --><script>var x = '<div class=\"result\">';</script>"
+    # nested same-tag elements / a comment inside a field that stays open across chunks
+    html += '<div class="result"><div class="result-description">a <!-- <div class="result"> --> b</div></div>'
+    html += NESTED_DESCRIPTION
+
+    whole = parse_results_html(html)
+    assert len(whole) == 5
+    assert whole[2]["description"] == "a b"
+    assert whole[3]["country"] == "AT" and whole[4]["title"] == "Second"
+    for size in (1, 7, 64, 100, 333):
+        extractor = ResultExtractor()
+        for i in range(0, len(html), size):
+            extractor.feed(html[i : i + size])
+        extractor.close()
+        assert extractor.records == whole
+
+
+def test_stable_external_id_from_url():
+    from app.scraper.portal import stable_external_id
+
+    assert stable_external_id("https://portal.example/t/123") == "123"
+    assert stable_external_id("https://portal.example/view?tenderId=AB-7&utm_source=x") == "AB-7"
+    # no portal id: hash of the canonical URL, independent of tracking params and order
+    a = stable_external_id("https://Portal.example:443/view?b=2&a=1#top")
+    b = stable_external_id("https://portal.example/view?a=1&utm_medium=mail&b=2")
+    assert a == b and len(a) == 64
+
+
+def test_ingest_results_html_twice_adds_nothing_new():
+    html = Path("tests/fixtures/portal_search_results.html").read_text(encoding="utf-8")
+    db = SessionLocal()
+    ingest_results_html(db, html)
+    before = db.query(TenderRaw).count()
+    assert ingest_results_html(db, html) == 0
+    assert db.query(TenderRaw).count() == before
+    ids = {r.external_id for r in db.query(TenderRaw).filter(TenderRaw.source == "LOGIN_PORTAL")}
+    db.close()
+    assert {"123", "124"} <= ids
@@ -0,0 +1,119 @@
+import asyncio
+from datetime import date, datetime, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app.db import AsyncSessionLocal, async_engine, engine, SessionLocal
+from app.main import app
+from app.models import Base, TenderRaw
+from app.search import SearchError, run_saved, saved_searches, search, search_async
+
+SOURCE = "SEARCH_TEST"
+
+
+def _published(year):
+    return datetime(year, 6, 1, tzinfo=timezone.utc)
+
+
+def setup_module():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    db.execute(text("DELETE FROM tenders_raw WHERE source = :s"), {"s": SOURCE})
+    rows = [
+        ("de-1", "Lieferung von Radsätzen", "Instandhaltung der Radsätze im Depot Nürnberg.", "de", "DE", 2025),
+        ("de-2", "Unterflur-Drehmaschine", "Beschaffung einer Radsatzdrehmaschine für das Werk.", "DE", "DE", 2025),
+        ("en-1", "Supply of wheelsets", "Overhaul of wheelsets and bogies for regional trains.", "en", "UK", 2025),
+        ("en-2", "Underfloor wheel lathe", "Delivery of an underfloor wheel lathe incl. foundation.", "en", "IE", 2019),
+        ("pl-1", "Tokarka podtorowa", "Dostawa tokarki podtorowej do zestawów kołowych.", "pl", "PL", 2025),
+        ("en-3", "Office furniture", "Chairs and desks.", "en", "UK", 2025),
+        ("nl-1", "Tram wheel inspection", "Inspection of tram wheels and bogies.", "en", "NL", 2025),
+        ("nl-2", "Tram wheel inspection", "Inspection of tram wheels.", "en", "NL", 2025),
+    ]
+    for external_id, title, description, lang, country, year in rows:
+        db.add(
+            TenderRaw(
+                source=SOURCE, external_id=external_id, title=title, description=description, language=lang,
+                country=country, url=f"https://search.example/{external_id}", published_at=_published(year),
+            )
+        )
+    db.commit()
+    db.close()
+
+
+def _ids(hits):
+    return {h.url.rsplit("/", 1)[1] for h in hits}
+
+
+def test_stemmed_search_across_languages_with_snippets():
+    db = SessionLocal()
+    hits = search(db, "Radsatz or wheelset", country=["DE", "UK", "IE"], source=[SOURCE])
+    assert _ids(hits) == {"de-1", "en-1"}
+    assert "<<" in hits[0].snippet and ">>" in hits[0].snippet
+
+    assert _ids(search(db, '"wheel lathe"', country=["IE"], source=[SOURCE])) == {"en-2"}
+    assert _ids(search(db, "tokarki", country=["PL"], source=[SOURCE])) == {"pl-1"}
+    db.close()
+
+
+def test_excluded_terms_apply_in_the_rows_own_language():
+    db = SessionLocal()
+    assert _ids(search(db, "wheel", country=["NL"], source=[SOURCE])) == {"nl-1", "nl-2"}
+    assert _ids(search(db, "wheel -bogies", country=["NL"], source=[SOURCE])) == {"nl-2"}
+    db.close()
+
+
+def test_date_window_and_validation():
+    db = SessionLocal()
+    assert _ids(search(db, "wheelset or lathe", since=date(2024, 1, 1), source=[SOURCE])) == {"en-1"}
+    assert _ids(search(db, "wheelset or lathe", until=date(2020, 12, 31), source=[SOURCE])) == {"en-2"}
+    with pytest.raises(SearchError):
+        search(db, "  ")
+    db.close()
+
+
+def test_search_vector_follows_edits():
+    db = SessionLocal()
+    row = db.query(TenderRaw).filter_by(source=SOURCE, external_id="en-3").one()
+    row.description = "Chairs, desks and one wheelset lathe."
+    db.commit()
+    assert "en-3" in _ids(search(db, "wheelset", country=["UK"], source=[SOURCE]))
+    db.close()
+
+
+def test_saved_searches_come_from_the_keyword_list():
+    saved = saved_searches()
+    assert {"keywords", "keywords-en", "keywords-de"} <= set(saved)
+    assert '"wheelset lathe"' in saved["keywords-en"].query
+
+    db = SessionLocal()
+    assert _ids(run_saved(db, "keywords-de", country=["DE"], source=[SOURCE])) == {"de-2"}
+    assert {"en-2"} <= _ids(run_saved(db, "keywords", country=["IE"], source=[SOURCE]))
+    db.close()
+
+
+def test_async_search_matches_sync():
+    async def run():
+        async with AsyncSessionLocal() as db:
+            return await search_async(db, "wheelset or lathe", since=date(2024, 1, 1), source=[SOURCE])
+
+    db = SessionLocal()
+    expected = search(db, "wheelset or lathe", since=date(2024, 1, 1), source=[SOURCE])
+    db.close()
+    hits = asyncio.run(run())
+    asyncio.run(async_engine.dispose())  # its connections belong to this finished loop
+    assert [h.id for h in hits] == [h.id for h in expected] and hits
+
+
+def test_search_endpoints():
+    with TestClient(app) as client:
+        body = client.get("/search", params={"q": "Radsätze", "source": SOURCE}).json()
+        assert [i["url"] for i in body["items"]] == ["https://search.example/de-1"]
+        assert client.get("/search", params={"q": ""}).status_code == 422
+
+        names = {s["name"] for s in client.get("/search/saved").json()["items"]}
+        assert "keywords-de" in names
+        saved = client.get("/search/saved/keywords-de", params={"country": "DE", "source": SOURCE}).json()
+        assert [i["url"] for i in saved["items"]] == ["https://search.example/de-2"]
+        assert client.get("/search/saved/nope").status_code == 404